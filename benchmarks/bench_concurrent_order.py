@@ -0,0 +1,113 @@
+"""
+Throughput of thread-safe ordering: per-product locks (Store with
+thread_safe=True) against a single store-wide lock, for a growing number
+of worker threads.
+
+Run from the repository root:
+
+    python benchmarks/bench_concurrent_order.py --products 1000 --orders 20000
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import products  # noqa: E402
+import store  # noqa: E402
+
+
+class GlobalLockStore(store.Store):
+    """
+    Store variant serializing every order behind one lock,
+    used as the baseline of the benchmark.
+    """
+
+    def __init__(self, list_products):
+        super().__init__(list_products)
+        self._global_lock = threading.Lock()
+
+    def order(self, shopping_list):
+        with self._global_lock:
+            return super().order(shopping_list)
+
+
+def make_orders(product_list, count, lines, seed):
+    """
+    Builds random multi-line orders over the given products.
+
+    :param product_list: list - The products to order from.
+    :param count: int - The number of orders.
+    :param lines: int - The number of lines per order.
+    :param seed: int - The random seed.
+    :return: list - A list of shopping lists.
+    """
+    rng = random.Random(seed)
+    return [
+        [(product, 1) for product in rng.sample(product_list, lines)]
+        for _ in range(count)
+    ]
+
+
+def run(store_factory, product_count, order_count, lines, threads):
+    """
+    Places order_count orders from the given number of threads.
+
+    :return: float - The number of orders per second.
+    """
+    product_list = [
+        products.Product(f"Product {i}", price=10, quantity=10 ** 9)
+        for i in range(product_count)
+    ]
+    best_buy = store_factory(product_list)
+    per_thread = order_count // threads
+    workloads = [
+        make_orders(product_list, per_thread, lines, seed)
+        for seed in range(threads)
+    ]
+
+    def worker(orders):
+        for shopping_list in orders:
+            best_buy.order(shopping_list)
+
+    workers = [
+        threading.Thread(target=worker, args=(orders,))
+        for orders in workloads
+    ]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--threads", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    factories = {
+        "per-product locks": lambda items: store.Store(items,
+                                                       thread_safe=True),
+        "global lock": GlobalLockStore,
+    }
+    print(f"{'mode':<20}{'threads':>8}{'orders/s':>14}")
+    for name, factory in factories.items():
+        for threads in args.threads:
+            rate = run(factory, args.products, args.orders, args.lines,
+                       threads)
+            print(f"{name:<20}{threads:>8}{rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
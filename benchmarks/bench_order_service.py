@@ -0,0 +1,89 @@
+"""
+Latency / throughput tradeoff of the asyncio OrderService for several
+batch windows, driven by an in-process load generator.
+
+Run from the repository root:
+
+    python benchmarks/bench_order_service.py --clients 200 --orders 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import order_service  # noqa: E402
+import products  # noqa: E402
+import store  # noqa: E402
+
+
+def percentile(values, fraction):
+    """
+    Returns the given percentile (0-1) of a sorted list of values.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(batch_window, product_count, clients, orders_per_client,
+              lines):
+    """
+    Runs the load generator against a fresh store.
+
+    :return: tuple - orders/s and the sorted latencies (seconds).
+    """
+    product_list = [
+        products.Product(f"Product {i}", price=10, quantity=10 ** 9)
+        for i in range(product_count)
+    ]
+    best_buy = store.Store(product_list)
+    latencies = []
+
+    async def client(seed):
+        rng = random.Random(seed)
+        for _ in range(orders_per_client):
+            shopping_list = [
+                (product, rng.randint(1, 3))
+                for product in rng.sample(product_list, lines)
+            ]
+            start = time.perf_counter()
+            await service.submit(shopping_list)
+            latencies.append(time.perf_counter() - start)
+
+    service = order_service.OrderService(best_buy, max_queue=clients,
+                                         batch_window=batch_window)
+    async with service:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(seed) for seed in range(clients)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=50,
+                        help="orders per client")
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--windows", type=float, nargs="+",
+                        default=[0, 0.0005, 0.002, 0.01])
+    args = parser.parse_args()
+
+    print(f"{'window (ms)':>12}{'orders/s':>12}{'p50 (ms)':>10}"
+          f"{'p99 (ms)':>10}")
+    for window in args.windows:
+        rate, latencies = asyncio.run(
+            run(window, args.products, args.clients, args.orders,
+                args.lines)
+        )
+        print(f"{window * 1000:>12.1f}{rate:>12,.0f}"
+              f"{percentile(latencies, 0.5) * 1000:>10.2f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Order throughput of the ProcessOrderPool (shared-memory stock, worker
+processes) against Store.order in a single process.
+
+Run from the repository root:
+
+    python benchmarks/bench_process_orders.py --orders 100000 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import products  # noqa: E402
+import shared_inventory  # noqa: E402
+import store  # noqa: E402
+
+
+def make_store(product_count):
+    """
+    Returns a store of product_count products, one out of three with
+    a promotion.
+    """
+    promotions = [None, products.SecondHalfPrice("Second Half price!"),
+                  products.PercentDiscount("30% off!", percent=30)]
+    return store.Store([
+        products.Product.restore(f"Product {i}", 10.0, 10 ** 12,
+                                 promotion=promotions[i % 3])
+        for i in range(product_count)
+    ])
+
+
+def make_orders(product_list, count, lines, seed=0):
+    """
+    Returns count random orders of the given number of lines.
+    """
+    rng = random.Random(seed)
+    return [
+        [(product, rng.randint(1, 5))
+         for product in rng.sample(product_list, lines)]
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args()
+
+    best_buy = make_store(args.products)
+    orders = make_orders(best_buy.list_products, args.orders, args.lines)
+    start = time.perf_counter()
+    for shopping_list in orders:
+        best_buy.order(shopping_list)
+    elapsed = time.perf_counter() - start
+    print(f"{'mode':>20}{'orders/s':>12}")
+    print(f"{'Store.order':>20}{len(orders) / elapsed:>12,.0f}")
+
+    for workers in args.workers:
+        best_buy = make_store(args.products)
+        orders = make_orders(best_buy.list_products, args.orders,
+                             args.lines)
+        with shared_inventory.ProcessOrderPool(
+            best_buy, workers, args.chunk_size
+        ) as pool:
+            start = time.perf_counter()
+            pool.order_many(orders)
+            elapsed = time.perf_counter() - start
+        print(f"{f'{workers} processes':>20}{len(orders) / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
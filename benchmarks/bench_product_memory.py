@@ -0,0 +1,108 @@
+"""
+Memory footprint and attribute access speed of the slotted Product
+classes, against the classes as they were before they used __slots__
+(products.py of that revision, read from git).
+
+Run from the repository root:
+
+    python benchmarks/bench_product_memory.py --products 100000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import products  # noqa: E402
+
+# The last revision whose products had a per-instance __dict__.
+BEFORE_SLOTS = "9639d0a^"
+
+
+def load_products(revision):
+    """
+    Imports products.py as it was at a git revision, as a separate
+    module (named products_<revision>).
+
+    :param revision: str - The git revision.
+    :return: module - The products module of that revision.
+    """
+    source = subprocess.run(
+        ["git", "show", f"{revision}:products.py"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    module = types.ModuleType(f"products_{revision}")
+    exec(compile(source, f"{revision}:products.py", "exec"), module.__dict__)
+    return module
+
+
+def measure_memory(product_class, count, **kwargs):
+    """
+    Returns the memory allocated per product, in bytes.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    catalog = [
+        product_class(f"Product {i}", price=10, quantity=100, **kwargs)
+        for i in range(count)
+    ]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del catalog
+    return (after - before) / count
+
+
+def measure_access(product_class, **kwargs):
+    """
+    Returns the time (ns) of a price read, a quantity read,
+    a quantity write and a one-item buy.
+    """
+    product = product_class("Product", price=10, quantity=10 ** 12, **kwargs)
+    number = 200000
+    timings = {}
+    statements = {
+        "price read": "product.price",
+        "quantity read": "product.quantity",
+        "quantity write": "product.quantity = 5000",
+        "buy(1)": "product.quantity = 5000; product.buy(1)",
+    }
+    for label, statement in statements.items():
+        seconds = min(timeit.repeat(statement, globals={"product": product},
+                                    number=number, repeat=3))
+        timings[label] = seconds / number * 1e9
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--before", default=BEFORE_SLOTS,
+                        help="the revision to compare with")
+    args = parser.parse_args()
+
+    before = load_products(args.before)
+    pairs = [
+        ("Product", products.Product, before.Product, {}),
+        ("LimitedProduct", products.LimitedProduct, before.LimitedProduct,
+         {"maximum": 1}),
+    ]
+    for label, slotted, with_dict, kwargs in pairs:
+        print(f"{label}")
+        slotted_bytes = measure_memory(slotted, args.products, **kwargs)
+        dict_bytes = measure_memory(with_dict, args.products, **kwargs)
+        print(f"  bytes/product   slots {slotted_bytes:8.0f}"
+              f"   __dict__ {dict_bytes:8.0f}")
+        slotted_times = measure_access(slotted, **kwargs)
+        dict_times = measure_access(with_dict, **kwargs)
+        for operation, nanoseconds in slotted_times.items():
+            print(f"  {operation:<15} slots {nanoseconds:6.0f} ns"
+                  f"   __dict__ {dict_times[operation]:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
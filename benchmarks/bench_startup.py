@@ -0,0 +1,92 @@
+"""
+Startup time of main.py (import, load the catalog, show the total
+amount) for growing snapshot catalogs, against eagerly rebuilding every
+Product with Store.load.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py --sizes 1000 100000 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import columnar_store  # noqa: E402
+import products  # noqa: E402
+
+# Each run happens in a fresh interpreter, timing everything from the
+# import of main to the first total quantity.
+LAZY = """
+import time
+start = time.perf_counter()
+import main
+main.configure({path!r})
+main.get_store().get_total_quantity()
+print(time.perf_counter() - start)
+"""
+
+EAGER = """
+import time
+start = time.perf_counter()
+import store
+store.Store.load({path!r}).get_total_quantity()
+print(time.perf_counter() - start)
+"""
+
+
+def write_catalog(path, size):
+    """
+    Writes a snapshot of size products.
+    """
+    catalog = columnar_store.ColumnarStore()
+    for i in range(size):
+        catalog.add_product(
+            products.Product.restore(f"Product {i}", 10.0, 100)
+        )
+    catalog.save(path)
+
+
+def time_startup(code, path, repeat):
+    """
+    Returns the best startup time (seconds) of repeat fresh interpreters.
+    """
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code.format(path=path)],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout
+        times.append(float(output))
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--eager", action="store_true",
+                        help="also time Store.load (slow on big catalogs)")
+    args = parser.parse_args()
+
+    print(f"{'products':>10}{'lazy (ms)':>12}"
+          + (f"{'Store.load (ms)':>18}" if args.eager else ""))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"catalog-{size}.snap")
+            write_catalog(path, size)
+            line = (f"{size:>10,}"
+                    f"{time_startup(LAZY, path, args.repeat) * 1000:>12.2f}")
+            if args.eager:
+                eager = time_startup(EAGER, path, args.repeat)
+                line += f"{eager * 1000:>18.2f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
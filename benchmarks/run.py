@@ -0,0 +1,251 @@
+"""
+Benchmark suite for the order, pricing and catalog hot paths, with
+regression checks against a stored baseline.
+
+Every case runs against synthetic catalogs of each size, mixing stocked,
+non-stocked and limited products, a third of them with a promotion.
+Results are written as JSON (nanoseconds per operation, keyed by
+"case@size").
+
+Run from the repository root:
+
+    python benchmarks/run.py --save-baseline baseline.json
+    python benchmarks/run.py --baseline baseline.json --threshold 0.2
+
+The second run exits with status 1 if any case got slower than the
+baseline by more than the threshold (20%).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import products  # noqa: E402
+import store  # noqa: E402
+
+DEFAULT_SIZES = (10, 1000, 100000, 1000000)
+STOCK = 10 ** 12
+MAXIMUM = 5
+# Random picks are drawn ahead of time and cycled through, so the cases
+# do not time the random number generator.
+PICKS = 4096
+
+
+def build_catalog(size, seed=0):
+    """
+    Builds a synthetic catalog: 80% stocked products, 10% non-stocked,
+    10% limited, and one product out of three with a promotion. Stocks
+    are large enough never to run out during a benchmark.
+
+    :param size: int - The number of products.
+    :param seed: int - The random seed.
+    :return: list - The products.
+    """
+    rng = random.Random(seed)
+    promotions = [
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        products.SecondHalfPrice("Second Half price!"),
+        products.ThirdOneFree("Third One Free!"),
+        products.PercentDiscount("30% off!", percent=30),
+    ]
+    product_list = []
+    for i in range(size):
+        price = round(rng.uniform(1, 2000), 2)
+        promotion = rng.choice(promotions)
+        kind = rng.random()
+        if kind < 0.1:
+            product = products.NonStockedProduct.restore(
+                f"Product {i}", price, 0, promotion=promotion
+            )
+        elif kind < 0.2:
+            product = products.LimitedProduct.restore(
+                f"Product {i}", price, STOCK, promotion=promotion,
+                maximum=MAXIMUM,
+            )
+        else:
+            product = products.Product.restore(
+                f"Product {i}", price, STOCK, promotion=promotion
+            )
+        product_list.append(product)
+    return product_list
+
+
+def order_mix(product_list, rng, lines):
+    """
+    Returns PICKS random shopping lists of the given number of lines,
+    with quantities every product kind accepts.
+    """
+    lines = min(lines, len(product_list))
+    return [
+        [(product, rng.randint(1, MAXIMUM))
+         for product in rng.sample(product_list, lines)]
+        for _ in range(PICKS)
+    ]
+
+
+def make_cases(best_buy, product_list, rng):
+    """
+    Returns the benchmark cases for a store: name -> function running
+    one operation.
+    """
+    singles = itertools.cycle(
+        [rng.choice(product_list) for _ in range(PICKS)]
+    )
+    single_orders = itertools.cycle(order_mix(product_list, rng, 1))
+    basket_orders = itertools.cycle(order_mix(product_list, rng, 5))
+    promoted = [
+        product for product in product_list if product.promotion
+    ] or product_list
+    priced = itertools.cycle([
+        [(product, rng.randint(1, 50))
+         for product in rng.sample(promoted, min(5, len(promoted)))]
+        for _ in range(PICKS)
+    ])
+    removals = itertools.cycle(
+        [rng.choice(product_list) for _ in range(PICKS)]
+    )
+
+    def buy():
+        next(singles).buy(1)
+
+    def order_single():
+        best_buy.order(next(single_orders))
+
+    def order_basket():
+        best_buy.order(next(basket_orders))
+
+    def price_basket():
+        best_buy.price_order(next(priced))
+
+    def remove_and_add_product():
+        product = next(removals)
+        best_buy.remove_product(product)
+        best_buy.add_product(product)
+
+    return {
+        "product_buy": buy,
+        "order_1_line": order_single,
+        "order_5_lines": order_basket,
+        "get_all_products": best_buy.get_all_products,
+        "get_total_quantity": best_buy.get_total_quantity,
+        "remove_add_product": remove_and_add_product,
+        "promotion_pricing": price_basket,
+    }
+
+
+def measure(function, repeat):
+    """
+    Times a function like timeit does: picks a number of calls taking at
+    least 0.2 seconds, then keeps the best of repeat runs.
+
+    :return: tuple - Nanoseconds per call and the number of calls per run.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number))
+    return best / number * 1e9, number
+
+
+def run(sizes, repeat, cases=None, seed=0):
+    """
+    Runs the benchmark cases at every catalog size.
+
+    :param sizes: iterable - The catalog sizes.
+    :param repeat: int - The number of timed runs per case.
+    :param cases: iterable - The names of the cases to run (all if None).
+    :param seed: int - The random seed.
+    :return: dict - The results, JSON serializable.
+    """
+    results = {}
+    for size in sizes:
+        rng = random.Random(seed)
+        product_list = build_catalog(size, seed)
+        best_buy = store.Store(list(product_list))
+        for name, function in make_cases(best_buy, product_list,
+                                         rng).items():
+            if cases is not None and name not in cases:
+                continue
+            nanoseconds, number = measure(function, repeat)
+            results[f"{name}@{size}"] = {
+                "ns_per_op": round(nanoseconds, 1),
+                "number": number,
+            }
+            print(f"{name:>20}{size:>10,}{nanoseconds / 1000:>14.3f} us",
+                  file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compares results with a baseline.
+
+    :param current: dict - The results of run.
+    :param baseline: dict - The results of an earlier run.
+    :param threshold: float - The tolerated slowdown (0.2 = 20%).
+    :return: list - Tuples (case, baseline ns, current ns) of the cases
+    slower than the baseline by more than the threshold.
+    """
+    regressions = []
+    for case, result in current["results"].items():
+        previous = baseline["results"].get(case)
+        if previous is None:
+            continue
+        if result["ns_per_op"] > previous["ns_per_op"] * (1 + threshold):
+            regressions.append(
+                (case, previous["ns_per_op"], result["ns_per_op"])
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=list(DEFAULT_SIZES))
+    parser.add_argument("--cases", nargs="+",
+                        help="only run these cases")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--save-baseline",
+                        help="write the results as the new baseline")
+    parser.add_argument("--baseline", help="compare with this baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    current = run(args.sizes, args.repeat, args.cases, args.seed)
+    text = json.dumps(current, indent=2, sort_keys=True)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as results_file:
+                results_file.write(text + "\n")
+    if not args.output:
+        print(text)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(current, baseline, args.threshold)
+        for case, before, after in regressions:
+            print(f"REGRESSION {case}: {before:,.0f} ns -> {after:,.0f} ns "
+                  f"({after / before - 1:+.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import threading
+import time
+
+import store as store_module
+
+# Default lifetime (in seconds) of the holds of an idle cart.
+DEFAULT_TTL = 15 * 60
+
+OPEN = "open"
+CHECKED_OUT = "checked out"
+EXPIRED = "expired"
+ABANDONED = "abandoned"
+
+
+class Cart:
+    """
+    The Cart class holds the quantities a shopper put aside. The held
+    stock cannot be bought by anyone else until the cart is checked out,
+    abandoned, or expires (ttl seconds after it was last changed).
+    """
+
+    def __init__(self, cart_id, expires_at):
+        """
+        Initiator (constructor) method.
+
+        :param cart_id: int - The id of the cart.
+        :param expires_at: float - When the holds expire (clock time).
+        """
+        self.id = cart_id
+        self.expires_at = expires_at
+        self.state = OPEN
+        self._lines = {}
+
+    @property
+    def shopping_list(self):
+        """
+        Returns the held quantities as a shopping list.
+
+        :return: list - Tuples of a Product and a quantity.
+        """
+        return [(product, quantity)
+                for product, quantity in self._lines.values()]
+
+    def held(self, product):
+        """
+        Returns the quantity of a product held by the cart.
+
+        :param product: Product - The product.
+        :return: int - The held quantity.
+        """
+        line = self._lines.get(id(product))
+        return line[1] if line else 0
+
+
+class CartManager:
+    """
+    The CartManager class puts stock aside for shopping carts with
+    Product.reserve, so that what a shopper sees as available is still
+    there at checkout, without holding any lock during the session.
+
+    Holds expire ttl seconds after their cart was last changed. Expiry
+    times are kept in a heap: every operation first frees the holds of
+    all the carts that expired, in one pass, and start runs the same
+    sweep from a background thread. A cart pushes a new heap entry when
+    its expiry moves; outdated entries are skipped when they come up.
+    """
+
+    def __init__(self, store, ttl=DEFAULT_TTL, clock=time.monotonic):
+        """
+        Initiator (constructor) method.
+
+        :param store: Store - The store the carts buy from.
+        :param ttl: float - The lifetime (in seconds) of idle holds.
+        :param clock: callable - The clock (seconds), for tests.
+        """
+        if ttl <= 0:
+            raise ValueError("The TTL has to be greater than zero.")
+        self.store = store
+        self.ttl = ttl
+        self.clock = clock
+        self._carts = {}
+        self._expiries = []
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._stop = None
+
+    def open_cart(self):
+        """
+        Creates an empty cart.
+
+        :return: Cart - The new cart.
+        """
+        with self._lock:
+            self.expire_due()
+            cart = Cart(next(self._ids), self.clock() + self.ttl)
+            self._carts[cart.id] = cart
+            heapq.heappush(self._expiries, (cart.expires_at, cart.id))
+            return cart
+
+    def _touch(self, cart):
+        """
+        Pushes back the expiry of a cart.
+        """
+        cart.expires_at = self.clock() + self.ttl
+        heapq.heappush(self._expiries, (cart.expires_at, cart.id))
+
+    def _check_open(self, cart):
+        """
+        Raises an exception if the cart can no longer be changed.
+        """
+        self.expire_due()
+        if cart.state != OPEN:
+            raise ValueError(f"The cart is {cart.state}.")
+
+    def hold(self, cart, product, quantity):
+        """
+        Puts a quantity of a product aside in a cart (see Store.hold).
+        Raises the same exceptions as Product.buy, the limit of the
+        product applying to the quantity already held plus the new one,
+        in which case nothing changes.
+
+        :param cart: Cart - The cart.
+        :param product: Product - The product.
+        :param quantity: int - The quantity to add to the cart.
+        """
+        with self._lock:
+            self._check_open(cart)
+            held = cart.held(product)
+            self.store.hold(product, quantity, held)
+            cart._lines[id(product)] = [product, held + quantity]
+            self._touch(cart)
+
+    def remove(self, cart, product, quantity=None):
+        """
+        Gives back (part of) the quantity of a product held by a cart.
+
+        :param cart: Cart - The cart.
+        :param product: Product - The product.
+        :param quantity: int - The quantity to give back (all if None).
+        """
+        with self._lock:
+            self._check_open(cart)
+            held = cart.held(product)
+            if quantity is None or quantity >= held:
+                quantity = held
+                cart._lines.pop(id(product), None)
+            else:
+                cart._lines[id(product)][1] = held - quantity
+            if quantity:
+                self.store.release([(product, quantity)])
+            self._touch(cart)
+
+    def checkout(self, cart):
+        """
+        Buys everything held by a cart and returns the total price.
+        The stock was put aside when it was held, so checkout cannot
+        run out of stock.
+
+        :param cart: Cart - The cart.
+        :return: float - The total price of the order.
+        """
+        with self._lock:
+            self._check_open(cart)
+            shopping_list = cart.shopping_list
+            reservation = store_module.Reservation(
+                self.store, shopping_list,
+                [[product, quantity] for product, quantity in shopping_list],
+            )
+            total = reservation.commit()
+            cart.state = CHECKED_OUT
+            del self._carts[cart.id]
+            return total
+
+    def abandon(self, cart):
+        """
+        Gives back everything held by a cart.
+
+        :param cart: Cart - The cart.
+        """
+        with self._lock:
+            self._check_open(cart)
+            self._free(cart, ABANDONED)
+
+    def _free(self, cart, state):
+        """
+        Releases the holds of a cart and closes it.
+        """
+        self.store.release(cart.shopping_list)
+        cart._lines.clear()
+        cart.state = state
+        del self._carts[cart.id]
+
+    def expire_due(self):
+        """
+        Frees the holds of every cart whose TTL has run out.
+
+        :return: int - The number of expired carts.
+        """
+        with self._lock:
+            now = self.clock()
+            expired = 0
+            expiries = self._expiries
+            while expiries and expiries[0][0] <= now:
+                expires_at, cart_id = heapq.heappop(expiries)
+                cart = self._carts.get(cart_id)
+                if cart is None or cart.expires_at != expires_at:
+                    continue
+                self._free(cart, EXPIRED)
+                expired += 1
+            return expired
+
+    def available(self, product):
+        """
+        Returns the quantity of a product that can still be put in a
+        cart: its quantity minus everything held.
+
+        :param product: Product - The product.
+        :return: int - The available quantity.
+        """
+        self.expire_due()
+        return product.get_available()
+
+    def start(self, interval=1.0):
+        """
+        Starts a background thread expiring carts every interval seconds.
+
+        :param interval: float - The time between two sweeps.
+        """
+        if self._stop is not None:
+            raise RuntimeError("The expiry thread is already running.")
+        self._stop = threading.Event()
+        stop = self._stop
+
+        def sweep():
+            while not stop.wait(interval):
+                self.expire_due()
+        threading.Thread(target=sweep, daemon=True).start()
+
+    def stop(self):
+        """
+        Stops the background expiry thread.
+        """
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
@@ -0,0 +1,214 @@
+import csv
+import json
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import products
+import store as store_module
+
+KINDS = ("stocked", "non_stocked", "limited")
+
+ImportResult = namedtuple("ImportResult", ["store", "imported", "errors"])
+
+
+def _parse_number(text):
+    """
+    Converts a CSV field to an int or a float when it holds a number,
+    leaving it untouched otherwise (so that validation rejects it).
+    """
+    if not isinstance(text, str):
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def iter_rows(path):
+    """
+    Streams the rows of a catalog file, one at a time.
+    JSONL files hold one JSON object per line; CSV files have a header
+    line. Rows have the fields name, price, quantity and optionally
+    kind (stocked, non_stocked or limited), maximum and promotion.
+
+    :param path: str - The path of a .jsonl or .csv file.
+    :return: generator - Tuples (line number, row dict); a row that
+    cannot be parsed is yielded as its error message instead.
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    with open(path, newline="", encoding="utf-8") as catalog_file:
+        if extension == ".csv":
+            reader = csv.DictReader(catalog_file)
+            for row in reader:
+                for field in ("price", "quantity", "maximum"):
+                    if row.get(field) not in (None, ""):
+                        row[field] = _parse_number(row[field])
+                yield reader.line_num, row
+        elif extension in (".jsonl", ".json"):
+            for line_number, line in enumerate(catalog_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield line_number, f"Invalid JSON: {error.msg}."
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, "Row has to be a JSON object."
+                    continue
+                yield line_number, row
+        else:
+            raise ValueError(f"Unsupported catalog format {extension}.")
+
+
+def chunked(iterable, size):
+    """
+    Groups an iterable into lists of at most size items.
+
+    :param iterable: iterable - The items to group.
+    :param size: int - The maximum size of a chunk.
+    :return: generator - The chunks.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_row(row):
+    """
+    Validates a catalog row with the rules of the Product classes.
+
+    :param row: dict - The row to validate.
+    :return: tuple - (kind, name, price, quantity, maximum, promotion).
+    """
+    kind = row.get("kind") or "stocked"
+    if kind not in KINDS:
+        raise ValueError(f"Unknown product kind {kind}.")
+    name = row.get("name")
+    price = row.get("price")
+    quantity = 0 if kind == "non_stocked" else row.get("quantity", 0)
+    products.validate_product(name, price, quantity)
+    maximum = row.get("maximum")
+    if kind == "limited":
+        if not isinstance(maximum, int):
+            raise TypeError("Maximum has to be an integer.")
+        if maximum <= 0:
+            raise ValueError("Maximum has to be greater than zero.")
+    return kind, name, float(price), quantity, maximum, row.get("promotion")
+
+
+def validate_chunk(chunk):
+    """
+    Validates a chunk of rows. Runs in the worker processes.
+
+    :param chunk: list - Tuples (line number, row dict or error message).
+    :return: tuple - The list of (line number, validated row) and the
+    list of (line number, error message).
+    """
+    valid = []
+    errors = []
+    for line_number, row in chunk:
+        if isinstance(row, str):
+            errors.append((line_number, row))
+            continue
+        try:
+            valid.append((line_number, validate_row(row)))
+        except (TypeError, ValueError) as error:
+            errors.append((line_number, str(error)))
+    return valid, errors
+
+
+def _validated_chunks(chunks, workers):
+    """
+    Validates chunks in a process pool, keeping at most two chunks per
+    worker in flight so that memory stays bounded, and yields the
+    results in file order.
+    """
+    if not workers:
+        for chunk in chunks:
+            yield validate_chunk(chunk)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(validate_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def import_catalog(path, target=None, promotions=None, chunk_size=10000,
+                   workers=None, **kwargs):
+    """
+    Imports a supplier catalog file into a store. The file is streamed in
+    chunks, each chunk is validated in a process pool and its products
+    are added to the store in one go (Store.add_products) as soon as it
+    is validated. Bad rows (and duplicate names) are reported with their
+    line number and skipped.
+
+    :param path: str - The path of a .jsonl or .csv catalog file.
+    :param target: Store - The store to add the products to; a new store
+    is created if omitted.
+    :param promotions: dict - Promotion name -> Promotion, used for the
+    promotion field of the rows.
+    :param chunk_size: int - The number of rows per chunk.
+    :param workers: int - The number of worker processes (default: the
+    number of CPUs); 0 validates in the current process.
+    :param kwargs: Other arguments of the Store constructor.
+    :return: ImportResult - The store, the number of imported products
+    and the list of (line number, error message).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    promotions = promotions or {}
+    restore = {
+        "stocked": products.Product.restore,
+        "non_stocked": products.NonStockedProduct.restore,
+        "limited": products.LimitedProduct.restore,
+    }
+    imported = 0
+    errors = []
+    chunks = chunked(iter_rows(path), chunk_size)
+    for valid, chunk_errors in _validated_chunks(chunks, workers):
+        errors.extend(chunk_errors)
+        # Duplicates are reported here, line by line, so that the rest
+        # of the chunk can be added in one go.
+        new_products = []
+        names = set()
+        for line_number, (kind, name, price, quantity, maximum,
+                          promotion_name) in valid:
+            promotion = None
+            if promotion_name:
+                promotion = promotions.get(promotion_name)
+                if promotion is None:
+                    errors.append((line_number,
+                                   f"Unknown promotion {promotion_name}."))
+                    continue
+            attributes = {"maximum": maximum} if kind == "limited" else {}
+            if name in names or (target is not None and name in target):
+                errors.append((line_number,
+                               f"{name} is already in the store."))
+                continue
+            names.add(name)
+            new_products.append(restore[kind](
+                name, price, quantity, promotion=promotion, **attributes
+            ))
+        if not new_products:
+            continue
+        if target is None:
+            target = store_module.Store(new_products, **kwargs)
+        else:
+            target.add_products(new_products)
+        imported += len(new_products)
+    errors.sort()
+    return ImportResult(target, imported, errors)
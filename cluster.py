@@ -0,0 +1,249 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import store as store_module
+
+
+def shard_key(name, shard_count):
+    """
+    Returns the shard owning a product name when products are sharded
+    by name hash. CRC32 is stable across processes and runs, unlike hash.
+
+    :param name: str - The name of the product.
+    :param shard_count: int - The number of shards.
+    :return: int - The index of the shard.
+    """
+    return zlib.crc32(name.encode("utf-8")) % shard_count
+
+
+class StoreCluster:
+    """
+    The StoreCluster class runs many stores (shards) as one inventory:
+    either products sharded by name hash over identical stores
+    (from_products), or one store per location (by_location), where the
+    same product name may be stocked at several locations.
+
+    Orders are routed to the shards owning their products. An order
+    spanning several shards is reserved on every shard first, then
+    committed everywhere, so it goes through entirely or not at all,
+    like Store.order. Cluster-wide aggregates are computed on
+    every shard in parallel by a thread pool.
+    """
+
+    def __init__(self, shards, max_workers=None):
+        """
+        Initiator (constructor) method.
+
+        :param shards: dict - Shard key (an index or a location) -> Store.
+        :param max_workers: int - The size of the aggregate query pool
+        (default: one thread per shard).
+        """
+        if not shards:
+            raise ValueError("A cluster needs at least one store.")
+        self.shards = dict(shards)
+        self._hashed = False
+        self._shard_count = len(self.shards)
+        self._store_kwargs = {}
+        self._locations = {}
+        for key, shard in self.shards.items():
+            for product in shard.list_products:
+                self._locations.setdefault(product.name, []).append(key)
+        self._pool = ThreadPoolExecutor(max_workers or len(self.shards))
+
+    @classmethod
+    def from_products(cls, product_list, shard_count, **kwargs):
+        """
+        Creates a cluster of shard_count stores, each product going to
+        the shard of its name hash (see shard_key).
+
+        :param product_list: list - The products of the cluster.
+        :param shard_count: int - The number of shards.
+        :param kwargs: Other arguments of the Store constructor.
+        :return: StoreCluster - The cluster.
+        """
+        if shard_count <= 0:
+            raise ValueError("The shard count has to be greater than zero.")
+        parts = [[] for _ in range(shard_count)]
+        for product in product_list:
+            parts[shard_key(product.name, shard_count)].append(product)
+        cluster = cls({
+            key: store_module.Store(part, **kwargs)
+            for key, part in enumerate(parts) if part
+        })
+        cluster._hashed = True
+        cluster._shard_count = shard_count
+        cluster._store_kwargs = kwargs
+        return cluster
+
+    @classmethod
+    def by_location(cls, stores, max_workers=None):
+        """
+        Creates a cluster of one store per location.
+
+        :param stores: dict - Location -> Store.
+        :param max_workers: int - The size of the aggregate query pool.
+        :return: StoreCluster - The cluster.
+        """
+        return cls(stores, max_workers)
+
+    def close(self):
+        """
+        Shuts the aggregate query pool down.
+        """
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def shard_of(self, product):
+        """
+        Returns the key of the shard holding a product.
+        Raises an exception if no shard holds it.
+
+        :param product: Product - The Product object.
+        :return: The shard key.
+        """
+        for key in self._locations.get(product.name, ()):
+            if product in self.shards[key]:
+                return key
+        raise KeyError(f"{product.name} is not in the cluster.")
+
+    def get_product(self, name, location=None):
+        """
+        Returns the product with the given name.
+        Raises an exception if there is no such product in the cluster.
+
+        :param name: str - The name of the product.
+        :param location: The shard key to look in (for clusters by
+        location stocking the product at several locations).
+        :return: Product - The Product object with the given name.
+        """
+        keys = self._locations.get(name, ())
+        if location is not None:
+            keys = [key for key in keys if key == location]
+        if not keys:
+            raise KeyError(f"{name} is not in the cluster.")
+        return self.shards[keys[0]].get_product(name)
+
+    def add_product(self, product, location=None):
+        """
+        Adds a product to its shard: the shard of its name hash, or the
+        given location.
+
+        :param product: Product - The Product object to add.
+        :param location: The shard key (for clusters by location).
+        """
+        if self._hashed:
+            location = shard_key(product.name, self._shard_count)
+            if location not in self.shards:
+                self.shards[location] = store_module.Store(
+                    [product], **self._store_kwargs
+                )
+                self._locations.setdefault(product.name, []).append(location)
+                return
+        elif location not in self.shards:
+            raise KeyError(f"Unknown location {location}.")
+        self.shards[location].add_product(product)
+        self._locations.setdefault(product.name, []).append(location)
+
+    def remove_product(self, product):
+        """
+        Removes a product from the shard holding it.
+
+        :param product: Product - The Product object to remove.
+        """
+        try:
+            key = self.shard_of(product)
+        except KeyError:
+            return
+        self.shards[key].remove_product(product)
+        keys = self._locations[product.name]
+        keys.remove(key)
+        if not keys:
+            del self._locations[product.name]
+
+    def order(self, shopping_list):
+        """
+        Processes an order over the shards holding its products
+        and returns the total price of the order.
+
+        :param shopping_list: list - A list of tuples where
+        each tuple contains a Product object and the desired quantity.
+        :return: float - The total price of the order.
+        """
+        parts = {}
+        for product, quantity in shopping_list:
+            parts.setdefault(self.shard_of(product), []).append(
+                (product, quantity)
+            )
+        if len(parts) == 1:
+            key, part = parts.popitem()
+            return self.shards[key].order(part)
+        reservations = []
+        try:
+            for key, part in parts.items():
+                reservations.append(self.shards[key].reserve(part))
+        except (TypeError, ValueError):
+            for reservation in reservations:
+                reservation.release()
+            raise
+        return sum(reservation.commit() for reservation in reservations)
+
+    def _map(self, function):
+        """
+        Calls function on every shard, in parallel when there are several.
+
+        :return: list - The results, in shard order.
+        """
+        if len(self.shards) == 1:
+            return [function(shard) for shard in self.shards.values()]
+        return list(self._pool.map(function, self.shards.values()))
+
+    def get_total_quantity(self):
+        """
+        Returns the total quantity of items over all shards.
+
+        :return: int - The total quantity of items.
+        """
+        return sum(self._map(store_module.Store.get_total_quantity))
+
+    def get_all_products(self):
+        """
+        Returns the active products of all shards, shard by shard.
+
+        :return: list - A list of Product objects.
+        """
+        all_products = []
+        for shard_products in self._map(store_module.Store.get_all_products):
+            all_products += shard_products
+        return all_products
+
+    def quantities_by_shard(self):
+        """
+        Returns the total quantity of items of each shard.
+
+        :return: dict - Shard key -> total quantity.
+        """
+        return dict(zip(self.shards,
+                        self._map(store_module.Store.get_total_quantity)))
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards.values())
+
+    def __contains__(self, item):
+        """
+        Checks whether a product (or a product name) is in the cluster.
+
+        :param item: Product or str - The Product object or its name.
+        :return: bool - True if the product is in the cluster.
+        """
+        if isinstance(item, str):
+            return item in self._locations
+        try:
+            self.shard_of(item)
+        except KeyError:
+            return False
+        return True
@@ -0,0 +1,612 @@
+from array import array
+
+import products
+import snapshot
+
+KIND_STOCKED = 0
+KIND_NON_STOCKED = 1
+KIND_LIMITED = 2
+
+NO_PROMOTION = -1
+
+
+class ProductView:
+    """
+    Lightweight, Product-compatible view of one row of a ColumnarStore.
+    It holds no data of its own: every attribute is read from and written
+    to the columns of the store, so views are cheap to hand out and always
+    reflect the current state of the catalog.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        """
+        Initiator (constructor) method.
+
+        :param store: ColumnarStore - The store holding the product data.
+        :param row: int - The row of the product in the store columns.
+        """
+        self._store = store
+        self._row = row
+
+    @property
+    def name(self):
+        return self._store._names[self._row]
+
+    @property
+    def price(self):
+        return self._store._prices[self._row]
+
+    @price.setter
+    def price(self, value):
+        self._store.bulk_set_price([self._row], value)
+
+    @property
+    def quantity(self):
+        return self._store._quantities[self._row]
+
+    @quantity.setter
+    def quantity(self, value):
+        store = self._store
+        if store._kinds[self._row] == KIND_NON_STOCKED:
+            raise AttributeError(
+                "NonStockedProduct quantity cannot be modified."
+            )
+        if value < 0:
+            raise ValueError("Product quantity cannot be negative.")
+        if not isinstance(value, int):
+            raise TypeError("Quantity has to be an integer.")
+        store._total_quantity += value - store._quantities[self._row]
+        store._quantities[self._row] = value
+        if value == 0:
+            self.deactivate()
+
+    @property
+    def maximum(self):
+        return self._store._maximums[self._row]
+
+    @property
+    def active(self):
+        return bool(self._store._active[self._row])
+
+    @active.setter
+    def active(self, value):
+        self._store._active[self._row] = 1 if value else 0
+
+    @property
+    def promotion(self):
+        promotion_id = self._store._promotion_ids[self._row]
+        if promotion_id == NO_PROMOTION:
+            return None
+        return self._store._promotions[promotion_id]
+
+    @promotion.setter
+    def promotion(self, value):
+        if not isinstance(value, products.Promotion) and value is not None:
+            raise TypeError("Promotion has to be of type Promotion or None.")
+        self._store._promotion_ids[self._row] = (
+            self._store._promotion_id(value)
+        )
+
+    def get_quantity(self):
+        """
+        Getter function for quantity.
+
+        :return: int - The quantity of the product.
+        """
+        return self.quantity
+
+    def get_available(self):
+        """
+        Returns the quantity that can still be bought (columnar stores
+        hold no reservations, so this is the quantity).
+
+        :return: int - The available quantity.
+        """
+        return self.quantity
+
+    def is_active(self):
+        """
+        Getter function for active status.
+
+        :return: bool - The active status of the product.
+        """
+        return self.active
+
+    def activate(self):
+        """
+        Activates the product by setting active to True.
+        """
+        self.active = True
+
+    def deactivate(self):
+        """
+        Deactivates the product by setting active to False.
+        """
+        self.active = False
+
+    def set_promotion(self, promotion):
+        """
+        Sets the promotion for the product.
+
+        :param promotion: Promotion - The promotion to apply to the product.
+        """
+        self.promotion = promotion
+
+    def check_stock(self, value):
+        """
+        Raises an exception if value exceeds the available stock.
+
+        :param value: int - The quantity to check.
+        """
+        if (
+            self._store._kinds[self._row] != KIND_NON_STOCKED
+            and value > self.quantity
+        ):
+            raise ValueError("Not enough stock available.")
+
+    def check_purchase(self, value):
+        """
+        Validates the purchase of a given quantity, with the same rules
+        as the Product class matching the kind of the row.
+
+        :param value: int - The quantity to buy.
+        """
+        _CHECK_BY_KIND[self._store._kinds[self._row]](self, value)
+
+    def remove_stock(self, value):
+        """
+        Removes a given (already validated) quantity from the stock.
+
+        :param value: int - The quantity to remove.
+        """
+        if self._store._kinds[self._row] != KIND_NON_STOCKED:
+            self.quantity -= value
+
+    def _total_price(self, value):
+        """
+        Returns the total price of a given quantity,
+        with the promotion of the product applied.
+
+        :param value: int - The quantity to price.
+        :return: float - The total price.
+        """
+        promotion = self.promotion
+        if promotion:
+            return promotion.apply_promotion(self, value)
+        return self.price * value
+
+    def quote(self, value):
+        """
+        Returns the price of a given quantity without buying anything.
+
+        :param value: int - The quantity to price.
+        :return: float - The total price.
+        """
+        return products.Product.quote(self, value)
+
+    def buy(self, value):
+        """
+        Buys a given quantity of the product, with the same rules
+        as the Product class matching the kind of the row.
+
+        :param value: int - The quantity to buy.
+        :return: float - The total price of the purchase.
+        """
+        return _BUY_BY_KIND[self._store._kinds[self._row]](self, value)
+
+    def to_product(self):
+        """
+        Materializes the row as a standalone Product object.
+
+        :return: Product - A new Product (or subclass) instance.
+        """
+        kind = self._store._kinds[self._row]
+        if kind == KIND_NON_STOCKED:
+            product = products.NonStockedProduct(self.name, self.price)
+        elif kind == KIND_LIMITED:
+            product = products.LimitedProduct(
+                self.name, self.price, self.quantity, self.maximum
+            )
+        else:
+            product = products.Product(self.name, self.price, self.quantity)
+        product.active = self.active
+        product.promotion = self.promotion
+        return product
+
+    def __str__(self):
+        """
+        Prints the product details (name, price, quantity, promotion).
+        """
+        return (
+            f"Name: {self.name}, Price: {self.price}, "
+            f"Quantity: {self.quantity}, Promotion: {self.promotion}"
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ProductView)
+            and other._store is self._store
+            and other._row == self._row
+        )
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+    def __lt__(self, other):
+        """
+        <  (less than)
+        """
+        return self.price < other.price
+
+    def __gt__(self, other):
+        """
+        > (greater than)
+        """
+        return self.price > other.price
+
+
+_CHECK_BY_KIND = {
+    KIND_STOCKED: products.Product.check_purchase,
+    KIND_NON_STOCKED: products.NonStockedProduct.check_purchase,
+    KIND_LIMITED: products.LimitedProduct.check_purchase,
+}
+
+_BUY_BY_KIND = {
+    KIND_STOCKED: products.Product.buy,
+    KIND_NON_STOCKED: products.NonStockedProduct.buy,
+    KIND_LIMITED: products.LimitedProduct.buy,
+}
+
+
+class ColumnarStore:
+    """
+    The ColumnarStore class is a memory-compact alternative to Store for
+    very large catalogs. Instead of one Product object per item it keeps
+    names, prices, quantities, active flags, product kinds, limits and
+    promotion ids in parallel columns (array.array), and runs bulk
+    repricing and restocking directly on those columns.
+
+    Code that expects Product objects gets ProductView instances, which
+    read and write the columns in place.
+
+    A store loaded from a snapshot works directly on the memory-mapped
+    columns of the file; they are only copied into growable arrays when
+    a product is added, and the name index is only built when a product
+    is first looked up by name.
+    """
+
+    def __init__(self, list_products=None):
+        """
+        Initiator (constructor) method.
+
+        :param list_products: list - Optional Product objects
+        to load into the store.
+        """
+        self._names = []
+        self._rows = {}
+        self._prices = array("d")
+        self._quantities = array("q")
+        self._maximums = array("q")
+        self._promotion_ids = array("i")
+        self._kinds = array("b")
+        self._active = array("b")
+        self._promotions = []
+        self._promotion_ids_by_object = {}
+        self._total_quantity = 0
+        for product in list_products or ():
+            self.add_product(product)
+
+    def _promotion_id(self, promotion):
+        """
+        Returns the id of a promotion in the promotion table,
+        adding it to the table the first time it is seen.
+
+        :param promotion: Promotion or None - The promotion.
+        :return: int - The promotion id (NO_PROMOTION for None).
+        """
+        if promotion is None:
+            return NO_PROMOTION
+        promotion_id = self._promotion_ids_by_object.get(id(promotion))
+        if promotion_id is None:
+            promotion_id = len(self._promotions)
+            self._promotions.append(promotion)
+            self._promotion_ids_by_object[id(promotion)] = promotion_id
+        return promotion_id
+
+    def add_product(self, product):
+        """
+        Adds a product to the store, copying its data into the columns.
+        Raises an exception if a product with the same name
+        is already in the store.
+
+        :param product: Product - The Product object to add to the store.
+        :return: ProductView - The view of the new row.
+        """
+        if product.name in self._name_index():
+            raise ValueError(f"{product.name} is already in the store.")
+        self._make_growable()
+        if isinstance(product, products.NonStockedProduct):
+            kind, maximum = KIND_NON_STOCKED, 0
+        elif isinstance(product, products.LimitedProduct):
+            kind, maximum = KIND_LIMITED, product.maximum
+        else:
+            kind, maximum = KIND_STOCKED, 0
+        row = len(self._names)
+        self._rows[product.name] = row
+        self._names.append(product.name)
+        self._prices.append(product.price)
+        self._quantities.append(product.quantity)
+        self._maximums.append(maximum)
+        self._promotion_ids.append(self._promotion_id(product.promotion))
+        self._kinds.append(kind)
+        self._active.append(1 if product.is_active() else 0)
+        self._total_quantity += product.quantity
+        return ProductView(self, row)
+
+    def _name_index(self):
+        """
+        Returns the name -> row index, building it on first use.
+
+        :return: dict - The row of every product name.
+        """
+        if self._rows is None:
+            self._rows = {name: row for row, name in enumerate(self._names)}
+        return self._rows
+
+    def _make_growable(self):
+        """
+        Copies memory-mapped columns into arrays so that rows can be
+        appended to them.
+        """
+        if isinstance(self._names, list):
+            return
+        self._names = list(self._names)
+        for name, typecode in snapshot.COLUMNS:
+            column = array(typecode)
+            column.frombytes(getattr(self, "_" + name).cast("B"))
+            setattr(self, "_" + name, column)
+
+    def save(self, path, journal_sequence=0):
+        """
+        Saves the store to a snapshot file (see the snapshot module).
+
+        :param path: str - The path of the snapshot file.
+        :param journal_sequence: int - The sequence number of the last
+        journaled order reflected in the store.
+        """
+        snapshot.save_columns(
+            path,
+            self._names,
+            {
+                name: getattr(self, "_" + name)
+                for name, _ in snapshot.COLUMNS
+            },
+            self._promotions,
+            self._total_quantity,
+            journal_sequence,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a store from a snapshot file. The file is memory-mapped,
+        so loading takes the same time whatever the catalog size.
+
+        :param path: str - The path of the snapshot file.
+        :return: ColumnarStore - The loaded store.
+        """
+        columns = snapshot.load_columns(path)
+        store = cls()
+        store._names = columns["names"]
+        store._rows = None
+        for name, _ in snapshot.COLUMNS:
+            setattr(store, "_" + name, columns[name])
+        store._promotions = columns["promotions"]
+        store._promotion_ids_by_object = {
+            id(promotion): promotion_id
+            for promotion_id, promotion in enumerate(store._promotions)
+        }
+        store._total_quantity = columns["total_quantity"]
+        return store
+
+    def _row_of(self, key):
+        """
+        Resolves a product name (or a row number) to a row number.
+
+        :param key: str or int - The product name or row.
+        :return: int - The row of the product.
+        """
+        if isinstance(key, int):
+            if not 0 <= key < len(self._names):
+                raise IndexError(f"Row {key} is out of range.")
+            return key
+        row = self._name_index().get(key)
+        if row is None:
+            raise KeyError(f"{key} is not in the store.")
+        return row
+
+    def get_product(self, name):
+        """
+        Returns a view of the product with the given name.
+
+        :param name: str - The name of the product.
+        :return: ProductView - The view of the product.
+        """
+        return ProductView(self, self._row_of(name))
+
+    @property
+    def list_products(self):
+        """
+        Returns views of all products, in the order they were added.
+
+        :return: list - A list of ProductView objects.
+        """
+        return [ProductView(self, row) for row in range(len(self._names))]
+
+    def get_all_products(self):
+        """
+        Returns views of all active products in the store.
+
+        :return: list - A list of ProductView objects.
+        """
+        return [
+            ProductView(self, row)
+            for row, active in enumerate(self._active)
+            if active
+        ]
+
+    def bulk_set_price(self, keys, prices):
+        """
+        Sets the price of many products at once.
+        Raises an exception (before changing anything) if a price
+        is negative or not a number.
+
+        :param keys: iterable - Product names or rows.
+        :param prices: float or int, or a sequence of them -
+        One price for all products, or one price per product.
+        """
+        rows = [self._row_of(key) for key in keys]
+        if isinstance(prices, (int, float)):
+            prices = [prices] * len(rows)
+        prices = list(prices)
+        if len(prices) != len(rows):
+            raise ValueError("There has to be one price per product.")
+        for price in prices:
+            if not isinstance(price, (int, float)):
+                raise TypeError("Price has to be an integer or float.")
+            if price < 0:
+                raise ValueError("Product price cannot be negative.")
+        column = self._prices
+        for row, price in zip(rows, prices):
+            column[row] = price
+
+    def bulk_restock(self, keys, amounts):
+        """
+        Adds stock to many products at once. Products whose quantity
+        ends above zero are (re)activated. Raises an exception (before
+        changing anything) for non-stocked products or invalid amounts.
+
+        :param keys: iterable - Product names or rows.
+        :param amounts: int or a sequence of int - One amount for all
+        products, or one amount per product.
+        """
+        rows = [self._row_of(key) for key in keys]
+        if isinstance(amounts, int):
+            amounts = [amounts] * len(rows)
+        amounts = list(amounts)
+        if len(amounts) != len(rows):
+            raise ValueError("There has to be one amount per product.")
+        kinds = self._kinds
+        quantities = self._quantities
+        # A row may be listed several times: its amounts are added up
+        # before checking the resulting quantity.
+        changes = {}
+        for row, amount in zip(rows, amounts):
+            if not isinstance(amount, int):
+                raise TypeError("Quantity has to be an integer.")
+            if kinds[row] == KIND_NON_STOCKED:
+                raise AttributeError(
+                    "NonStockedProduct quantity cannot be modified."
+                )
+            changes[row] = changes.get(row, 0) + amount
+        for row, change in changes.items():
+            if quantities[row] + change < 0:
+                raise ValueError("Product quantity cannot be negative.")
+        active = self._active
+        for row, change in changes.items():
+            quantity = quantities[row] + change
+            quantities[row] = quantity
+            active[row] = 1 if quantity > 0 else 0
+        self._total_quantity += sum(amounts)
+
+    def total_quantity(self):
+        """
+        Returns the total quantity of items in the store.
+
+        :return: int - The total quantity of items in the store.
+        """
+        return self._total_quantity
+
+    def get_total_quantity(self):
+        """
+        Alias of total_quantity, matching the Store interface.
+
+        :return: int - The total quantity of items in the store.
+        """
+        return self._total_quantity
+
+    def active_mask(self):
+        """
+        Returns a copy of the active flags column.
+
+        :return: array - One flag (1 active, 0 inactive) per row.
+        """
+        return array("b", self._active)
+
+    def iter_products(self, after=0):
+        """
+        Iterates over views of the products in row order, with their
+        sequence number (row + 1, stable since rows are never removed),
+        like Store.iter_products.
+
+        :param after: int - Only yield the products with a greater
+        sequence number.
+        :return: generator - Tuples (sequence number, ProductView).
+        """
+        for row in range(max(after, 0), len(self._names)):
+            yield row + 1, ProductView(self, row)
+
+    def product_at(self, sequence):
+        """
+        Returns a view of the product with the given sequence number.
+
+        :param sequence: int - The sequence number (row + 1).
+        :return: ProductView - The view of the product.
+        """
+        if not 1 <= sequence <= len(self._names):
+            raise KeyError(f"There is no product #{sequence} in the store.")
+        return ProductView(self, sequence - 1)
+
+    @staticmethod
+    def order(shopping_list):
+        """
+        Processes an order based on the provided shopping list
+        and returns the total price of the order.
+        The whole order is validated first, so an order that fails
+        leaves the columns untouched.
+
+        :param shopping_list: list - A list of tuples where
+        each tuple contains a product view and the desired quantity.
+        :return: float - The total price of the order.
+        """
+        requested = {}
+        for product_view, quantity in shopping_list:
+            product_view.check_purchase(quantity)
+            key = (id(product_view._store), product_view._row)
+            entry = requested.get(key)
+            if entry is None:
+                requested[key] = [product_view, quantity]
+            else:
+                entry[1] += quantity
+        for product_view, quantity in requested.values():
+            product_view.check_stock(quantity)
+        total = 0
+        for product_view, quantity in shopping_list:
+            total += product_view.buy(quantity)
+        return total
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, item):
+        """
+        Checks whether a product name (or a view) belongs to the store.
+
+        :param item: ProductView or str - The view or product name.
+        :return: bool - True if the product is in the store.
+        """
+        if isinstance(item, str):
+            return item in self._name_index()
+        return isinstance(item, ProductView) and item._store is self
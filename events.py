@@ -0,0 +1,175 @@
+import logging
+import threading
+from collections import namedtuple
+from contextlib import nullcontext
+
+QUANTITY_CHANGED = "quantity_changed"
+ACTIVATED = "activated"
+DEACTIVATED = "deactivated"
+PRICE_CHANGED = "price_changed"
+PROMOTION_CHANGED = "promotion_changed"
+# Batch key shared by activation and deactivation events.
+_ACTIVE = "active"
+
+# Product listener field -> event kind ("active" depends on the value).
+FIELD_KINDS = {
+    "quantity": QUANTITY_CHANGED,
+    "price": PRICE_CHANGED,
+    "promotion": PROMOTION_CHANGED,
+}
+
+InventoryEvent = namedtuple("InventoryEvent", ["kind", "product", "old",
+                                               "new"])
+
+logger = logging.getLogger(__name__)
+
+# Returned by EventBus.batch when there is nobody to deliver events to.
+_NO_BATCH = nullcontext()
+
+
+def event_kind(field, new):
+    """
+    Returns the event kind of a product change.
+
+    :param field: str - The changed field, as passed to product listeners.
+    :param new: The new value of the field.
+    :return: str - The event kind.
+    """
+    if field == "active":
+        return ACTIVATED if new else DEACTIVATED
+    return FIELD_KINDS[field]
+
+
+class EventBus:
+    """
+    The EventBus class fans inventory events out to subscribers.
+
+    Inside a batch (see batch), events are coalesced: one event per
+    product and field (activation and deactivation are one field),
+    carrying the value before the batch and the value after it, delivered
+    when the outermost batch ends. Events whose value ends up unchanged
+    are dropped. Batches are per thread.
+
+    A failing subscriber is logged and does not prevent the other
+    subscribers (nor the operation that published the event) from
+    running.
+    """
+
+    def __init__(self):
+        """
+        Initiator (constructor) method.
+        """
+        self._subscribers = ()
+        self._local = threading.local()
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def subscribe(self, callback, kinds=None):
+        """
+        Registers a callback called with every published InventoryEvent.
+
+        :param callback: callable - The callback to register.
+        :param kinds: iterable - The event kinds to receive
+        (all kinds if omitted).
+        :return: callable - The callback, for unsubscribe.
+        """
+        kinds = frozenset(kinds) if kinds is not None else None
+        self._subscribers += ((callback, kinds),)
+        return callback
+
+    def unsubscribe(self, callback):
+        """
+        Unregisters a callback registered with subscribe.
+
+        :param callback: callable - The callback to unregister.
+        """
+        self._subscribers = tuple(
+            (subscriber, kinds)
+            for subscriber, kinds in self._subscribers
+            if subscriber != callback
+        )
+
+    def publish(self, event):
+        """
+        Publishes an event, or queues it if a batch is open.
+
+        :param event: InventoryEvent - The event to publish.
+        """
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            self._deliver(event)
+            return
+        # Activation and deactivation are the same field: a product
+        # deactivated and activated again in a batch did not change.
+        key = (_ACTIVE if event.kind in (ACTIVATED, DEACTIVATED)
+               else event.kind, id(event.product))
+        queued = pending.get(key)
+        if queued is None:
+            pending[key] = event
+        else:
+            pending[key] = queued._replace(kind=event.kind, new=event.new)
+
+    def batch(self):
+        """
+        Coalesces the events published in the current thread until the
+        outermost batch ends. With no subscribers there is nothing to
+        coalesce, and the batch is a no-op.
+
+        :return: A context manager.
+        """
+        if not self._subscribers:
+            return _NO_BATCH
+        return _Batch(self)
+
+    def _flush(self):
+        """
+        Ends the outermost batch of the current thread and delivers its
+        coalesced events.
+        """
+        local = self._local
+        pending = local.pending
+        local.pending = None
+        for event in pending.values():
+            if event.old != event.new:
+                self._deliver(event)
+
+    def _deliver(self, event):
+        """
+        Calls the subscribers interested in an event.
+
+        :param event: InventoryEvent - The event to deliver.
+        """
+        for callback, kinds in self._subscribers:
+            if kinds is not None and event.kind not in kinds:
+                continue
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Inventory event subscriber failed.")
+
+
+class _Batch:
+    """
+    Context manager returned by EventBus.batch. A class rather than a
+    generator, since it is entered on every order.
+    """
+
+    __slots__ = ("_bus", "_outermost")
+
+    def __init__(self, bus):
+        self._bus = bus
+        self._outermost = False
+
+    def __enter__(self):
+        local = self._bus._local
+        if getattr(local, "pending", None) is None:
+            local.pending = {}
+            self._outermost = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._outermost:
+            self._bus._flush()
+        return False
@@ -0,0 +1,343 @@
+import os
+import struct
+import threading
+import zlib
+
+import store as store_module
+
+# Every record is framed by its payload size and the CRC32 of the payload,
+# so that a record torn by a crash is detected on replay.
+FRAME = struct.Struct("<II")
+# sequence number, number of lines, order total
+ORDER = struct.Struct("<qId")
+# quantity, unit price, name size, promotion name size
+LINE = struct.Struct("<qdHH")
+
+
+def encode_order(sequence, shopping_list, total):
+    """
+    Encodes a committed order as a journal record.
+
+    :param sequence: int - The sequence number of the order.
+    :param shopping_list: list - Tuples of a Product and a quantity.
+    :param total: float - The total price of the order.
+    :return: bytes - The framed record.
+    """
+    parts = [ORDER.pack(sequence, len(shopping_list), total)]
+    for product, quantity in shopping_list:
+        name = product.name.encode("utf-8")
+        promotion = product.promotion
+        promotion_name = promotion.name.encode("utf-8") if promotion else b""
+        parts.append(LINE.pack(quantity, product.price, len(name),
+                               len(promotion_name)))
+        parts.append(name)
+        parts.append(promotion_name)
+    payload = b"".join(parts)
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_order(payload):
+    """
+    Decodes the payload of a journal record.
+
+    :param payload: bytes - The payload of the record.
+    :return: tuple - (sequence, lines, total), where each line is a tuple
+    (product name, quantity, unit price, promotion name).
+    """
+    sequence, line_count, total = ORDER.unpack_from(payload)
+    offset = ORDER.size
+    lines = []
+    for _ in range(line_count):
+        quantity, price, name_size, promotion_size = LINE.unpack_from(
+            payload, offset
+        )
+        offset += LINE.size
+        name = str(payload[offset:offset + name_size], "utf-8")
+        offset += name_size
+        promotion_name = str(payload[offset:offset + promotion_size],
+                             "utf-8")
+        offset += promotion_size
+        lines.append((name, quantity, price, promotion_name))
+    return sequence, lines, total
+
+
+def iter_records(path):
+    """
+    Reads the records of a journal file, stopping at the first record
+    that is incomplete or corrupted (the tail of a crashed write).
+
+    :param path: str - The path of the journal file.
+    :return: generator - Tuples (end offset, payload) of every valid
+    record, in order.
+    """
+    try:
+        with open(path, "rb") as journal_file:
+            data = journal_file.read()
+    except FileNotFoundError:
+        return
+    view = memoryview(data)
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        size, checksum = FRAME.unpack_from(data, offset)
+        start = offset + FRAME.size
+        payload = view[start:start + size]
+        if len(payload) < size or zlib.crc32(payload) != checksum:
+            return
+        offset = start + size
+        yield offset, payload
+
+
+class OrderJournal:
+    """
+    The OrderJournal class is an append-only, write-ahead log of the
+    orders committed by a Store: each record holds the sequence number,
+    the lines (product, quantity, unit price, promotion) and the total of
+    one order.
+
+    Appending only writes to an in-memory buffer. A background thread
+    flushes and fsyncs the buffer once group_commit_size records are
+    pending or group_commit_interval seconds have passed, so many orders
+    share one fsync. Callers needing durability can wait for it with
+    append(..., durable=True) or sync().
+
+    On startup, replay applies the journal over the last inventory
+    snapshot (see Store.save and recover).
+    """
+
+    def __init__(self, path, group_commit_size=256,
+                 group_commit_interval=0.005):
+        """
+        Initiator (constructor) method.
+
+        :param path: str - The path of the journal file.
+        :param group_commit_size: int - The number of pending records
+        triggering a flush.
+        :param group_commit_interval: float - The maximum time (in
+        seconds) a record stays unsynced.
+        """
+        if group_commit_size <= 0:
+            raise ValueError(
+                "The group commit size has to be greater than zero."
+            )
+        self.path = path
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval = group_commit_interval
+        self.sequence = 0
+        self._replayed = not os.path.exists(path) or not os.path.getsize(
+            path
+        )
+        self._file = open(path, "ab")
+        self._buffer = []
+        self._synced_sequence = 0
+        self._condition = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop,
+                                         daemon=True)
+        self._flusher.start()
+
+    def append(self, shopping_list, total, durable=False):
+        """
+        Appends a committed order to the journal.
+        Stores append before changing any stock, so an order the journal
+        refuses (e.g. once it is closed) is not applied.
+
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        :param total: float - The total price of the order.
+        :param durable: bool - Whether to wait until the record is
+        on disk.
+        :return: int - The sequence number of the order.
+        """
+        return self.append_many([(shopping_list, total)], durable)
+
+    def append_many(self, orders, durable=False):
+        """
+        Appends several committed orders to the journal, all of them
+        or (if the journal refuses them) none.
+
+        :param orders: iterable - Tuples of a shopping list and its total.
+        :param durable: bool - Whether to wait until the records are
+        on disk.
+        :return: int - The sequence number of the last order.
+        """
+        orders = list(orders)
+        with self._condition:
+            if self._closed:
+                raise ValueError("The journal is closed.")
+            if not self._replayed:
+                raise ValueError(
+                    "The journal has to be replayed before appending."
+                )
+            records = [
+                encode_order(self.sequence + offset, shopping_list, total)
+                for offset, (shopping_list, total) in enumerate(orders, 1)
+            ]
+            self.sequence += len(records)
+            sequence = self.sequence
+            self._buffer.extend(records)
+            if (
+                durable
+                or len(self._buffer) == len(records)
+                or len(self._buffer) >= self.group_commit_size
+            ):
+                self._condition.notify_all()
+            while durable and self._synced_sequence < sequence:
+                self._condition.wait()
+        return sequence
+
+    def _flush_loop(self):
+        """
+        Background thread: flushes and fsyncs the pending records
+        in groups.
+        """
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                if not self._buffer:
+                    self._condition.wait()
+                    continue
+                if len(self._buffer) < self.group_commit_size:
+                    self._condition.wait(self.group_commit_interval)
+            self._flush()
+
+    def _flush(self):
+        """
+        Writes and fsyncs the pending records. Orders keep being
+        appended to a new buffer meanwhile.
+        """
+        with self._io_lock:
+            with self._condition:
+                buffer, self._buffer = self._buffer, []
+                sequence = self.sequence
+            if buffer:
+                self._file.write(b"".join(buffer))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            with self._condition:
+                self._synced_sequence = max(self._synced_sequence, sequence)
+                self._condition.notify_all()
+
+    def sync(self):
+        """
+        Writes and fsyncs every pending record.
+        """
+        self._flush()
+
+    def close(self):
+        """
+        Syncs the pending records and closes the journal.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._flusher.join()
+        self._flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def replay(self, store):
+        """
+        Applies the journaled orders that the store does not reflect yet
+        (those after store.journal_sequence) to its stock, and truncates
+        a torn record left at the end of the file by a crash.
+
+        Quantities are summed per product over the whole journal and each
+        product is updated once.
+
+        :param store: Store - The store to update.
+        :return: int - The number of orders applied.
+        """
+        with self._io_lock:
+            sold = {}
+            applied = 0
+            sequence = store.journal_sequence
+            end = 0
+            for end, payload in iter_records(self.path):
+                record_sequence, lines, _ = decode_order(payload)
+                if record_sequence <= store.journal_sequence:
+                    continue
+                for name, quantity, _, _ in lines:
+                    sold[name] = sold.get(name, 0) + quantity
+                sequence = record_sequence
+                applied += 1
+            for name, quantity in sold.items():
+                store.get_product(name).remove_stock(quantity)
+            if os.fstat(self._file.fileno()).st_size != end:
+                self._file.truncate(end)
+            with self._condition:
+                self.sequence = max(sequence, self.sequence)
+                self._synced_sequence = self.sequence
+                self._replayed = True
+            store.journal_sequence = self.sequence
+        return applied
+
+    def truncate(self, sequence=None):
+        """
+        Drops the records up to a sequence number, e.g. the orders saved
+        in a snapshot, and keeps the later ones. The kept records are
+        written to a new file that replaces the journal, so a crash
+        leaves either the old or the new journal. Sequence numbers keep
+        increasing.
+
+        :param sequence: int - The sequence number of the last record
+        to drop (all records if None).
+        """
+        self._flush()
+        with self._io_lock:
+            start = end = 0
+            for end, payload in iter_records(self.path):
+                if sequence is None or ORDER.unpack_from(payload)[0] <= (
+                    sequence
+                ):
+                    start = end
+            if start == 0 and end == os.fstat(self._file.fileno()).st_size:
+                return
+            with open(self.path, "rb") as journal_file:
+                journal_file.seek(start)
+                kept = journal_file.read(end - start)
+            path = os.fspath(self.path)
+            with open(path + ".tmp", "wb") as new_file:
+                new_file.write(kept)
+                new_file.flush()
+                os.fsync(new_file.fileno())
+            os.replace(path + ".tmp", path)
+            self._file.close()
+            self._file = open(path, "ab")
+
+
+def recover(snapshot_path, journal_path, **kwargs):
+    """
+    Rebuilds a store after a restart: loads the last snapshot, replays
+    the journal over it and attaches the journal to the store.
+
+    :param snapshot_path: str - The path of the snapshot file.
+    :param journal_path: str - The path of the journal file.
+    :param kwargs: Other arguments of the Store constructor.
+    :return: Store - The recovered store.
+    """
+    journal = OrderJournal(journal_path)
+    store = store_module.Store.load(snapshot_path, journal=journal, **kwargs)
+    journal.replay(store)
+    return store
+
+
+def checkpoint(store, snapshot_path):
+    """
+    Saves a snapshot of a store and drops the journaled orders it
+    reflects. Orders committed after the snapshot stay in the journal.
+    A crash between the two steps is harmless: the snapshot records the
+    last journaled order, so replay skips the orders it already holds.
+
+    :param store: Store - The store to save; it must have a journal.
+    :param snapshot_path: str - The path of the snapshot file.
+    """
+    store.save(snapshot_path)
+    store.journal.truncate(store.journal_sequence)
@@ -0,0 +1,114 @@
+import sys
+from collections import namedtuple
+
+DEFAULT_PAGE_SIZE = 20
+
+# The products of a page, as (cursor, Product) tuples, and the cursor to
+# pass to get the next page (None after the last page).
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+def matches(product, active=None, min_price=None, max_price=None,
+            promotion=None):
+    """
+    Checks whether a product passes the listing filters.
+    A filter left to None lets every product through.
+
+    :param product: Product - The product to check.
+    :param active: bool - The wanted active status.
+    :param min_price: float - The lowest price.
+    :param max_price: float - The highest price.
+    :param promotion: bool or str - Whether the product has to have a
+    promotion (True) or none (False), or the name of its promotion.
+    :return: bool - True if the product passes every filter.
+    """
+    if active is not None and product.is_active() != active:
+        return False
+    price = product.price
+    if min_price is not None and price < min_price:
+        return False
+    if max_price is not None and price > max_price:
+        return False
+    if promotion is not None:
+        own = product.promotion
+        if isinstance(promotion, str):
+            return own is not None and own.name == promotion
+        return (own is not None) == promotion
+    return True
+
+
+def paginate(store, cursor=0, page_size=DEFAULT_PAGE_SIZE, **filters):
+    """
+    Returns one page of the products of a store, in the order they were
+    added. Cursors are product sequence numbers (see Store.iter_products),
+    so a cursor stays valid when products are added or removed between
+    pages, and a page costs its own size plus the filtered-out products,
+    whatever the size of the catalog.
+
+    :param store: Store - The store to list.
+    :param cursor: int - The next_cursor of the previous page
+    (0 for the first page).
+    :param page_size: int - The maximum number of products per page.
+    :param filters: The filters of matches (active, min_price, max_price,
+    promotion).
+    :return: Page - The products of the page and the next cursor.
+    """
+    if page_size <= 0:
+        raise ValueError("The page size has to be greater than zero.")
+    items = []
+    for sequence, product in store.iter_products(cursor):
+        if not matches(product, **filters):
+            continue
+        if len(items) == page_size:
+            return Page(items, items[-1][0])
+        items.append((sequence, product))
+    return Page(items, None)
+
+
+def iter_pages(store, page_size=DEFAULT_PAGE_SIZE, **filters):
+    """
+    Iterates over the pages of the products of a store.
+
+    :param store: Store - The store to list.
+    :param page_size: int - The maximum number of products per page.
+    :param filters: The filters of matches.
+    :return: generator - The pages.
+    """
+    cursor = 0
+    while cursor is not None:
+        page = paginate(store, cursor, page_size, **filters)
+        if page.items:
+            yield page
+        cursor = page.next_cursor
+
+
+def render_page(page):
+    """
+    Renders a page as text, one product per line prefixed with its
+    cursor (the number to pick it by in the order menu).
+
+    :param page: Page - The page to render.
+    :return: str - The rendered page.
+    """
+    return "".join(
+        f"{sequence}: {product}\n" for sequence, product in page.items
+    )
+
+
+def write_pages(store, out=None, page_size=DEFAULT_PAGE_SIZE, **filters):
+    """
+    Writes the whole (filtered) listing of a store, one buffered write
+    per page instead of one print per product.
+
+    :param store: Store - The store to list.
+    :param out: file - Where to write (default: standard output).
+    :param page_size: int - The number of products per write.
+    :param filters: The filters of matches.
+    :return: int - The number of products written.
+    """
+    out = out or sys.stdout
+    written = 0
+    for page in iter_pages(store, page_size, **filters):
+        out.write(render_page(page))
+        written += len(page.items)
+    return written
@@ -1,14 +1,81 @@
+import argparse
+import sys
+
+import columnar_store
+import listing
 import products
+import replay
 import store
 
-product_list = [
-    products.Product("MacBook Air M2", price=1450, quantity=100),
-    products.Product("Bose QuietComfort Earbuds", price=250, quantity=500),
-    products.Product("Google Pixel 7", price=500, quantity=250),
-    products.NonStockedProduct("Windows License", price=125),
-    products.LimitedProduct("Shipping", price=10, quantity=250, maximum=1),
-]
-best_buy = store.Store(product_list)
+# The store is only built (or loaded) when first used, see get_store.
+_catalog_path = None
+_store = None
+
+
+def demo_products():
+    """
+    build the demo catalog, with its promotions
+    :return: list of Product
+    """
+    product_list = [
+        products.Product("MacBook Air M2", price=1450, quantity=100),
+        products.Product("Bose QuietComfort Earbuds", price=250,
+                         quantity=500),
+        products.Product("Google Pixel 7", price=500, quantity=250),
+        products.NonStockedProduct("Windows License", price=125),
+        products.LimitedProduct("Shipping", price=10, quantity=250,
+                                maximum=1),
+    ]
+
+    # Create promotion catalog
+    second_half_price = products.SecondHalfPrice("Second Half price!")
+    third_one_free = products.ThirdOneFree("Third One Free!")
+    thirty_percent = products.PercentDiscount("30% off!", percent=30)
+
+    # Add promotions to products
+    product_list[0].set_promotion(second_half_price)
+    product_list[1].set_promotion(third_one_free)
+    product_list[3].set_promotion(thirty_percent)
+    return product_list
+
+
+def configure(catalog_path=None):
+    """
+    choose the catalog: a snapshot file (see Store.save), or the demo
+    catalog if None; the store is loaded on first use
+    :param catalog_path: str
+    """
+    global _catalog_path, _store
+    _catalog_path = catalog_path
+    _store = None
+
+
+def get_store():
+    """
+    return the store, loading it on first use.
+    A snapshot catalog is memory-mapped (columnar_store.ColumnarStore):
+    opening it costs the same whatever the catalog size, products are
+    read on demand and the total quantity comes from the snapshot header.
+    :return: Store or ColumnarStore
+    """
+    global _store
+    if _store is None:
+        if _catalog_path:
+            _store = columnar_store.ColumnarStore.load(_catalog_path)
+        else:
+            _store = store.Store(demo_products())
+    return _store
+
+
+def __getattr__(name):
+    """
+    keep main.best_buy and main.product_list working, lazily
+    """
+    if name == "best_buy":
+        return get_store()
+    if name == "product_list":
+        return get_store().list_products
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def show_menu():
@@ -39,13 +106,20 @@ def ask_user():
 
 def list_products():
     """
-    list all products in store
+    list all products in store, one page at a time
     """
     print("")
     print("   Products in store")
     print("   -----------------")
-    for i, product in enumerate(best_buy.list_products):
-        print(f"{i+1}: {product}")
+    cursor = 0
+    while True:
+        page = listing.paginate(get_store(), cursor)
+        sys.stdout.write(listing.render_page(page))
+        cursor = page.next_cursor
+        if cursor is None:
+            return
+        if input("Press Enter for more products, q to stop: ") == "q":
+            return
 
 
 def show_total_amount():
@@ -55,22 +129,23 @@ def show_total_amount():
     print("")
     print("   Total amount in store")
     print("   --------------------")
-    print(f"Total amount: {best_buy.get_total_quantity()}")
+    print(f"Total amount: {get_store().get_total_quantity()}")
 
 
 def ask_user_for_product():
     """
-    prompt user for product name
-    :return: int or ''
+    prompt user for product number (as shown by the listing)
+    :return: Product or ''
     """
     while True:
         product_num = input("which product # do you want?: ")
         if product_num == "":
             return ""
-        if product_num.isdigit() and int(product_num) in range(
-            1, len(best_buy.list_products) + 1
-        ):
-            return int(product_num)
+        if product_num.isdigit():
+            try:
+                return get_store().product_at(int(product_num))
+            except KeyError:
+                pass
         print("Error with your choice! Try again!")
 
 
@@ -83,7 +158,7 @@ def ask_user_for_quantity(product_chosen):
     while True:
         quantity = input("how many do you want?: ")
         if quantity.isdigit() and int(quantity) in range(
-            1, product_chosen.quantity + 1
+            1, product_chosen.get_available() + 1
         ):
             return int(quantity)
         print("Order quantity must be greater than zero and less than " 
@@ -97,14 +172,11 @@ def get_user_order():
     """
     new_order = []
     while True:
-        user_product = ask_user_for_product()
-        if user_product == "":
+        product_chosen = ask_user_for_product()
+        if product_chosen == "":
             break
-        product_chosen = best_buy.list_products[user_product - 1]
         user_quantity = ask_user_for_quantity(product_chosen)
         new_order.append((product_chosen, user_quantity))
-        if user_product == "" and user_quantity == "":
-            break
     return new_order
 
 
@@ -130,7 +202,7 @@ def order_total():
                 f"{user_quantity} x {product_chosen.name}: "
                 f"${product_chosen.price} "
             )
-        total = best_buy.order(new_order)
+        total = get_store().order(new_order)
         print(f"\nOrder made! Total payment: ${total}")
         print("-------------------------------------")
         return total
@@ -176,16 +248,43 @@ def start():
         print(type_err)
 
 
-# Create promotion catalog
-second_half_price = products.SecondHalfPrice("Second Half price!")
-third_one_free = products.ThirdOneFree("Third One Free!")
-thirty_percent = products.PercentDiscount("30% off!", percent=30)
+def replay_orders(path, results_path=None):
+    """
+    replay a JSONL order file against the store without prompting,
+    and print a summary
+    :param path: str
+    :param results_path: str - optional file for per-order results
+    """
+    if results_path:
+        with open(results_path, "w", encoding="utf-8") as results:
+            result = replay.replay(get_store(), path, results)
+    else:
+        result = replay.replay(get_store(), path)
+    print(replay.format_summary(result))
+
 
-# Add promotions to products
-product_list[0].set_promotion(second_half_price)
-product_list[1].set_promotion(third_one_free)
-product_list[3].set_promotion(thirty_percent)
+def parse_args(argv=None):
+    """
+    parse the command line
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Best Buy store.")
+    parser.add_argument("--catalog", metavar="SNAPSHOT",
+                        help="load the catalog from a snapshot file "
+                             "instead of the demo catalog")
+    parser.add_argument("--replay", metavar="ORDERS",
+                        help="replay a JSONL order file instead of "
+                             "starting the interactive menu")
+    parser.add_argument("--results", metavar="PATH",
+                        help="with --replay, write per-order results "
+                             "to this JSONL file")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    start()
+    arguments = parse_args()
+    configure(arguments.catalog)
+    if arguments.replay:
+        replay_orders(arguments.replay, arguments.results)
+    else:
+        start()
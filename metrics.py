@@ -0,0 +1,420 @@
+import functools
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+
+import products
+import store
+
+# Upper bounds (in seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+# Failure messages embedding a product name, folded into one reason so
+# that every product does not get its own counter.
+_REASONS = (
+    (re.compile(r" is limited to add max \d+\.$"), "Limit exceeded."),
+    (re.compile(r" is not in the store\.$"), "Unknown product."),
+)
+
+
+def failure_reason(error):
+    """
+    Returns the reason an operation failed, as counted by the metrics:
+    the exception message, with the product name left out.
+
+    :param error: Exception - The exception raised by the operation.
+    :return: str - The reason.
+    """
+    message = str(error.args[0]) if error.args else type(error).__name__
+    for pattern, reason in _REASONS:
+        if pattern.search(message):
+            return reason
+    return message
+
+
+class Histogram:
+    """
+    The Histogram class counts observed latencies in fixed buckets,
+    Prometheus style.
+    """
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        """
+        Initiator (constructor) method.
+        """
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        """
+        Records one latency.
+
+        :param seconds: float - The latency, in seconds.
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """
+        Returns the cumulative counts of the buckets, the last one
+        (+Inf) being the total count.
+
+        :return: list - The cumulative counts.
+        """
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class Metrics:
+    """
+    The Metrics class holds the call counts, latency histograms and
+    failure counts recorded by the instrumentation (see enable).
+    Series are keyed by operation and label (the promotion type for
+    pricing operations, "" otherwise).
+    """
+
+    def __init__(self):
+        """
+        Initiator (constructor) method.
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets everything recorded so far.
+        """
+        with self._lock:
+            self.latency = {}
+            self.failures = {}
+
+    def record(self, operation, label, seconds, error=None):
+        """
+        Records one call of an operation.
+
+        :param operation: str - The name of the operation.
+        :param label: str - The label of the series.
+        :param seconds: float - The duration of the call.
+        :param error: Exception - The exception raised by the call, if any.
+        """
+        key = (operation, label)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(seconds)
+            if error is not None:
+                failure = (operation, label, type(error).__name__,
+                           failure_reason(error))
+                self.failures[failure] = self.failures.get(failure, 0) + 1
+
+    def calls(self, operation, label=""):
+        """
+        Returns the number of recorded calls of an operation.
+
+        :param operation: str - The name of the operation.
+        :param label: str - The label of the series.
+        :return: int - The number of calls.
+        """
+        histogram = self.latency.get((operation, label))
+        return histogram.count if histogram else 0
+
+    def snapshot(self):
+        """
+        Returns everything recorded so far as plain data.
+
+        :return: dict - The operations (calls, total and mean seconds,
+        bucket counts) and the failures.
+        """
+        with self._lock:
+            operations = [
+                {
+                    "operation": operation,
+                    "label": label,
+                    "calls": histogram.count,
+                    "seconds": histogram.sum,
+                    "mean_seconds": histogram.sum / histogram.count,
+                    "buckets": dict(zip(
+                        [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"],
+                        histogram.cumulative(),
+                    )),
+                }
+                for (operation, label), histogram in sorted(
+                    self.latency.items()
+                )
+            ]
+            failures = [
+                {
+                    "operation": operation,
+                    "label": label,
+                    "error": error,
+                    "reason": reason,
+                    "count": count,
+                }
+                for (operation, label, error, reason), count in sorted(
+                    self.failures.items()
+                )
+            ]
+        return {"operations": operations, "failures": failures}
+
+    def to_json(self):
+        """
+        Returns everything recorded so far as a JSON document.
+
+        :return: str - The JSON text.
+        """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="bestbuy"):
+        """
+        Returns everything recorded so far in the Prometheus text
+        exposition format.
+
+        :param prefix: str - The prefix of the metric names.
+        :return: str - The exposition text.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_calls_total Calls of the operation.",
+            f"# TYPE {prefix}_calls_total counter",
+        ]
+        for entry in snapshot["operations"]:
+            labels = _labels(operation=entry["operation"],
+                             promotion=entry["label"])
+            lines.append(f"{prefix}_calls_total{{{labels}}} {entry['calls']}")
+        lines += [
+            f"# HELP {prefix}_latency_seconds Latency of the operation.",
+            f"# TYPE {prefix}_latency_seconds histogram",
+        ]
+        for entry in snapshot["operations"]:
+            labels = _labels(operation=entry["operation"],
+                             promotion=entry["label"])
+            for bound, count in entry["buckets"].items():
+                lines.append(f"{prefix}_latency_seconds_bucket"
+                             f"{{{labels},le=\"{bound}\"}} {count}")
+            lines.append(f"{prefix}_latency_seconds_sum{{{labels}}} "
+                         f"{entry['seconds']!r}")
+            lines.append(f"{prefix}_latency_seconds_count{{{labels}}} "
+                         f"{entry['calls']}")
+        lines += [
+            f"# HELP {prefix}_failures_total Failed calls of the operation.",
+            f"# TYPE {prefix}_failures_total counter",
+        ]
+        for entry in snapshot["failures"]:
+            labels = _labels(operation=entry["operation"],
+                             promotion=entry["label"], error=entry["error"],
+                             reason=entry["reason"])
+            lines.append(f"{prefix}_failures_total{{{labels}}} "
+                         f"{entry['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    """
+    Formats Prometheus labels, skipping empty ones.
+    """
+    return ",".join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+        if value
+    )
+
+
+def _escape(value):
+    """
+    Escapes a Prometheus label value.
+    """
+    return (value.replace("\\", "\\\\").replace("\"", "\\\"")
+            .replace("\n", "\\n"))
+
+
+def _promotion_label(args):
+    """
+    Labels a pricing call by the promotion type of its product.
+    """
+    promotion = args[0].promotion
+    return type(promotion).__name__ if promotion else "none"
+
+
+def _self_label(args):
+    """
+    Labels a promotion call by the promotion type.
+    """
+    return type(args[0]).__name__
+
+
+def _no_label(args):
+    return ""
+
+
+METRICS = Metrics()
+_patched = []
+# The operations being timed in the current thread (see _timed).
+_local = threading.local()
+
+
+def _running():
+    """
+    Returns the set of operations being timed in the current thread.
+    """
+    running = getattr(_local, "running", None)
+    if running is None:
+        running = _local.running = set()
+    return running
+
+
+def _hierarchy(base):
+    """
+    Returns a class and all its subclasses.
+    """
+    classes = [base]
+    for subclass in base.__subclasses__():
+        classes += _hierarchy(subclass)
+    return classes
+
+
+def _timed(function, operation, label, registry):
+    """
+    Wraps a function so that every call is recorded in registry.
+    """
+    perf_counter = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        running = _running()
+        if operation in running:
+            # Nested in a call of the same operation (e.g. the default
+            # apply_promotion_many calling apply_promotion): counted once.
+            return function(*args, **kwargs)
+        running.add(operation)
+        start = perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as error:
+            registry.record(operation, label(args), perf_counter() - start,
+                            error)
+            raise
+        finally:
+            running.discard(operation)
+        registry.record(operation, label(args), perf_counter() - start)
+        return result
+    return wrapper
+
+
+def _timed_pricing(function, operation, label, registry):
+    """
+    Wraps Product._total_price. Every priced line is recorded as
+    operation, memoized quantities included. The lines whose price was
+    actually computed by the compiled pricing function of a promoted
+    product (the memo missed) are also recorded as "apply_promotion".
+    """
+    perf_counter = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(product, value):
+        pricer = product._pricer
+        if pricer is None:
+            pricer = product._pricer = product._compile_pricer()
+        promoted = product.promotion is not None
+        running = _running()
+        nested = "apply_promotion" in running
+        if promoted and not nested:
+            running.add("apply_promotion")
+        misses = pricer.cache_info().misses
+        start = perf_counter()
+        try:
+            result = function(product, value)
+        except Exception as error:
+            registry.record(operation, label((product,)),
+                            perf_counter() - start, error)
+            raise
+        finally:
+            if promoted and not nested:
+                running.discard("apply_promotion")
+        elapsed = perf_counter() - start
+        registry.record(operation, label((product,)), elapsed)
+        if (promoted and not nested
+                and pricer.cache_info().misses != misses):
+            registry.record("apply_promotion", label((product,)), elapsed)
+        return result
+    return wrapper
+
+
+# The instrumented methods: (base class, attribute, operation, label,
+# wrapper factory). Every class of the base's hierarchy defining the
+# attribute is patched.
+INSTRUMENTED = (
+    (store.Store, "order", "store_order", _no_label, _timed),
+    (store.Store, "order_many", "store_order_many", _no_label, _timed),
+    (store.Store, "_check_lines", "validation", _no_label, _timed),
+    (store.Store, "price_order", "order_pricing", _no_label, _timed),
+    (products.Product, "buy", "product_buy", _no_label, _timed),
+    (products.Product, "remove_stock", "stock_update", _no_label, _timed),
+    (products.Product, "_total_price", "line_pricing", _promotion_label,
+     _timed_pricing),
+    (products.Promotion, "apply_promotion", "apply_promotion", _self_label,
+     _timed),
+    (products.Promotion, "apply_promotion_many", "apply_promotion",
+     _self_label, _timed),
+)
+
+
+def enable(registry=METRICS):
+    """
+    Turns the instrumentation on: Store.order, Store.order_many, order
+    validation, order pricing, stock updates and Product.buy (direct
+    purchases only: store orders do not go through it) are timed and
+    recorded in registry.
+
+    Pricing is recorded by promotion type: line_pricing counts every
+    priced line, including the quantities answered from the memo of the
+    product's compiled pricing function, while apply_promotion counts
+    the promotion evaluations actually run, whether by a compiled
+    pricing function, Promotion.apply_promotion (promotion engine,
+    columnar views) or apply_promotion_many (order_many).
+
+    The instrumentation patches the methods of the classes defined at the
+    time of the call, so it costs nothing at all while disabled.
+
+    :param registry: Metrics - Where to record the calls.
+    """
+    if _patched:
+        disable()
+    for base, attribute, operation, label, wrap in INSTRUMENTED:
+        for cls in _hierarchy(base):
+            original = vars(cls).get(attribute)
+            if original is None or getattr(original, "__isabstractmethod__",
+                                           False):
+                continue
+            if isinstance(original, staticmethod):
+                wrapped = staticmethod(_timed(original.__func__, operation,
+                                              _no_label, registry))
+            else:
+                wrapped = wrap(original, operation, label, registry)
+            setattr(cls, attribute, wrapped)
+            _patched.append((cls, attribute, original))
+
+
+def disable():
+    """
+    Turns the instrumentation off, restoring the original methods.
+    """
+    while _patched:
+        cls, attribute, original = _patched.pop()
+        setattr(cls, attribute, original)
+
+
+def is_enabled():
+    return bool(_patched)
@@ -0,0 +1,141 @@
+import asyncio
+
+
+class OrderService:
+    """
+    The OrderService class is an asyncio front end for a Store.
+    Orders are submitted to a bounded queue (submitters wait when it is
+    full), collected into micro-batches for at most batch_window seconds
+    (or max_batch orders) and placed with a single Store.order_many call.
+    Each submitter gets the total of its own order back.
+
+    If a batch fails as a whole (e.g. one of its orders asks for more
+    than the stock, or a line is malformed), its orders are placed one
+    by one with Store.order, so that one bad order only fails its own
+    submitter.
+    """
+
+    def __init__(self, store, max_queue=1000, batch_window=0.002,
+                 max_batch=256):
+        """
+        Initiator (constructor) method.
+
+        :param store: Store - The store to place the orders in.
+        :param max_queue: int - The maximum number of waiting orders.
+        :param batch_window: float - The maximum time (in seconds)
+        the first order of a batch waits for more orders.
+        :param max_batch: int - The maximum number of orders per batch.
+        """
+        if max_queue <= 0:
+            raise ValueError("The queue size has to be greater than zero.")
+        if batch_window < 0:
+            raise ValueError("The batch window cannot be negative.")
+        if max_batch <= 0:
+            raise ValueError("The batch size has to be greater than zero.")
+        self.store = store
+        self.max_queue = max_queue
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        """
+        Starts the worker task placing the queued orders.
+        """
+        if self._worker is not None:
+            raise RuntimeError("The order service is already running.")
+        self._queue = asyncio.Queue(self.max_queue)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Places the orders still in the queue, then stops the worker task.
+        """
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.stop()
+
+    async def submit(self, shopping_list):
+        """
+        Queues an order and waits for it to be placed.
+        Raises the exception of the order if it fails.
+
+        :param shopping_list: list - A list of tuples where
+        each tuple contains a Product object and the desired quantity.
+        :return: float - The total price of the order.
+        """
+        if self._worker is None:
+            raise RuntimeError("The order service is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((shopping_list, future))
+        return await future
+
+    async def _run(self):
+        """
+        Worker task: collects batches of orders and places them.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                self._place(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _place(self, batch):
+        """
+        Places a batch of orders and resolves their futures.
+
+        :param batch: list - Tuples of a shopping list and its future.
+        """
+        batch = [
+            (shopping_list, future)
+            for shopping_list, future in batch
+            if not future.cancelled()
+        ]
+        try:
+            totals = self.store.order_many(
+                [shopping_list for shopping_list, _ in batch]
+            )
+        except Exception:
+            # Any failure (including a malformed line) is passed to the
+            # submitters of the orders it affects: the worker keeps
+            # running for the other orders and the next batches.
+            for shopping_list, future in batch:
+                try:
+                    total = self.store.order(shopping_list)
+                except Exception as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(total)
+            return
+        for (_, future), total in zip(batch, totals):
+            future.set_result(total)
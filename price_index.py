@@ -0,0 +1,128 @@
+from itertools import count
+
+from sorted_buckets import SortedBuckets
+
+INFINITY = float("inf")
+
+
+class PriceIndex:
+    """
+    The PriceIndex class keeps products sorted by price, for range
+    queries and cheapest / most expensive listings.
+
+    Products are kept in a SortedBuckets list under (price, insertion
+    number) keys, so products with the same price are listed in
+    insertion order, adding or removing a product costs O(log n) and a
+    query costs a binary search plus the size of its result.
+    The products given to the constructor are sorted in one go, so
+    building the index for a whole catalog costs O(n log n).
+    """
+
+    def __init__(self, product_list=()):
+        """
+        Initiator (constructor) method.
+
+        :param product_list: iterable - The products to index.
+        """
+        self._counter = count()
+        entries = sorted(
+            ((product.price, next(self._counter)), product)
+            for product in product_list
+        )
+        self._entries = SortedBuckets(entries)
+        self._key_of = {product.name: key for key, product in entries}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, product):
+        """
+        Adds a product to the index.
+
+        :param product: Product - The product to add.
+        """
+        key = (product.price, next(self._counter))
+        self._entries.add(key, product)
+        self._key_of[product.name] = key
+
+    def add_many(self, product_list):
+        """
+        Adds many products to the index.
+
+        :param product_list: iterable - The products to add.
+        """
+        for product in product_list:
+            self.add(product)
+
+    def discard(self, product):
+        """
+        Removes a product from the index, if it is there.
+
+        :param product: Product - The product to remove.
+        """
+        key = self._key_of.pop(product.name, None)
+        if key is not None:
+            self._entries.remove(key)
+
+    def update(self, product):
+        """
+        Moves a product whose price changed to its new place.
+
+        :param product: Product - The product whose price changed.
+        """
+        self.discard(product)
+        self.add(product)
+
+    def in_range(self, low, high, active_only=True):
+        """
+        Returns the products whose price is between low and high
+        (both included), from the cheapest.
+
+        :param low: float - The lowest price.
+        :param high: float - The highest price.
+        :param active_only: bool - Whether to skip inactive products.
+        :return: list - The matching products.
+        """
+        matches = self._entries.values_between((low,), (high, INFINITY))
+        if active_only:
+            return [product for product in matches if product.is_active()]
+        return matches
+
+    def cheapest(self, number, active_only=True):
+        """
+        Returns the number cheapest products, from the cheapest.
+
+        :param number: int - The number of products to return.
+        :param active_only: bool - Whether to skip inactive products.
+        :return: list - The products.
+        """
+        return self._first(self._entries.values(), number, active_only)
+
+    def most_expensive(self, number, active_only=True):
+        """
+        Returns the number most expensive products,
+        from the most expensive.
+
+        :param number: int - The number of products to return.
+        :param active_only: bool - Whether to skip inactive products.
+        :return: list - The products.
+        """
+        return self._first(self._entries.reversed_values(), number,
+                           active_only)
+
+    @staticmethod
+    def _first(products, number, active_only):
+        """
+        Returns the first number products of an iterator,
+        skipping inactive ones if asked to.
+        """
+        result = []
+        if number <= 0:
+            return result
+        for product in products:
+            if active_only and not product.is_active():
+                continue
+            result.append(product)
+            if len(result) == number:
+                break
+        return result
@@ -1,4 +1,38 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
+
+# Number of quantities whose price is memoized per product.
+QUOTE_CACHE_SIZE = 32
+
+# Stages of promotion stacking (see promotion_engine.PromotionEngine):
+# quantity deals first, then percentage discounts, then amounts off.
+QUANTITY_STAGE = 0
+PERCENT_STAGE = 1
+AMOUNT_STAGE = 2
+
+
+def validate_product(name, price, quantity):
+    """
+    Validates the data of a product.
+    If something is invalid (empty name / negative price or quantity),
+    raises an exception.
+
+    :param name: str - The name of the product.
+    :param price: float or int - The price of the product.
+    :param quantity: int - The quantity of the product.
+    """
+    if not isinstance(name, str):
+        raise TypeError("Name has to be a string.")
+    if not name:
+        raise ValueError("Product name cannot be empty.")
+    if not isinstance(price, (int, float)):
+        raise TypeError("Price has to be an integer or float.")
+    if price < 0:
+        raise ValueError("Product price cannot be negative.")
+    if not isinstance(quantity, int):
+        raise TypeError("Quantity has to be an integer.")
+    if quantity < 0:
+        raise ValueError("Product quantity cannot be negative.")
 
 
 class Product:
@@ -7,8 +41,27 @@ class Product:
     in the store.
     It encapsulates information about the product,
     including its name, price, quantity, and status (active or not).
+
+    Prices are computed by a pricing function compiled from the price and
+    the promotion of the product (see Promotion.compile) and memoized per
+    quantity. The compiled function is dropped whenever the price or the
+    promotion changes.
+
+    Products use __slots__ instead of a per-instance __dict__, since large
+    catalogs hold one Product per item.
     """
 
+    __slots__ = (
+        "name",
+        "_price",
+        "_quantity",
+        "_active",
+        "_promotion",
+        "_reserved",
+        "_pricer",
+        "_listeners",
+    )
+
     def __init__(
         self,
         name,
@@ -27,24 +80,77 @@ class Product:
         :param quantity: int - The quantity of the product.
         :param promotion: Promotion - The promotion to apply to the product
         """
-        if not isinstance(name, str):
-            raise TypeError("Name has to be a string.")
-        if not name:
-            raise ValueError("Product name cannot be empty.")
-        if not isinstance(price, (int, float)):
-            raise TypeError("Price has to be an integer or float.")
-        if price < 0:
-            raise ValueError("Product price cannot be negative.")
-        if not isinstance(quantity, int):
-            raise TypeError("Quantity has to be an integer.")
-        if quantity < 0:
-            raise ValueError("Product quantity cannot be negative.")
+        validate_product(name, price, quantity)
 
         self.name = name
         self._price = float(price)
         self._quantity = quantity
-        self.active = True
+        self._active = True
         self._promotion = promotion
+        self._reserved = 0
+        self._pricer = None
+        self._listeners = ()
+
+    @classmethod
+    def restore(cls, name, price, quantity, active=True, promotion=None,
+                **attributes):
+        """
+        Creates a product from trusted, already validated data (e.g. a
+        snapshot) without running the validation of the constructor.
+
+        :param name: str - The name of the product.
+        :param price: float - The price of the product.
+        :param quantity: int - The quantity of the product.
+        :param active: bool - The active status of the product.
+        :param promotion: Promotion - The promotion of the product.
+        :param attributes: Extra attributes of the subclass (maximum).
+        :return: Product - The restored product.
+        """
+        product = cls.__new__(cls)
+        product.name = name
+        product._price = price
+        product._quantity = quantity
+        product._active = active
+        product._promotion = promotion
+        product._reserved = 0
+        product._pricer = None
+        product._listeners = ()
+        if attributes:
+            for attribute, value in attributes.items():
+                setattr(product, attribute, value)
+        return product
+
+    def add_listener(self, listener):
+        """
+        Registers a callback notified whenever the quantity, the active
+        status, the price or the promotion of the product changes.
+        The callback is called as listener(product, field, old, new).
+
+        :param listener: callable - The callback to register.
+        """
+        self._listeners += (listener,)
+
+    def remove_listener(self, listener):
+        """
+        Unregisters a callback registered with add_listener.
+
+        :param listener: callable - The callback to unregister.
+        """
+        self._listeners = tuple(
+            registered for registered in self._listeners
+            if registered != listener
+        )
+
+    def _notify(self, field, old, new):
+        """
+        Notifies the registered listeners that a field has changed.
+
+        :param field: str - The name of the changed field.
+        :param old: The previous value of the field.
+        :param new: The new value of the field.
+        """
+        for listener in self._listeners:
+            listener(self, field, old, new)
 
     @property
     def price(self):
@@ -56,7 +162,11 @@ class Product:
             raise ValueError("Product price cannot be negative.")
         if not isinstance(value, int):
             raise TypeError("price has to be an integer.")
+        old = self._price
         self._price = value
+        self._pricer = None
+        if self._listeners and old != value:
+            self._notify("price", old, value)
 
     @property
     def promotion(self):
@@ -66,7 +176,11 @@ class Product:
     def promotion(self, value):
         if not isinstance(value, Promotion) and value is not None:
             raise TypeError("Promotion has to be of type Promotion or None.")
+        old = self._promotion
         self._promotion = value
+        self._pricer = None
+        if self._listeners and old is not value:
+            self._notify("promotion", old, value)
 
     @property
     def quantity(self):
@@ -78,10 +192,28 @@ class Product:
             raise ValueError("Product quantity cannot be negative.")
         if not isinstance(value, int):
             raise TypeError("Quantity has to be an integer.")
+        if value < self._reserved:
+            raise ValueError(
+                "Product quantity cannot be less than the reserved quantity."
+            )
+        old = self._quantity
         self._quantity = value
-        if self._quantity == 0 and not isinstance(self, NonStockedProduct):
+        if self._listeners and old != value:
+            self._notify("quantity", old, value)
+        if value == 0:
             self.deactivate()
 
+    @property
+    def active(self):
+        return self._active
+
+    @active.setter
+    def active(self, value):
+        old = self._active
+        self._active = value
+        if self._listeners and old != value:
+            self._notify("active", old, value)
+
     def get_quantity(self):
         """
         get_quantity(self)
@@ -133,22 +265,145 @@ class Product:
         :param value: int - The quantity to buy.
         :return: float - The total price of the purchase.
         """
+        self.check_purchase(value)
+        self.remove_stock(value)
+        return self._total_price(value)
+
+    def _total_price(self, value):
+        """
+        Returns the total price of a given quantity,
+        with the promotion of the product applied.
+
+        :param value: int - The quantity to price.
+        :return: float - The total price.
+        """
+        pricer = self._pricer
+        if pricer is None:
+            pricer = self._pricer = self._compile_pricer()
+        return pricer(value)
+
+    def _compile_pricer(self):
+        """
+        Compiles the pricing function of the product from its current
+        price and promotion, memoizing the most recent quantities.
+
+        :return: callable - A function from a quantity to its price.
+        """
+        if self.promotion:
+            pricer = self.promotion.compile(self)
+        else:
+            price = self.price
+
+            def pricer(quantity):
+                return price * quantity
+        return lru_cache(maxsize=QUOTE_CACHE_SIZE)(pricer)
+
+    def quote(self, value):
+        """
+        Returns the price of a given quantity of the product, as buy
+        would charge it, without buying anything.
+        Raises an exception if the quantity is not an integer
+        or is less than or equal to zero.
+
+        :param value: int - The quantity to price.
+        :return: float - The total price.
+        """
         if not isinstance(value, int):
             raise TypeError("Quantity has to be an integer.")
-        if value > self.quantity:
+        if value <= 0:
+            raise ValueError("Quantity has to be greater than zero.")
+        return self._total_price(value)
+
+    @property
+    def reserved(self):
+        return self._reserved
+
+    def get_available(self):
+        """
+        Returns the quantity that can still be bought, that is the
+        quantity minus what is reserved for pending orders.
+
+        :return: int - The available quantity.
+        """
+        return self.quantity - self._reserved
+
+    def check_stock(self, value):
+        """
+        Raises an exception if value exceeds the available stock.
+
+        :param value: int - The quantity to check.
+        """
+        if value > self.quantity - self._reserved:
             raise ValueError("Not enough stock available.")
+
+    def reserve(self, value):
+        """
+        Holds a given quantity for a pending order, so that it can no
+        longer be bought by anyone else. The quantity itself does not
+        change until the reservation is committed.
+        Raises an exception if value exceeds the available stock.
+
+        :param value: int - The (already validated) quantity to hold.
+        """
+        self.check_stock(value)
+        self._reserved += value
+
+    def release(self, value):
+        """
+        Gives back a quantity held with reserve.
+
+        :param value: int - The quantity to give back.
+        """
+        self._reserved -= value
+
+    def check_commit(self, value):
+        """
+        Raises an exception if a held quantity can no longer be removed
+        from the stock.
+
+        :param value: int - The held quantity to commit.
+        """
+        if value > self.quantity:
+            raise ValueError("Product quantity cannot be negative.")
+
+    def commit_reservation(self, value):
+        """
+        Turns a quantity held with reserve into a sale
+        by removing it from the stock.
+
+        :param value: int - The quantity to commit.
+        """
+        self._reserved -= value
+        self.remove_stock(value)
+
+    def check_purchase(self, value):
+        """
+        Validates the purchase of a given quantity without changing
+        the product. Raises the same exceptions as buy.
+
+        :param value: int - The quantity to buy.
+        """
+        if not isinstance(value, int):
+            raise TypeError("Quantity has to be an integer.")
+        self.check_stock(value)
         if value <= 0:
             raise ValueError("Quantity has to be greater than zero.")
+
+    def check_limit(self, value):
+        """
+        Raises an exception if value exceeds the quantity a single
+        purchase may hold. Regular products have no limit.
+
+        :param value: int - The quantity to check.
+        """
+
+    def remove_stock(self, value):
+        """
+        Removes a given (already validated) quantity from the stock.
+
+        :param value: int - The quantity to remove.
+        """
         self.quantity -= value
-        if self.promotion:
-            if isinstance(self.promotion, PercentDiscount):
-                return self.promotion.apply_promotion(
-                    self, value, self.promotion.percent
-                )
-            else:
-                return self.promotion.apply_promotion(self, value)
-        else:
-            return self.price * value
 
     def set_promotion(self, promotion):
         """
@@ -176,6 +431,8 @@ class NonStockedProduct(Product):
     the quantity should be set to zero always
     """
 
+    __slots__ = ()
+
     def __init__(self, name, price):
         super().__init__(name, price, quantity=0)
 
@@ -197,6 +454,27 @@ class NonStockedProduct(Product):
             f"Quantity:{self.quantity}, Promotion:{self.promotion}"
         )
 
+    def check_stock(self, value):
+        """
+        Non-stocked products never run out of stock.
+
+        :param value: int - The quantity to check.
+        """
+
+    def check_commit(self, value):
+        """
+        Non-stocked products have no stock to run out of.
+
+        :param value: int - The held quantity to commit.
+        """
+
+    def remove_stock(self, value):
+        """
+        Non-stocked products have no stock to remove.
+
+        :param value: int - The quantity to remove.
+        """
+
     def buy(self, value):
         """
         Buys a given quantity of the product.
@@ -208,17 +486,8 @@ class NonStockedProduct(Product):
         :param value: int - The quantity to buy.
         :return: float - The total price of the purchase.
         """
-        if not isinstance(value, int):
-            raise TypeError("Quantity has to be an integer.")
-        if value <= 0:
-            raise ValueError("Quantity has to be greater than zero.")
-        if self.promotion:
-            if isinstance(self.promotion, PercentDiscount):
-                return self.promotion.apply_promotion(self, value)
-            else:
-                return self.promotion.apply_promotion(self, value)
-        else:
-            return self.price * value
+        self.check_purchase(value)
+        return self._total_price(value)
 
 
 class LimitedProduct(Product):
@@ -226,10 +495,32 @@ class LimitedProduct(Product):
     shipping fee can only be added once.
     """
 
+    __slots__ = ("maximum",)
+
     def __init__(self, name, price, quantity, maximum):
         super().__init__(name, price, quantity)
         self.maximum = maximum
 
+    def check_purchase(self, value):
+        """
+        Validates the purchase of a given quantity without changing
+        the product. Raises the same exceptions as buy.
+
+        :param value: int - The quantity to buy.
+        """
+        Product.check_purchase(self, value)
+        LimitedProduct.check_limit(self, value)
+
+    def check_limit(self, value):
+        """
+        Raises an exception if value exceeds the maximum.
+
+        :param value: int - The quantity to check.
+        """
+        if value > self.maximum:
+            raise ValueError(f"{self.name} is limited to "
+                             f"add max {self.maximum}.")
+
     def show(self):
         """
         Prints the product details (name, price, quantity).
@@ -250,32 +541,23 @@ class LimitedProduct(Product):
         :param value: int - The quantity to buy.
         :return: float - The total price of the purchase.
         """
-        if not isinstance(value, int):
-            raise TypeError("Quantity has to be an integer.")
-        if value > self.quantity:
-            raise ValueError("Not enough stock available.")
-        if value <= 0:
-            raise ValueError("Quantity has to be greater than zero.")
-        if value > self.maximum:
-            raise ValueError(f"{self.name} is limited to " 
-                             f"add max {self.maximum}.")
-        self.quantity -= value
-        if self.promotion:
-            if isinstance(self.promotion, PercentDiscount):
-                return self.promotion.apply_promotion(
-                    self, value, self.promotion.percent
-                )
-            else:
-                return self.promotion.apply_promotion(self, value)
-        else:
-            return self.price * value
+        self.check_purchase(value)
+        self.remove_stock(value)
+        return self._total_price(value)
 
 
 class Promotion(ABC):
     """
     instance variable (member) for name, and only one method:
+    apply_promotion(product, quantity), returning the total price of the
+    given quantity of the product with the promotion applied.
+
+    stage tells the promotion engine when the promotion is applied
+    when several promotions are stacked on the same product.
     """
 
+    stage = QUANTITY_STAGE
+
     def __init__(self, name, percent=None):
         self.name = name
         self.percent = percent
@@ -284,6 +566,31 @@ class Promotion(ABC):
     def apply_promotion(self, product, quantity):
         pass
 
+    def compile(self, product):
+        """
+        Compiles the promotion for a product into a pricing function.
+        Promotions are expected not to change once set on a product.
+
+        :param product: The product the promotion applies to.
+        :return: callable - A function from a quantity to its price.
+        """
+        def pricer(quantity):
+            return self.apply_promotion(product, quantity)
+        return pricer
+
+    def apply_promotion_many(self, product_list, quantities):
+        """
+        Apply the promotion to many order lines at once.
+
+        :param product_list: list - The product of each line.
+        :param quantities: list - The quantity of each line.
+        :return: list - The total price of each line.
+        """
+        return [
+            self.apply_promotion(product, quantity)
+            for product, quantity in zip(product_list, quantities)
+        ]
+
     def __str__(self):
         """
         Prints the product promotion.
@@ -313,6 +620,35 @@ class SecondHalfPrice(Promotion):
         reminder = quantity % 2
         return float(product.price * pair * 1.5 + product.price * reminder)
 
+    def compile(self, product):
+        """
+        Compiles the second half-price promotion for a product.
+
+        :param product: The product the promotion applies to.
+        :return: callable - A function from a quantity to its price.
+        """
+        price = product.price
+
+        def pricer(quantity):
+            return float(price * (quantity // 2) * 1.5
+                         + price * (quantity % 2))
+        return pricer
+
+    def apply_promotion_many(self, product_list, quantities):
+        """
+        Apply the second half-price promotion to many order lines at once.
+
+        :param product_list: list - The product of each line.
+        :param quantities: list - The quantity of each line.
+        :return: list - The total price of each line.
+        """
+        return [
+            float(price * (quantity // 2) * 1.5 + price * (quantity % 2))
+            for price, quantity in zip(
+                [product.price for product in product_list], quantities
+            )
+        ]
+
 
 class ThirdOneFree(Promotion):
     """
@@ -333,6 +669,34 @@ class ThirdOneFree(Promotion):
         reminder = quantity % 3
         return float(product.price * three_pair * 2 + product.price * reminder)
 
+    def compile(self, product):
+        """
+        Compiles the third one free promotion for a product.
+
+        :param product: The product the promotion applies to.
+        :return: callable - A function from a quantity to its price.
+        """
+        price = product.price
+
+        def pricer(quantity):
+            return float(price * (quantity // 3) * 2 + price * (quantity % 3))
+        return pricer
+
+    def apply_promotion_many(self, product_list, quantities):
+        """
+        Apply the third one free promotion to many order lines at once.
+
+        :param product_list: list - The product of each line.
+        :param quantities: list - The quantity of each line.
+        :return: list - The total price of each line.
+        """
+        return [
+            float(price * (quantity // 3) * 2 + price * (quantity % 3))
+            for price, quantity in zip(
+                [product.price for product in product_list], quantities
+            )
+        ]
+
 
 class PercentDiscount(Promotion):
     """
@@ -340,6 +704,8 @@ class PercentDiscount(Promotion):
     to the total price of the products.
     """
 
+    stage = PERCENT_STAGE
+
     def apply_promotion(self, product, quantity):
         """
         Apply the percentage discount to the total price of
@@ -351,3 +717,64 @@ class PercentDiscount(Promotion):
         :return: The total price after applying the discount.
         """
         return float(product.price * quantity * (1 - self.percent / 100))
+
+    def compile(self, product):
+        """
+        Compiles the percentage discount for a product.
+
+        :param product: The product the promotion applies to.
+        :return: callable - A function from a quantity to its price.
+        """
+        price = product.price
+        factor = 1 - self.percent / 100
+
+        def pricer(quantity):
+            return float(price * quantity * factor)
+        return pricer
+
+    def apply_promotion_many(self, product_list, quantities):
+        """
+        Apply the percentage discount to many order lines at once.
+
+        :param product_list: list - The product of each line.
+        :param quantities: list - The quantity of each line.
+        :return: list - The total price of each line.
+        """
+        factor = 1 - self.percent / 100
+        return [
+            float(product.price * quantity * factor)
+            for product, quantity in zip(product_list, quantities)
+        ]
+
+
+class FixedAmountOff(Promotion):
+    """
+    FixedAmountOff takes a fixed amount off the price of every product,
+    without going below zero.
+    """
+
+    stage = AMOUNT_STAGE
+
+    def __init__(self, name, amount):
+        if not isinstance(amount, (int, float)):
+            raise TypeError("Amount has to be an integer or float.")
+        if amount < 0:
+            raise ValueError("Amount cannot be negative.")
+        super().__init__(name)
+        self.amount = amount
+
+    def apply_promotion(self, product, quantity):
+        """
+        Apply the amount off to the given product quantity.
+
+        :param product: The product to apply the promotion to.
+        :param quantity: The quantity of the product being purchased.
+        :return: float The total price after applying the promotion.
+        """
+        return float(max(product.price - self.amount, 0) * quantity)
+
+    def __str__(self):
+        """
+        Prints the product promotion.
+        """
+        return f"{self.name} Amount: {self.amount}"
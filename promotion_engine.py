@@ -0,0 +1,227 @@
+from abc import ABC, abstractmethod
+
+import products
+
+BASKET_STAGE = 3
+
+
+class BasketRule(ABC):
+    """
+    A BasketRule is a promotion on a whole shopping list rather than on
+    a single product. It is applied after every line has been priced.
+    """
+
+    stage = BASKET_STAGE
+
+    def __init__(self, name):
+        self.name = name
+
+    @abstractmethod
+    def apply_basket(self, subtotal, shopping_list):
+        """
+        Apply the rule to a priced shopping list.
+
+        :param subtotal: float - The total of the priced lines.
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        :return: float - The total after applying the rule.
+        """
+
+    def __str__(self):
+        return self.name
+
+
+class BasketPercentDiscount(BasketRule):
+    """
+    BasketPercentDiscount takes a percentage off the whole basket
+    once its total reaches a minimum.
+    """
+
+    def __init__(self, name, percent, minimum_total=0):
+        super().__init__(name)
+        self.percent = percent
+        self.minimum_total = minimum_total
+
+    def apply_basket(self, subtotal, shopping_list):
+        """
+        Apply the percentage discount if the basket is large enough.
+
+        :param subtotal: float - The total of the priced lines.
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        :return: float - The total after applying the discount.
+        """
+        if subtotal < self.minimum_total:
+            return subtotal
+        return float(subtotal * (1 - self.percent / 100))
+
+
+class PromotionEngine:
+    """
+    The PromotionEngine class prices shopping lists with several
+    promotions per product and basket-level rules.
+
+    Rules are applied in a fixed precedence order:
+    1. quantity deals (SecondHalfPrice, ThirdOneFree, ...): they do not
+       stack, the one giving the lowest line total wins;
+    2. percentage discounts (PercentDiscount): they compound;
+    3. amounts off (FixedAmountOff): they add up, per item, and never
+       take a line below zero;
+    4. basket rules (BasketRule), in the order they were added.
+
+    The promotion set on a product itself (Product.promotion) takes part
+    in its stage like any other rule. Rules are indexed by product name,
+    and the per-product stacking plan is precomputed, so pricing a basket
+    only looks at the rules of the products it contains.
+    """
+
+    def __init__(self):
+        """
+        Initiator (constructor) method.
+        """
+        self._line_rules = {}
+        self._basket_rules = {}
+        self._global_basket_rules = []
+        self._plans = {}
+        self._sequence = {}
+        # Bumped whenever the rules change, so that cached prices
+        # (see Store.quote) can tell they are stale.
+        self.version = 0
+
+    @staticmethod
+    def _names(product_list):
+        """
+        Returns the names of products given as Product objects or names.
+        """
+        return [
+            product if isinstance(product, str) else product.name
+            for product in product_list
+        ]
+
+    def add_rule(self, rule, product_list=None):
+        """
+        Adds a rule to the engine.
+
+        :param rule: Promotion or BasketRule - The rule to add.
+        :param product_list: list - The products (or product names) the
+        rule applies to. Required for product promotions; for basket
+        rules, the rule only applies to baskets containing one of these
+        products, or to every basket if omitted.
+        """
+        if isinstance(rule, BasketRule):
+            if product_list is None:
+                self._global_basket_rules.append(rule)
+            else:
+                for name in self._names(product_list):
+                    self._basket_rules.setdefault(name, []).append(rule)
+        elif isinstance(rule, products.Promotion):
+            if product_list is None:
+                raise ValueError(
+                    "A product promotion needs the products it applies to."
+                )
+            for name in self._names(product_list):
+                self._line_rules.setdefault(name, []).append(rule)
+                self._plans.pop(name, None)
+        else:
+            raise TypeError("Rule has to be a Promotion or a BasketRule.")
+        self._sequence.setdefault(id(rule), len(self._sequence))
+        self.version += 1
+
+    def remove_rule(self, rule):
+        """
+        Removes a rule from the engine, for every product it applies to.
+
+        :param rule: Promotion or BasketRule - The rule to remove.
+        """
+        if rule in self._global_basket_rules:
+            self._global_basket_rules.remove(rule)
+        for index in (self._line_rules, self._basket_rules):
+            for name, rules in list(index.items()):
+                if rule in rules:
+                    rules.remove(rule)
+                    self._plans.pop(name, None)
+                    if not rules:
+                        del index[name]
+        self._sequence.pop(id(rule), None)
+        self.version += 1
+
+    def rules_for(self, product):
+        """
+        Returns the rules added to the engine for a product.
+
+        :param product: Product or str - The product or its name.
+        :return: tuple - The product promotions and basket rules.
+        """
+        name = product if isinstance(product, str) else product.name
+        return tuple(self._line_rules.get(name, ())) + tuple(
+            self._basket_rules.get(name, ())
+        )
+
+    def _plan(self, name):
+        """
+        Returns the precomputed stacking plan of a product: its quantity
+        deals, its compounded percentage factor and its amount off.
+
+        :param name: str - The name of the product.
+        :return: tuple - (quantity rules, factor, amount per item).
+        """
+        plan = self._plans.get(name)
+        if plan is None:
+            rules = self._line_rules.get(name, ())
+            quantity_rules = []
+            factor = 1.0
+            amount = 0
+            for rule in rules:
+                if rule.stage == products.PERCENT_STAGE:
+                    factor *= 1 - rule.percent / 100
+                elif rule.stage == products.AMOUNT_STAGE:
+                    amount += rule.amount
+                else:
+                    quantity_rules.append(rule)
+            plan = self._plans[name] = (tuple(quantity_rules), factor, amount)
+        return plan
+
+    def price_line(self, product, quantity):
+        """
+        Returns the price of a line with every applicable
+        product promotion stacked.
+
+        :param product: Product - The product of the line.
+        :param quantity: int - The quantity of the line.
+        :return: float - The total price of the line.
+        """
+        quantity_rules, factor, amount = self._plan(product.name)
+        own = product.promotion
+        if own is not None:
+            if own.stage == products.PERCENT_STAGE:
+                factor *= 1 - own.percent / 100
+            elif own.stage == products.AMOUNT_STAGE:
+                amount += own.amount
+            else:
+                quantity_rules += (own,)
+        total = product.price * quantity
+        for rule in quantity_rules:
+            total = min(total, rule.apply_promotion(product, quantity))
+        if factor != 1.0:
+            total = float(total * factor)
+        if amount:
+            total = float(max(total - amount * quantity, 0))
+        return total
+
+    def price_basket(self, shopping_list):
+        """
+        Returns the total price of a shopping list with every
+        applicable product promotion and basket rule applied.
+
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        :return: float - The total price of the shopping list.
+        """
+        subtotal = 0
+        basket_rules = {id(rule): rule for rule in self._global_basket_rules}
+        for product, quantity in shopping_list:
+            subtotal += self.price_line(product, quantity)
+            for rule in self._basket_rules.get(product.name, ()):
+                basket_rules[id(rule)] = rule
+        for rule in sorted(
+            basket_rules.values(), key=lambda rule: self._sequence[id(rule)]
+        ):
+            subtotal = rule.apply_basket(subtotal, shopping_list)
+        return subtotal
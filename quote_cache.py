@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_SIZE = 1024
+
+
+class QuoteCache:
+    """
+    The QuoteCache class is an LRU cache of cart totals (see Store.quote).
+
+    Besides the entries themselves it tracks, for every product name,
+    the entries whose cart contains that product, so that a price,
+    promotion or status change drops exactly the totals it affects.
+
+    Lookups take no lock (they only read and reorder the entries, which
+    the GIL keeps consistent). A total computed while an invalidation
+    happened is not stored:
+    put is given the generation read before the total was computed,
+    and every invalidation starts a new generation.
+    """
+
+    def __init__(self, maxsize=DEFAULT_SIZE):
+        """
+        Initiator (constructor) method.
+
+        :param maxsize: int - The maximum number of cached totals
+        (0 disables the cache).
+        """
+        if maxsize < 0:
+            raise ValueError("The cache size cannot be negative.")
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._dependents = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns a cached total, marking it as recently used.
+
+        :param key: The normalized cart.
+        :return: float - The total, or None if it is not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            # Invalidated meanwhile by another thread.
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, total, names, generation):
+        """
+        Caches a total, evicting the least recently used one if the
+        cache is full.
+
+        :param key: The normalized cart.
+        :param total: float - Its total.
+        :param names: iterable - The names of the products of the cart.
+        :param generation: int - The generation read before computing
+        the total.
+        """
+        if not self.maxsize:
+            return
+        names = frozenset(names)
+        with self._lock:
+            if generation != self.generation or key in self._entries:
+                return
+            self._entries[key] = (total, names)
+            for name in names:
+                self._dependents.setdefault(name, set()).add(key)
+            if len(self._entries) > self.maxsize:
+                evicted, (_, evicted_names) = self._entries.popitem(
+                    last=False
+                )
+                self._unlink(evicted, evicted_names)
+
+    def _unlink(self, key, names):
+        """
+        Forgets that an entry depends on the given products.
+        """
+        for name in names:
+            keys = self._dependents.get(name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[name]
+
+    def invalidate(self, name):
+        """
+        Drops the totals of every cart containing a product.
+
+        :param name: str - The name of the product.
+        """
+        with self._lock:
+            self.generation += 1
+            for key in self._dependents.pop(name, ()):
+                _, names = self._entries.pop(key)
+                self._unlink(key, names - {name})
+
+    def clear(self):
+        """
+        Drops every cached total.
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._dependents.clear()
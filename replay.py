@@ -0,0 +1,128 @@
+import json
+import time
+from collections import Counter, namedtuple
+
+from metrics import failure_reason
+
+ReplayResult = namedtuple(
+    "ReplayResult",
+    ["orders", "succeeded", "failures", "revenue", "elapsed", "latencies"],
+)
+
+
+def iter_orders(path):
+    """
+    Streams the orders of a JSONL order file. Each line holds one order:
+    a list of [product name, quantity] pairs, or an object whose "lines"
+    field is such a list.
+
+    :param path: str - The path of the order file.
+    :return: generator - Tuples (line number, list of (name, quantity));
+    a line that cannot be parsed is yielded as its error message instead.
+    """
+    with open(path, encoding="utf-8") as order_file:
+        for line_number, line in enumerate(order_file, 1):
+            if not line.strip():
+                continue
+            try:
+                order = json.loads(line)
+            except json.JSONDecodeError as error:
+                yield line_number, f"Invalid JSON: {error.msg}."
+                continue
+            if isinstance(order, dict):
+                order = order.get("lines")
+            if not isinstance(order, list) or not all(
+                isinstance(item, list) and len(item) == 2 for item in order
+            ):
+                yield line_number, ("Order has to be a list of "
+                                    "[name, quantity] pairs.")
+                continue
+            yield line_number, order
+
+
+def percentile(values, fraction):
+    """
+    Returns the given percentile (0-1) of a sorted list of values.
+
+    :param values: list - The sorted values.
+    :param fraction: float - The percentile, between 0 and 1.
+    :return: The value at that percentile (0 for no values).
+    """
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def replay(store, path, results=None):
+    """
+    Streams an order file through Store.order as fast as possible.
+
+    :param store: Store - The store to place the orders in.
+    :param path: str - The path of the JSONL order file (see iter_orders).
+    :param results: file - Optional file receiving one JSON line per
+    order: its line number and either its total or its error.
+    :return: ReplayResult - The number of orders and of successful ones,
+    the failure reasons with their counts, the revenue, the elapsed time
+    and the sorted latencies (seconds) of the orders placed.
+    """
+    perf_counter = time.perf_counter
+    get_product = store.get_product
+    order = store.order
+    orders = 0
+    succeeded = 0
+    failures = Counter()
+    revenue = 0
+    latencies = []
+    start = perf_counter()
+    for line_number, lines in iter_orders(path):
+        orders += 1
+        error = None
+        if isinstance(lines, str):
+            error = lines
+        else:
+            try:
+                shopping_list = [(get_product(name), quantity)
+                                 for name, quantity in lines]
+                order_start = perf_counter()
+                total = order(shopping_list)
+                latencies.append(perf_counter() - order_start)
+            except (KeyError, TypeError, ValueError) as order_error:
+                error = failure_reason(order_error)
+        if error is None:
+            succeeded += 1
+            revenue += total
+            outcome = {"line": line_number, "total": total}
+        else:
+            failures[error] += 1
+            outcome = {"line": line_number, "error": error}
+        if results is not None:
+            results.write(json.dumps(outcome) + "\n")
+    latencies.sort()
+    return ReplayResult(orders, succeeded, failures, revenue,
+                        perf_counter() - start, latencies)
+
+
+def format_summary(result):
+    """
+    Formats the summary of a replay.
+
+    :param result: ReplayResult - The result of replay.
+    :return: str - The summary.
+    """
+    rate = result.orders / result.elapsed if result.elapsed else 0
+    lines = [
+        f"Orders: {result.orders} ({result.succeeded} succeeded, "
+        f"{result.orders - result.succeeded} failed)",
+        f"Revenue: ${result.revenue:.2f}",
+        f"Elapsed: {result.elapsed:.3f} s ({rate:,.0f} orders/s)",
+        "Latency (ms): " + ", ".join(
+            f"p{int(fraction * 100)} "
+            f"{percentile(result.latencies, fraction) * 1000:.3f}"
+            for fraction in (0.5, 0.9, 0.99)
+        ) + f", max {(result.latencies or [0])[-1] * 1000:.3f}",
+    ]
+    if result.failures:
+        lines.append("Failures:")
+        for reason, count in result.failures.most_common():
+            lines.append(f"  {count} x {reason}")
+    return "\n".join(lines)
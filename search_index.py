@@ -0,0 +1,179 @@
+from collections import Counter
+
+from sorted_buckets import SortedBuckets
+
+
+def normalize(text):
+    """
+    Normalizes a product name or a query for searching:
+    lower case, single spaces.
+
+    :param text: str - The text to normalize.
+    :return: str - The normalized text.
+    """
+    return " ".join(text.lower().split())
+
+
+def trigrams(text):
+    """
+    Returns the set of trigrams of a normalized text, padded so that
+    short words and word starts get trigrams too.
+
+    :param text: str - The normalized text.
+    :return: set - The trigrams of the text.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    The SearchIndex class answers type-ahead queries on product names.
+
+    Prefix queries use a SortedBuckets list of normalized names (a binary
+    search finds the first match, matches are contiguous, and adding or
+    removing a name costs O(log n)). Fuzzy queries use an
+    inverted index from trigram to product names and rank the candidates
+    sharing trigrams with the query by Jaccard similarity, so typos like
+    "macbok" still find "MacBook Air M2".
+
+    The sorted list is built in one go for the products given to the
+    constructor. The trigram index costs far more to build, so it is only
+    built on the first fuzzy query. Both are then updated incrementally
+    as products are added and removed.
+    """
+
+    def __init__(self, product_list=()):
+        """
+        Initiator (constructor) method.
+
+        :param product_list: iterable - The products to index.
+        """
+        self._products = {}
+        # Built by the first fuzzy query (see _build_grams).
+        self._grams = None
+        self._gram_counts = None
+        self._sorted = SortedBuckets(sorted(
+            (self._index(product), product) for product in product_list
+        ))
+
+    def __len__(self):
+        return len(self._products)
+
+    def add(self, product):
+        """
+        Adds a product to the index.
+
+        :param product: Product - The product to add.
+        """
+        self._sorted.add(self._index(product), product)
+
+    def add_many(self, product_list):
+        """
+        Adds many products to the index.
+
+        :param product_list: iterable - The products to add.
+        """
+        for product in product_list:
+            self.add(product)
+
+    def _index(self, product):
+        """
+        Adds a product to the name table, and to the trigram index if it
+        was built.
+
+        :param product: Product - The product to add.
+        :return: tuple - Its (normalized name, name) sort key.
+        """
+        name = product.name
+        normalized = normalize(name)
+        self._products[name] = product
+        if self._grams is not None:
+            self._add_grams(name, normalized)
+        return normalized, name
+
+    def _add_grams(self, name, normalized):
+        """
+        Adds a product name to the trigram index.
+
+        :param name: str - The name of the product.
+        :param normalized: str - Its normalized form.
+        """
+        grams = trigrams(normalized)
+        self._gram_counts[name] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(name)
+
+    def _build_grams(self):
+        """
+        Builds the trigram index of every indexed product.
+        """
+        self._grams = {}
+        self._gram_counts = {}
+        for (normalized, name), _ in self._sorted.iter_from(()):
+            self._add_grams(name, normalized)
+
+    def discard(self, product):
+        """
+        Removes a product from the index, if it is there.
+
+        :param product: Product - The product to remove.
+        """
+        name = product.name
+        if self._products.pop(name, None) is None:
+            return
+        normalized = normalize(name)
+        self._sorted.remove((normalized, name))
+        if self._grams is None:
+            return
+        del self._gram_counts[name]
+        for gram in trigrams(normalized):
+            names = self._grams[gram]
+            names.discard(name)
+            if not names:
+                del self._grams[gram]
+
+    def prefix(self, text, limit=None):
+        """
+        Returns the products whose name starts with text
+        (case insensitive), in alphabetical order.
+
+        :param text: str - The prefix.
+        :param limit: int - The maximum number of products to return.
+        :return: list - The matching products.
+        """
+        text = normalize(text)
+        matches = []
+        if limit is not None and limit <= 0:
+            return matches
+        for (normalized, _), product in self._sorted.iter_from((text,)):
+            if not normalized.startswith(text):
+                break
+            matches.append(product)
+            if len(matches) == limit:
+                break
+        return matches
+
+    def fuzzy(self, text, limit=10, min_score=0.3):
+        """
+        Returns the products whose name is similar to text,
+        the most similar first.
+
+        :param text: str - The query.
+        :param limit: int - The maximum number of products to return.
+        :param min_score: float - The minimum similarity (0 to 1).
+        :return: list - The matching products.
+        """
+        if self._grams is None:
+            self._build_grams()
+        query = trigrams(normalize(text))
+        shared = Counter()
+        for gram in query:
+            shared.update(self._grams.get(gram, ()))
+        scored = []
+        for name, common in shared.items():
+            score = common / (len(query) + self._gram_counts[name] - common)
+            if score >= min_score:
+                scored.append((-score, name))
+        scored.sort()
+        return [self._products[name] for _, name in scored[:limit]]
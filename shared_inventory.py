@@ -0,0 +1,422 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import columnar_store
+import products
+
+# Number of locks the product slots are striped over.
+LOCK_STRIPES = 64
+
+
+class SharedInventory:
+    """
+    The SharedInventory class holds the stock of a catalog in a
+    multiprocessing.shared_memory block, so that several processes work
+    on one view of the inventory. Products are identified by their row
+    (their position in the store). The block holds four columns:
+    quantities and reserved quantities (int64), active flags and kinds
+    (int8).
+
+    Rows are guarded by striped locks (row % LOCK_STRIPES): a multi-line
+    operation takes the locks of its rows in stripe order, so reserving,
+    committing or ordering several rows is atomic and two operations can
+    never wait on each other.
+
+    The process creating the inventory owns the block and must call
+    unlink once every process is done with it.
+    """
+
+    def __init__(self, count, name=None, locks=None):
+        """
+        Initiator (constructor) method. Creates a new (zeroed) block,
+        or attaches to an existing one if name is given.
+
+        :param count: int - The number of rows.
+        :param name: str - The name of an existing block.
+        :param locks: list - The stripe locks of an existing block.
+        """
+        self.count = count
+        size = max(18 * count, 1)
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True,
+                                                      size=size)
+            self.locks = [multiprocessing.Lock()
+                          for _ in range(LOCK_STRIPES)]
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+            self.locks = locks
+        buffer = self._memory.buf
+        self.quantities = buffer[:8 * count].cast("q")
+        self.reserved = buffer[8 * count:16 * count].cast("q")
+        self.active = buffer[16 * count:17 * count].cast("b")
+        self.kinds = buffer[17 * count:18 * count].cast("b")
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    @classmethod
+    def from_products(cls, product_list):
+        """
+        Creates a shared inventory holding the stock of products,
+        row i being product_list[i]. The quantities the products have
+        reserved are held in the inventory too.
+
+        :param product_list: list - The products.
+        :return: SharedInventory - The inventory.
+        """
+        inventory = cls(len(product_list))
+        for row, product in enumerate(product_list):
+            inventory.kinds[row] = _kind_of(product)
+            inventory.quantities[row] = product.get_quantity()
+            inventory.reserved[row] = product.reserved
+            inventory.active[row] = 1 if product.is_active() else 0
+        return inventory
+
+    def attach_args(self):
+        """
+        Returns what another process needs to attach to the inventory
+        (see attach).
+
+        :return: tuple - The arguments of attach.
+        """
+        return self.count, self.name, self.locks
+
+    @classmethod
+    def attach(cls, count, name, locks):
+        """
+        Attaches to an inventory created by another process.
+
+        :param count: int - The number of rows.
+        :param name: str - The name of the block.
+        :param locks: list - The stripe locks.
+        :return: SharedInventory - The inventory.
+        """
+        return cls(count, name, locks)
+
+    def close(self):
+        """
+        Detaches the current process from the block.
+        """
+        for column in (self.quantities, self.reserved, self.active,
+                       self.kinds):
+            column.release()
+        self._memory.close()
+
+    def unlink(self):
+        """
+        Closes and destroys the block (in the process that created it).
+        """
+        self.close()
+        self._memory.unlink()
+
+    def _stripes(self, rows):
+        """
+        Returns the locks of the given rows, in stripe order.
+        """
+        return [self.locks[stripe]
+                for stripe in sorted({row % LOCK_STRIPES for row in rows})]
+
+    def _locked(self, requested, apply):
+        """
+        Runs apply on the requested quantities while holding the locks
+        of their rows.
+        """
+        locks = self._stripes(requested)
+        for lock in locks:
+            lock.acquire()
+        try:
+            return apply(requested)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @staticmethod
+    def _requested(lines):
+        """
+        Sums the quantities requested for each row.
+
+        :param lines: iterable - Tuples of a row and a quantity.
+        :return: dict - Row -> total quantity.
+        """
+        requested = {}
+        for row, quantity in lines:
+            requested[row] = requested.get(row, 0) + quantity
+        return requested
+
+    def _check_stock(self, requested):
+        """
+        Raises an exception if a requested quantity exceeds the
+        available stock of its row. The caller holds the locks.
+        """
+        for row, quantity in requested.items():
+            if self.kinds[row] == columnar_store.KIND_NON_STOCKED:
+                continue
+            if quantity > self.quantities[row] - self.reserved[row]:
+                raise ValueError("Not enough stock available.")
+
+    def _remove(self, requested):
+        """
+        Removes requested quantities from the stock, deactivating the
+        rows running out. The caller holds the locks.
+        """
+        for row, quantity in requested.items():
+            if self.kinds[row] == columnar_store.KIND_NON_STOCKED:
+                continue
+            left = self.quantities[row] - quantity
+            self.quantities[row] = left
+            if left == 0:
+                self.active[row] = 0
+
+    def order(self, lines):
+        """
+        Atomically checks the stock of order lines and removes it.
+        Raises an exception, changing nothing, if a row has not enough
+        stock available.
+
+        :param lines: iterable - Tuples of a row and a quantity.
+        """
+        def apply(requested):
+            self._check_stock(requested)
+            self._remove(requested)
+        self._locked(self._requested(lines), apply)
+
+    def reserve(self, lines):
+        """
+        Atomically holds the quantities of order lines.
+        Raises an exception, holding nothing, if a row has not enough
+        stock available.
+
+        :param lines: iterable - Tuples of a row and a quantity.
+        """
+        def apply(requested):
+            self._check_stock(requested)
+            for row, quantity in requested.items():
+                self.reserved[row] += quantity
+        self._locked(self._requested(lines), apply)
+
+    def commit(self, lines):
+        """
+        Atomically turns quantities held with reserve into sales.
+
+        :param lines: iterable - Tuples of a row and a quantity.
+        """
+        def apply(requested):
+            for row, quantity in requested.items():
+                self.reserved[row] -= quantity
+            self._remove(requested)
+        self._locked(self._requested(lines), apply)
+
+    def release(self, lines):
+        """
+        Atomically gives back quantities held with reserve.
+
+        :param lines: iterable - Tuples of a row and a quantity.
+        """
+        def apply(requested):
+            for row, quantity in requested.items():
+                self.reserved[row] -= quantity
+        self._locked(self._requested(lines), apply)
+
+
+def _kind_of(product):
+    """
+    Returns the columnar kind of a product.
+    """
+    if isinstance(product, products.NonStockedProduct):
+        return columnar_store.KIND_NON_STOCKED
+    if isinstance(product, products.LimitedProduct):
+        return columnar_store.KIND_LIMITED
+    return columnar_store.KIND_STOCKED
+
+
+def _catalog_row(product):
+    """
+    Returns the picklable data a worker needs to validate and price
+    orders of a product.
+    """
+    return (_kind_of(product), product.name, product.price,
+            getattr(product, "maximum", None), product.promotion)
+
+
+# State of a worker process, set by _init_worker.
+_worker = {}
+
+
+def _init_worker(attach_args, catalog, promotion_engine):
+    """
+    Initializes a worker process: attaches the shared inventory and
+    rebuilds the products (and the promotion engine) used for pricing.
+    """
+    _worker["inventory"] = SharedInventory.attach(*attach_args)
+    _worker["products"] = [
+        products.Product.restore(name, price, 0, promotion=promotion)
+        for _, name, price, _, promotion in catalog
+    ]
+    _worker["catalog"] = catalog
+    _worker["engine"] = promotion_engine
+
+
+def _check_line(catalog_row, quantity):
+    """
+    Validates the quantity of an order line, raising the same
+    exceptions as Product.check_purchase (the stock is checked by the
+    shared inventory).
+    """
+    kind, name, _, maximum, _ = catalog_row
+    if not isinstance(quantity, int):
+        raise TypeError("Quantity has to be an integer.")
+    if quantity <= 0:
+        raise ValueError("Quantity has to be greater than zero.")
+    if kind == columnar_store.KIND_LIMITED and quantity > maximum:
+        raise ValueError(f"{name} is limited to add max {maximum}.")
+
+
+def _place_orders(orders):
+    """
+    Worker process: validates, prices and commits orders against the
+    shared inventory.
+
+    :param orders: list - Orders, each a list of (row, quantity).
+    :return: list - The total of each order, or the exception it raised.
+    """
+    inventory = _worker["inventory"]
+    catalog = _worker["catalog"]
+    pricing_products = _worker["products"]
+    engine = _worker["engine"]
+    results = []
+    for lines in orders:
+        try:
+            for row, quantity in lines:
+                _check_line(catalog[row], quantity)
+            if engine is not None:
+                total = engine.price_basket([
+                    (pricing_products[row], quantity)
+                    for row, quantity in lines
+                ])
+            else:
+                total = sum(pricing_products[row]._total_price(quantity)
+                            for row, quantity in lines)
+            inventory.order(lines)
+        except (TypeError, ValueError) as error:
+            results.append(error)
+            continue
+        results.append(total)
+    return results
+
+
+class ProcessOrderPool:
+    """
+    The ProcessOrderPool class places the orders of a store from a pool
+    of worker processes, so that validation and pricing run on several
+    cores. The stock lives in a SharedInventory that every worker
+    updates atomically; the quantities reserved in the store are held
+    there too, so the pool never sells them. Prices, promotions and the
+    promotion engine of the store are copied to the workers when the
+    pool starts and must not change while it runs.
+
+    The Product objects of the store are not updated while orders are
+    placed; sync writes the shared stock back into them (and so into the
+    store aggregates). Orders placed by the pool are not journaled.
+    """
+
+    def __init__(self, store, workers=None, chunk_size=64):
+        """
+        Initiator (constructor) method.
+
+        :param store: Store - The store to place the orders in.
+        :param workers: int - The number of worker processes
+        (default: the number of CPUs).
+        :param chunk_size: int - The number of orders sent to a worker
+        at a time by order_many.
+        """
+        self.store = store
+        self.chunk_size = chunk_size
+        self._products = list(store.list_products)
+        self._rows = {
+            product.name: row for row, product in enumerate(self._products)
+        }
+        self.inventory = SharedInventory.from_products(self._products)
+        self._executor = ProcessPoolExecutor(
+            workers,
+            initializer=_init_worker,
+            initargs=(self.inventory.attach_args(),
+                      [_catalog_row(product) for product in self._products],
+                      store.promotion_engine),
+        )
+
+    def close(self):
+        """
+        Stops the workers, writes the stock back into the store
+        and destroys the shared inventory.
+        """
+        self._executor.shutdown()
+        self.sync()
+        self.inventory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def _lines(self, shopping_list):
+        """
+        Converts a shopping list to (row, quantity) lines.
+        """
+        return [(self._rows[product.name], quantity)
+                for product, quantity in shopping_list]
+
+    def order(self, shopping_list):
+        """
+        Places an order in a worker process and returns its total price.
+        Raises the same exceptions as Store.order.
+
+        :param shopping_list: list - A list of tuples where
+        each tuple contains a Product object and the desired quantity.
+        :return: float - The total price of the order.
+        """
+        result, = self._executor.submit(
+            _place_orders, [self._lines(shopping_list)]
+        ).result()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def order_many(self, orders):
+        """
+        Places many orders, spread over the worker processes in chunks.
+        Unlike Store.order_many, each order goes through or fails on its
+        own.
+
+        :param orders: list - A list of shopping lists.
+        :return: list - The total price of each order, or the exception
+        it raised.
+        """
+        chunks = []
+        for start in range(0, len(orders), self.chunk_size):
+            chunks.append([self._lines(shopping_list)
+                           for shopping_list in
+                           orders[start:start + self.chunk_size]])
+        results = []
+        for chunk_results in self._executor.map(_place_orders, chunks):
+            results += chunk_results
+        return results
+
+    def sync(self):
+        """
+        Writes the shared stock and active flags back into the Product
+        objects of the store. A quantity is never written below what the
+        product has reserved.
+        """
+        inventory = self.inventory
+        for row, product in enumerate(self._products):
+            if inventory.kinds[row] != columnar_store.KIND_NON_STOCKED:
+                quantity = max(inventory.quantities[row], product.reserved)
+                if product.get_quantity() != quantity:
+                    product.quantity = quantity
+            if inventory.active[row] and not product.is_active():
+                product.activate()
+            elif not inventory.active[row] and product.is_active():
+                product.deactivate()
@@ -0,0 +1,213 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+import products
+
+MAGIC = b"BBSNAP01"
+VERSION = 2
+
+# magic, version, count, total quantity, last journaled order sequence,
+# name blob size, promotions size
+HEADER = struct.Struct("<8sIxxxxqqqqq")
+
+# Fixed-width columns, in file order, as (name, typecode).
+# 8-byte columns come first so that every column stays aligned.
+COLUMNS = (
+    ("prices", "d"),
+    ("quantities", "q"),
+    ("maximums", "q"),
+    ("promotion_ids", "i"),
+    ("kinds", "b"),
+    ("active", "b"),
+)
+
+
+def _align(offset):
+    """
+    Rounds an offset up to the next multiple of 8.
+    """
+    return (offset + 7) & ~7
+
+
+def _layout(count, names_size):
+    """
+    Computes the offset of every section of a snapshot.
+
+    :param count: int - The number of products.
+    :param names_size: int - The size of the UTF-8 name blob.
+    :return: dict - Section name -> (offset, size in bytes).
+    """
+    sections = {}
+    offset = _align(HEADER.size)
+    sections["name_offsets"] = (offset, (count + 1) * 8)
+    offset = _align(offset + (count + 1) * 8)
+    for name, typecode in COLUMNS:
+        size = count * array(typecode).itemsize
+        sections[name] = (offset, size)
+        offset = _align(offset + size)
+    sections["names"] = (offset, names_size)
+    sections["promotions"] = (_align(offset + names_size), None)
+    return sections
+
+
+def _encode_promotion(promotion):
+    """
+    Encodes a promotion as a JSON-compatible dict.
+
+    :param promotion: Promotion - The promotion to encode.
+    :return: dict - The type and attributes of the promotion.
+    """
+    promotion_type = type(promotion).__name__
+    if getattr(products, promotion_type, None) is not type(promotion):
+        raise TypeError(f"{promotion_type} promotions cannot be saved.")
+    return {"type": promotion_type, "attributes": vars(promotion)}
+
+
+def _decode_promotion(data):
+    """
+    Rebuilds a promotion encoded by _encode_promotion.
+
+    :param data: dict - The encoded promotion.
+    :return: Promotion - The promotion.
+    """
+    promotion_class = getattr(products, data["type"], None)
+    if not (
+        isinstance(promotion_class, type)
+        and issubclass(promotion_class, products.Promotion)
+    ):
+        raise ValueError(f"Unknown promotion type {data['type']}.")
+    promotion = promotion_class.__new__(promotion_class)
+    vars(promotion).update(data["attributes"])
+    return promotion
+
+
+def save_columns(path, names, columns, promotions, total_quantity,
+                 journal_sequence=0):
+    """
+    Writes a snapshot file.
+
+    :param path: str - The path of the snapshot file.
+    :param names: list - The product names, in row order.
+    :param columns: dict - One array (or buffer) per entry of COLUMNS.
+    :param promotions: list - The promotion table.
+    :param total_quantity: int - The total quantity of the catalog.
+    :param journal_sequence: int - The sequence number of the last
+    journaled order reflected in the columns (see the journal module).
+    """
+    encoded_names = [name.encode("utf-8") for name in names]
+    name_offsets = array("q", [0])
+    position = 0
+    for encoded in encoded_names:
+        position += len(encoded)
+        name_offsets.append(position)
+    names_blob = b"".join(encoded_names)
+    promotions_blob = json.dumps(
+        [_encode_promotion(promotion) for promotion in promotions]
+    ).encode("utf-8")
+    count = len(encoded_names)
+    sections = _layout(count, len(names_blob))
+    # Written next to the target and renamed over it, so that a crash
+    # never leaves a truncated snapshot and mappings of the previous file
+    # stay valid.
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as snapshot_file:
+        snapshot_file.write(
+            HEADER.pack(MAGIC, VERSION, count, total_quantity,
+                        journal_sequence, len(names_blob),
+                        len(promotions_blob))
+        )
+        payloads = [("name_offsets", name_offsets)]
+        payloads += [(name, columns[name]) for name, _ in COLUMNS]
+        payloads += [("names", names_blob),
+                     ("promotions", promotions_blob)]
+        for name, payload in payloads:
+            offset = sections[name][0]
+            snapshot_file.write(b"\0" * (offset - snapshot_file.tell()))
+            snapshot_file.write(payload)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary_path, path)
+
+
+class NameTable:
+    """
+    Read-only sequence of the product names of a snapshot, decoded from
+    the memory-mapped name blob only when a name is accessed.
+    """
+
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, offsets, blob):
+        """
+        Initiator (constructor) method.
+
+        :param offsets: memoryview - count + 1 offsets into the blob.
+        :param blob: memoryview - The UTF-8 encoded names.
+        """
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("Name table index out of range.")
+        offsets = self._offsets
+        return str(self._blob[offsets[row]:offsets[row + 1]], "utf-8")
+
+    def __iter__(self):
+        blob = self._blob
+        offsets = self._offsets
+        for row in range(len(self)):
+            yield str(blob[offsets[row]:offsets[row + 1]], "utf-8")
+
+
+def load_columns(path):
+    """
+    Memory-maps a snapshot file. Columns are returned as typed views of
+    a private (copy-on-write) mapping: nothing is read before it is used,
+    and changes are never written back to the file.
+
+    :param path: str - The path of the snapshot file.
+    :return: dict - names (NameTable), one view per entry of COLUMNS,
+    promotions (list), total_quantity (int) and journal_sequence (int).
+    """
+    with open(path, "rb") as snapshot_file:
+        mapping = mmap.mmap(snapshot_file.fileno(), 0,
+                            access=mmap.ACCESS_COPY)
+    if len(mapping) < HEADER.size:
+        raise ValueError(f"{path} is not a store snapshot.")
+    (magic, version, count, total_quantity, journal_sequence, names_size,
+     promotions_size) = HEADER.unpack_from(mapping)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a store snapshot.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}.")
+    view = memoryview(mapping)
+    sections = _layout(count, names_size)
+
+    def section(name, typecode=None):
+        offset, size = sections[name]
+        data = view[offset:offset + size]
+        return data.cast(typecode) if typecode else data
+
+    promotions_offset = sections["promotions"][0]
+    promotions = [
+        _decode_promotion(data)
+        for data in json.loads(
+            bytes(view[promotions_offset:promotions_offset + promotions_size])
+        )
+    ]
+    columns = {name: section(name, typecode) for name, typecode in COLUMNS}
+    columns["names"] = NameTable(section("name_offsets", "q"),
+                                 section("names"))
+    columns["promotions"] = promotions
+    columns["total_quantity"] = total_quantity
+    columns["journal_sequence"] = journal_sequence
+    return columns
@@ -0,0 +1,156 @@
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+
+class SortedBuckets:
+    """
+    The SortedBuckets class is a sorted list of (key, value) entries with
+    unique keys, used by the price and search indexes.
+
+    A flat sorted list costs O(n) per insertion or removal (the tail is
+    shifted). Here the entries are split into buckets of at most
+    2 * LOAD sorted keys, next to the values in the same order, with the
+    last key of every bucket in a separate list: two binary searches find
+    the place of a key and an update only shifts one bucket, so updates
+    cost O(log n) plus a bounded shift.
+    """
+
+    LOAD = 1000
+
+    def __init__(self, entries=()):
+        """
+        Initiator (constructor) method.
+
+        :param entries: iterable - (key, value) tuples, sorted by key.
+        """
+        entries = list(entries)
+        self._keys = []
+        self._values = []
+        self._maxes = []
+        self._size = len(entries)
+        for start in range(0, len(entries), self.LOAD):
+            bucket = entries[start:start + self.LOAD]
+            self._keys.append([key for key, _ in bucket])
+            self._values.append([value for _, value in bucket])
+            self._maxes.append(bucket[-1][0])
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key, value):
+        """
+        Inserts an entry at its place.
+
+        :param key: The key of the entry (not in the list yet).
+        :param value: The value of the entry.
+        """
+        self._size += 1
+        if not self._maxes:
+            self._keys.append([key])
+            self._values.append([value])
+            self._maxes.append(key)
+            return
+        bucket = bisect_left(self._maxes, key)
+        if bucket == len(self._maxes):
+            # Past the last key: goes at the end of the last bucket.
+            bucket -= 1
+            self._keys[bucket].append(key)
+            self._values[bucket].append(value)
+            self._maxes[bucket] = key
+        else:
+            keys = self._keys[bucket]
+            position = bisect_right(keys, key)
+            keys.insert(position, key)
+            self._values[bucket].insert(position, value)
+        if len(self._keys[bucket]) > 2 * self.LOAD:
+            self._split(bucket)
+
+    def _split(self, bucket):
+        """
+        Splits a full bucket in two halves.
+
+        :param bucket: int - The index of the bucket.
+        """
+        keys = self._keys[bucket]
+        values = self._values[bucket]
+        half = len(keys) // 2
+        self._keys[bucket:bucket + 1] = [keys[:half], keys[half:]]
+        self._values[bucket:bucket + 1] = [values[:half], values[half:]]
+        self._maxes.insert(bucket, keys[half - 1])
+
+    def remove(self, key):
+        """
+        Removes the entry with the given key, which has to be in the list.
+
+        :param key: The key of the entry.
+        """
+        bucket = bisect_left(self._maxes, key)
+        keys = self._keys[bucket]
+        position = bisect_left(keys, key)
+        del keys[position]
+        del self._values[bucket][position]
+        self._size -= 1
+        if not keys:
+            del self._keys[bucket]
+            del self._values[bucket]
+            del self._maxes[bucket]
+        else:
+            self._maxes[bucket] = keys[-1]
+
+    def iter_from(self, low):
+        """
+        Iterates over the entries whose key is at least low, in order.
+
+        :param low: The lowest key.
+        :return: generator - (key, value) tuples.
+        """
+        bucket = bisect_left(self._maxes, low)
+        if bucket == len(self._maxes):
+            return
+        start = bisect_left(self._keys[bucket], low)
+        for bucket in range(bucket, len(self._maxes)):
+            keys = self._keys[bucket]
+            values = self._values[bucket]
+            for position in range(start, len(keys)):
+                yield keys[position], values[position]
+            start = 0
+
+    def values_between(self, low, high):
+        """
+        Returns the values of the entries whose key is between low and
+        high (both included), in order.
+
+        :param low: The lowest key.
+        :param high: The highest key.
+        :return: list - The values.
+        """
+        values = []
+        bucket = bisect_left(self._maxes, low)
+        if bucket == len(self._maxes):
+            return values
+        start = bisect_left(self._keys[bucket], low)
+        while bucket < len(self._maxes):
+            keys = self._keys[bucket]
+            end = bisect_right(keys, high)
+            values += self._values[bucket][start:end]
+            if end < len(keys):
+                break
+            bucket += 1
+            start = 0
+        return values
+
+    def values(self):
+        """
+        Iterates over the values, in key order.
+
+        :return: iterator - The values.
+        """
+        return chain.from_iterable(self._values)
+
+    def reversed_values(self):
+        """
+        Iterates over the values, in reverse key order.
+
+        :return: iterator - The values.
+        """
+        return chain.from_iterable(map(reversed, reversed(self._values)))
@@ -1,44 +1,632 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from contextlib import contextmanager
+
+import columnar_store
+import events
+import products
+import snapshot
+from price_index import PriceIndex
+from quote_cache import DEFAULT_SIZE, QuoteCache
+from search_index import SearchIndex
+
+PENDING = "pending"
+COMMITTED = "committed"
+RELEASED = "released"
+
+
+class Reservation:
+    """
+    The Reservation class represents an order whose quantities are held
+    by Store.reserve: the held stock cannot be bought by anyone else,
+    but is only removed from the inventory once the reservation is
+    committed. Releasing the reservation gives the stock back.
+    """
+
+    def __init__(self, store, shopping_list, requested):
+        """
+        Initiator (constructor) method.
+
+        :param store: Store - The store the order was placed in.
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        :param requested: list - Lists of [product, held quantity].
+        """
+        self.store = store
+        self.shopping_list = list(shopping_list)
+        self._requested = requested
+        self.state = PENDING
+
+    def _check_pending(self):
+        """
+        Raises an exception if the reservation was already
+        committed or released.
+        """
+        if self.state != PENDING:
+            raise ValueError(f"The reservation is already {self.state}.")
+
+    def commit(self):
+        """
+        Second phase of an order: removes the held quantities from the
+        stock and returns the total price of the order.
+
+        :return: float - The total price of the order.
+        """
+        with self.store.events.batch():
+            if not self.store.thread_safe:
+                return self._commit()
+            with self.store._locked(
+                product for product, _ in self._requested
+            ):
+                return self._commit()
+
+    def _commit(self):
+        """
+        Commits the reservation. The caller holds the product locks.
+
+        :return: float - The total price of the order.
+        """
+        self._check_pending()
+        # Every line is checked before any stock changes, so a commit
+        # either goes through or leaves the reservation pending.
+        for product_instance, quantity in self._requested:
+            product_instance.check_commit(quantity)
+        total = self.store.price_order(self.shopping_list)
+        # Write-ahead: if the journal refuses the order, nothing changed.
+        if self.store.journal is not None:
+            self.store.journal.append(self.shopping_list, total)
+        for product_instance, quantity in self._requested:
+            product_instance.commit_reservation(quantity)
+        self.state = COMMITTED
+        return total
+
+    def release(self):
+        """
+        Cancels the order and gives the held quantities back.
+        """
+        with self.store._locked(
+            product for product, _ in self._requested
+        ):
+            self._check_pending()
+            for product_instance, quantity in self._requested:
+                product_instance.release(quantity)
+            self.state = RELEASED
+
+
+class ProductList(Sequence):
+    """
+    The ProductList class is a read-only, live view of the products of a
+    Store, in the order they were added (see Store.list_products).
+
+    It supports len, iteration, indexing, slicing (which returns a list)
+    and comparison with lists, but no changes: products are added and
+    removed through the store.
+    """
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store):
+        """
+        Initiator (constructor) method.
+
+        :param store: Store - The store whose products are viewed.
+        """
+        self._store = store
+
+    def __len__(self):
+        return len(self._store._by_name)
+
+    def __iter__(self):
+        for product in self._store._slots:
+            if product is not None:
+                yield product
+
+    def __getitem__(self, index):
+        store = self._store
+        if store._empty_slots:
+            # Positions only match the slots once the removed products
+            # are dropped.
+            store._compact()
+        return store._slots[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (list, ProductList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __repr__(self):
+        return f"ProductList({list(self)!r})"
+
+
 class Store:
     """
     The Store class represents a store that sells products.
     It manages the inventory of products and provides
     methods to add, remove, and order products.
 
+    Products are kept in insertion order in a slot list, next to a
+    name index mapping each product name to its slot. Removing a product
+    leaves an empty slot behind which is compacted away once empty slots
+    make up half of the list, so lookups, additions and removals by name
+    are O(1) (amortized), plus O(log n) to keep the price and search
+    indexes in order once they are built. Each product also gets a
+    sequence number that never changes (see iter_products), used as a
+    pagination cursor.
+
+    The store subscribes to every product it holds and keeps the set of
+    active products and the total quantity up to date as products change,
+    so get_all_products and get_total_quantity never walk the catalog.
+    It also keeps a price-ordered index of its products for price range
+    queries and cheapest / most expensive listings, and a name index for
+    prefix and fuzzy search, both built by the first query using them.
+
+    Inventory changes are published on the store's EventBus (events):
+    subscribers receive quantity, activation, price and promotion
+    changes, coalesced to one event per product and kind for each order
+    (or batch of orders).
+
+    Cart totals priced by a promotion engine and asked for with quote
+    are cached, and dropped when one of their products changes (see the
+    quote_cache module).
+
+    An order validates every line before changing any stock, so a
+    multi-line order goes through entirely or not at all. Orders can
+    also go through two phases: reserve validates the whole order and
+    holds its quantities, then the reservation is committed (the stock is
+    removed and the order priced) or released.
+
+    A store created with thread_safe=True can take orders from several
+    threads at once: each product gets its own lock, and each order (or
+    phase) takes the locks of its products in name order, so two orders
+    can never wait on each other.
+
     Attributes:
-    - list_products (list): A list of Product objects
-    representing the products available in the store.
+    - list_products (ProductList): A read-only view of the Product
+    objects available in the store.
     """
 
-    def __init__(self, list_products):
+    def __init__(self, list_products, thread_safe=False,
+                 promotion_engine=None, journal=None,
+                 quote_cache_size=DEFAULT_SIZE):
         """
         Initiator (constructor) method.
         Initializes the Store object with a list of products.
 
         :param list_products: list - A list of Product
         objects representing the products available in the store.
+        :param thread_safe: bool - Whether orders may be placed
+        from several threads at once.
+        :param promotion_engine: PromotionEngine - Optional engine
+        pricing orders with stacked and basket-level promotions.
+        :param journal: OrderJournal - Optional journal recording
+        every committed order.
+        :param quote_cache_size: int - The number of cart totals
+        cached by quote (0 disables the cache).
         """
         if not list_products:
             raise ValueError("The list of products cannot be empty.")
-        if not isinstance(list_products, list):
+        if not isinstance(list_products, (list, ProductList)):
             raise TypeError("The list of products must be a list.")
+        self.thread_safe = thread_safe
+        self.promotion_engine = promotion_engine
+        self.journal = journal
+        self.journal_sequence = 0
+        self._aggregates_lock = threading.Lock()
+        self.events = events.EventBus()
+        self._quote_cache = QuoteCache(quote_cache_size)
         self.list_products = list_products
 
+    @property
+    def list_products(self):
+        """
+        Returns a read-only view of the products of the store, in the
+        order they were added. The view follows later changes; use
+        list(store.list_products) for a copy.
+
+        :return: ProductList - The products.
+        """
+        return ProductList(self)
+
+    @list_products.setter
+    def list_products(self, value):
+        """
+        Replaces the whole inventory of the store.
+
+        :param value: list - A list of Product objects.
+        """
+        # A copy, since the value may be the view of this very store.
+        value = list(value)
+        by_name = {}
+        for position, product in enumerate(value):
+            if product.name in by_name:
+                raise ValueError(f"{product.name} is already in the store.")
+            by_name[product.name] = position
+        for product in getattr(self, "_slots", ()):
+            if product is not None:
+                product.remove_listener(self._product_changed)
+        # The whole inventory is set up in bulk rather than with _add,
+        # whose per-product bookkeeping dominates loading large catalogs.
+        self._slots = value
+        self._sequences = list(range(1, len(value) + 1))
+        self._next_sequence = len(value) + 1
+        self._by_name = by_name
+        self._empty_slots = 0
+        self._active = {
+            product.name: product for product in value if product.is_active()
+        }
+        self._active_unordered = False
+        self._total_quantity = sum(
+            product.get_quantity() for product in value
+        )
+        self._locks = {}
+        if self.thread_safe:
+            self._locks = {name: threading.Lock() for name in by_name}
+        self._quote_cache.clear()
+        listener = self._product_changed
+        for product in value:
+            product.add_listener(listener)
+        # The price and search indexes are built in one go by the first
+        # query that needs them (see _prices and _names), so building or
+        # loading a store does not pay for them.
+        self._price_index = None
+        self._search_index = None
+
     def add_product(self, product):
         """
         Adds a product to the store's inventory.
+        Raises an exception if a product with the same name
+        is already in the store.
 
         :param product: Product - The Product object to add to the store.
         """
-        self.list_products.append(product)
+        self._add(product)
+        if self._price_index is not None:
+            self._price_index.add(product)
+        if self._search_index is not None:
+            self._search_index.add(product)
+
+    def add_products(self, product_list):
+        """
+        Adds many products to the store's inventory at once. The price
+        and search indexes are updated once for all of them, rather than
+        product by product, which would be quadratic for large imports.
+        Raises an exception (before adding anything) if a name is already
+        in the store or appears twice.
+
+        :param product_list: iterable - The Product objects to add.
+        """
+        product_list = list(product_list)
+        names = set()
+        for product in product_list:
+            if product.name in self._by_name or product.name in names:
+                raise ValueError(f"{product.name} is already in the store.")
+            names.add(product.name)
+        for product in product_list:
+            self._add(product)
+        if self._price_index is not None:
+            self._price_index.add_many(product_list)
+        if self._search_index is not None:
+            self._search_index.add_many(product_list)
+
+    def _add(self, product):
+        """
+        Adds a product to the slot list, the name index and the
+        aggregates, but not to the price and search indexes.
+
+        :param product: Product - The Product object to add.
+        """
+        if product.name in self._by_name:
+            raise ValueError(f"{product.name} is already in the store.")
+        self._by_name[product.name] = len(self._slots)
+        self._slots.append(product)
+        self._sequences.append(self._next_sequence)
+        self._next_sequence += 1
+        if product.is_active():
+            self._active[product.name] = product
+        self._total_quantity += product.get_quantity()
+        if self.thread_safe:
+            self._locks[product.name] = threading.Lock()
+        product.add_listener(self._product_changed)
 
     def remove_product(self, product):
         """
         Removes a product from the store's inventory.
 
-        :param product: Product - The Product object to remove from the store.
+        :param product: Product or str - The Product object
+        (or its name) to remove from the store.
+        """
+        name = product if isinstance(product, str) else product.name
+        position = self._by_name.pop(name, None)
+        if position is None:
+            return
+        removed = self._slots[position]
+        removed.remove_listener(self._product_changed)
+        self._quote_cache.invalidate(name)
+        self._active.pop(name, None)
+        self._locks.pop(name, None)
+        if self._price_index is not None:
+            self._price_index.discard(removed)
+        if self._search_index is not None:
+            self._search_index.discard(removed)
+        self._total_quantity -= removed.get_quantity()
+        self._slots[position] = None
+        self._empty_slots += 1
+        if self._empty_slots * 2 > len(self._slots):
+            self._compact()
+
+    def _compact(self):
+        """
+        Drops the empty slots left behind by removed products
+        and re-numbers the name index.
+        """
+        kept = [
+            position for position, product in enumerate(self._slots)
+            if product is not None
+        ]
+        self._slots = [self._slots[position] for position in kept]
+        self._sequences = [self._sequences[position] for position in kept]
+        self._by_name = {
+            product.name: position
+            for position, product in enumerate(self._slots)
+        }
+        self._empty_slots = 0
+
+    def _product_changed(self, product, field, old, new):
+        """
+        Listener registered on every product of the store.
+        Keeps the active products, the total quantity
+        and the price index in sync, drops the cached quotes of the
+        product when its price, promotion or status changes, and
+        publishes the change to the event subscribers.
+
+        :param product: Product - The product that changed.
+        :param field: str - The name of the changed field.
+        :param old: The previous value of the field.
+        :param new: The new value of the field.
+        """
+        if self.thread_safe:
+            with self._aggregates_lock:
+                self._update_aggregates(product, field, old, new)
+        else:
+            self._update_aggregates(product, field, old, new)
+        if field != "quantity":
+            self._quote_cache.invalidate(product.name)
+        if self.events.has_subscribers:
+            self.events.publish(events.InventoryEvent(
+                events.event_kind(field, new), product, old, new
+            ))
+
+    def _update_aggregates(self, product, field, old, new):
+        """
+        Applies a product change to the active products,
+        the total quantity and the price index.
+
+        :param product: Product - The product that changed.
+        :param field: str - The name of the changed field.
+        :param old: The previous value of the field.
+        :param new: The new value of the field.
+        """
+        if field == "quantity":
+            self._total_quantity += new - old
+        elif field == "active":
+            if new:
+                self._active[product.name] = product
+                self._active_unordered = True
+            else:
+                self._active.pop(product.name, None)
+        elif field == "price" and self._price_index is not None:
+            self._price_index.update(product)
+
+    def save(self, path):
+        """
+        Saves the inventory to a compact snapshot file: a name table plus
+        fixed-width price, quantity, limit, kind, flag and promotion
+        columns (see the snapshot module).
+
+        The snapshot records the sequence number of the last journaled
+        order, so that replaying the journal over it skips the orders
+        it already reflects. Orders are blocked (every product lock is
+        held, in a thread safe store) from the moment the sequence
+        number is read until the quantities are copied, so the snapshot
+        reflects exactly the orders up to that number.
+
+        :param path: str - The path of the snapshot file.
+        """
+        with self._locked(self.list_products):
+            if self.journal is not None:
+                self.journal_sequence = self.journal.sequence
+            inventory = columnar_store.ColumnarStore(self.list_products)
+        inventory.save(path, self.journal_sequence)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Creates a store from a snapshot file written by save.
+        The file is memory-mapped and products are rebuilt straight from
+        its columns, without running the Product validation again, and
+        the store is set up in bulk, leaving the price and search indexes
+        to the first query needing them.
+
+        Loading still costs one Product per row (about 0.5s per 100k
+        products). ColumnarStore.load is the constant-time path: it maps
+        the file and builds products only when they are accessed.
+
+        :param path: str - The path of the snapshot file.
+        :param kwargs: Other arguments of the Store constructor.
+        :return: Store - The loaded store.
+        """
+        columns = snapshot.load_columns(path)
+        names = columns["names"]
+        prices = columns["prices"]
+        quantities = columns["quantities"]
+        maximums = columns["maximums"]
+        promotion_ids = columns["promotion_ids"]
+        kinds = columns["kinds"]
+        active = columns["active"]
+        # NO_PROMOTION (-1) picks the trailing None.
+        promotions = columns["promotions"] + [None]
+        restore = {
+            columnar_store.KIND_STOCKED: products.Product.restore,
+            columnar_store.KIND_NON_STOCKED:
+                products.NonStockedProduct.restore,
+        }
+        product_list = []
+        for row, name in enumerate(names):
+            kind = kinds[row]
+            if kind == columnar_store.KIND_LIMITED:
+                product = products.LimitedProduct.restore(
+                    name, prices[row], quantities[row], active[row] == 1,
+                    promotions[promotion_ids[row]], maximum=maximums[row],
+                )
+            else:
+                product = restore[kind](
+                    name, prices[row], quantities[row], active[row] == 1,
+                    promotions[promotion_ids[row]],
+                )
+            product_list.append(product)
+        loaded = cls(product_list, **kwargs)
+        loaded.journal_sequence = columns["journal_sequence"]
+        return loaded
+
+    def get_product(self, name):
+        """
+        Returns the product with the given name.
+        Raises an exception if there is no such product in the store.
+
+        :param name: str - The name of the product.
+        :return: Product - The Product object with the given name.
+        """
+        position = self._by_name.get(name)
+        if position is None:
+            raise KeyError(f"{name} is not in the store.")
+        return self._slots[position]
+
+    def product_at(self, sequence):
         """
-        new_products = [item for item in self.list_products if item.name != product.name]
-        self.list_products = new_products
+        Returns the product with the given sequence number.
+        Raises an exception if there is no such product in the store.
+
+        :param sequence: int - The sequence number of the product.
+        :return: Product - The Product object.
+        """
+        position = bisect_left(self._sequences, sequence)
+        if (
+            position < len(self._sequences)
+            and self._sequences[position] == sequence
+            and self._slots[position] is not None
+        ):
+            return self._slots[position]
+        raise KeyError(f"There is no product #{sequence} in the store.")
+
+    def iter_products(self, after=0):
+        """
+        Iterates over the products of the store in the order they were
+        added, with their sequence number: a number given to each product
+        when it is added, which never changes and is never reused, so it
+        can serve as a stable cursor for pagination.
+
+        :param after: int - Only yield the products with a greater
+        sequence number.
+        :return: generator - Tuples (sequence number, Product).
+        """
+        slots = None
+        position = 0
+        while True:
+            if self._slots is not slots:
+                # First step, or the slot list was compacted meanwhile.
+                slots = self._slots
+                position = bisect_right(self._sequences, after)
+            if position >= len(slots):
+                return
+            product = slots[position]
+            if product is not None:
+                after = self._sequences[position]
+                yield after, product
+            position += 1
+
+    def _prices(self):
+        """
+        Returns the price index, building it on first use.
+
+        :return: PriceIndex - The price index of the store.
+        """
+        if self._price_index is None:
+            self._price_index = PriceIndex(self.list_products)
+        return self._price_index
+
+    def _names(self):
+        """
+        Returns the search index, building it on first use.
+
+        :return: SearchIndex - The search index of the store.
+        """
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.list_products)
+        return self._search_index
+
+    def products_in_price_range(self, low, high, active_only=True):
+        """
+        Returns the products whose price is between low and high
+        (both included), from the cheapest.
+
+        :param low: float - The lowest price.
+        :param high: float - The highest price.
+        :param active_only: bool - Whether to skip inactive products.
+        :return: list - A list of Product objects.
+        """
+        return self._prices().in_range(low, high, active_only)
+
+    def cheapest(self, number, active_only=True):
+        """
+        Returns the cheapest products of the store, from the cheapest.
+
+        :param number: int - The number of products to return.
+        :param active_only: bool - Whether to skip inactive products.
+        :return: list - A list of Product objects.
+        """
+        return self._prices().cheapest(number, active_only)
+
+    def most_expensive(self, number, active_only=True):
+        """
+        Returns the most expensive products of the store,
+        from the most expensive.
+
+        :param number: int - The number of products to return.
+        :param active_only: bool - Whether to skip inactive products.
+        :return: list - A list of Product objects.
+        """
+        return self._prices().most_expensive(number, active_only)
+
+    def search(self, prefix, limit=None):
+        """
+        Returns the products whose name starts with prefix
+        (case insensitive), in alphabetical order.
+
+        :param prefix: str - The beginning of the product name.
+        :param limit: int - The maximum number of products to return.
+        :return: list - A list of Product objects.
+        """
+        return self._names().prefix(prefix, limit)
+
+    def fuzzy_search(self, query, limit=10):
+        """
+        Returns the products whose name is similar to query
+        (e.g. with typos), the most similar first. The first call builds
+        the trigram index of the whole inventory.
+
+        :param query: str - The text to look for.
+        :param limit: int - The maximum number of products to return.
+        :return: list - A list of Product objects.
+        """
+        return self._names().fuzzy(query, limit)
 
     def get_total_quantity(self):
         """
@@ -46,8 +634,8 @@ class Store:
 
         :return: int - The total quantity of items in the store.
         """
-        return sum(product.get_quantity() for product in self.list_products)
-    
+        return self._total_quantity
+
     def get_all_products(self):
         """
         Returns a list of all active products in the store.
@@ -55,30 +643,330 @@ class Store:
         :return: list - A list of Product objects representing
         all active products in the store.
         """
-        active_products = []
-        for item in self.list_products:
-            if item.active is True:
-                active_products.append(item)
-        return active_products
+        if self._active_unordered:
+            by_name = self._by_name
+            self._active = {
+                product.name: product
+                for product in sorted(
+                    self._active.values(),
+                    key=lambda product: by_name[product.name],
+                )
+            }
+            self._active_unordered = False
+        return list(self._active.values())
+
+    @contextmanager
+    def _locked(self, product_list):
+        """
+        Holds the locks of the given products (in name order)
+        when the store is thread safe.
+
+        :param product_list: iterable - The products to lock.
+        """
+        if not self.thread_safe:
+            yield
+            return
+        locks = []
+        for name in sorted({product.name for product in product_list}):
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = self._locks.setdefault(name, threading.Lock())
+            locks.append(lock)
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
 
     @staticmethod
-    def order(shopping_list):
+    def _check_lines(lines):
+        """
+        Validates order lines without changing any product: every line
+        is checked on its own, then the quantities requested for each
+        product are checked against its stock.
+        Raises the same exceptions as Product.buy.
+
+        :param lines: iterable - Tuples of a Product and a quantity.
+        :return: list - Lists of [product, total requested quantity].
+        """
+        requested = {}
+        for product_instance, quantity in lines:
+            product_instance.check_purchase(quantity)
+            entry = requested.get(id(product_instance))
+            if entry is None:
+                requested[id(product_instance)] = [product_instance, quantity]
+            else:
+                entry[1] += quantity
+        for product_instance, quantity in requested.values():
+            product_instance.check_stock(quantity)
+        return list(requested.values())
+
+    def reserve(self, shopping_list):
+        """
+        First phase of an order: validates the whole shopping list and
+        holds the requested quantities, without changing any stock.
+        Raises the same exceptions as Product.buy, in which case nothing
+        is held.
+
+        :param shopping_list: list - A list of tuples where
+        each tuple contains a Product object and the desired quantity.
+        :return: Reservation - The held order, to commit or release.
+        """
+        with self._locked(product for product, _ in shopping_list):
+            return self._reserve(shopping_list)
+
+    def _reserve(self, shopping_list):
+        """
+        Validates and holds a shopping list. The caller holds the locks
+        of its products.
+
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        :return: Reservation - The held order.
+        """
+        requested = self._check_lines(shopping_list)
+        held = []
+        try:
+            for product_instance, quantity in requested:
+                product_instance.reserve(quantity)
+                held.append((product_instance, quantity))
+        except (TypeError, ValueError):
+            for product_instance, quantity in held:
+                product_instance.release(quantity)
+            raise
+        return Reservation(self, shopping_list, requested)
+
+    def hold(self, product, quantity, held=0):
+        """
+        Holds a quantity of a product on top of a quantity already held
+        (e.g. by a shopping cart), so that it can no longer be bought by
+        anyone else. The new quantity is validated like a purchase, and
+        the total held against the limit of the product.
+        Raises the same exceptions as Product.buy, in which case nothing
+        is held.
+
+        :param product: Product - The product.
+        :param quantity: int - The quantity to hold.
+        :param held: int - The quantity already held.
+        """
+        with self._locked([product]):
+            product.check_purchase(quantity)
+            product.check_limit(held + quantity)
+            product.reserve(quantity)
+
+    def release(self, shopping_list):
+        """
+        Gives back quantities held with hold.
+
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        """
+        with self._locked(product for product, _ in shopping_list):
+            for product_instance, quantity in shopping_list:
+                product_instance.release(quantity)
+
+    def price_order(self, shopping_list):
+        """
+        Returns the total price of a shopping list, without checking or
+        changing any stock. Uses the promotion engine of the store if it
+        has one, and the promotion of each product otherwise.
+
+        :param shopping_list: list - A list of tuples where
+        each tuple contains a Product object and the desired quantity.
+        :return: float - The total price of the shopping list.
+        """
+        if self.promotion_engine is not None:
+            return self.promotion_engine.price_basket(shopping_list)
+        total = 0
+        for product_instance, quantity in shopping_list:
+            total += product_instance.quote(quantity)
+        return total
+
+    def quote(self, shopping_list):
+        """
+        Returns the total price of a shopping list, as order would
+        charge it, without checking or changing any stock.
+        Raises an exception if a quantity is not an integer
+        or is less than or equal to zero.
+
+        When the store has a promotion engine, totals are cached per
+        cart (the multiset of its (product name, quantity) lines, so
+        line order does not matter) in an LRU cache. A cached total is
+        dropped as soon as the price, promotion or active status of one
+        of its products changes, or the rules of the engine change.
+        Without an engine, each line is priced by the memoized pricing
+        function of its product, which costs less than building a cart
+        key, so nothing is cached.
+
+        :param shopping_list: list - A list of tuples where
+        each tuple contains a Product object and the desired quantity.
+        :return: float - The total price of the shopping list.
+        """
+        engine = self.promotion_engine
+        cacheable = engine is not None
+        by_name = self._by_name
+        slots = self._slots
+        lines = []
+        for product_instance, quantity in shopping_list:
+            if not isinstance(quantity, int):
+                raise TypeError("Quantity has to be an integer.")
+            if quantity <= 0:
+                raise ValueError("Quantity has to be greater than zero.")
+            if cacheable:
+                name = product_instance.name
+                # Products of other stores do not notify this one.
+                position = by_name.get(name)
+                if position is None or slots[position] is not product_instance:
+                    cacheable = False
+                lines.append((name, quantity))
+        if not cacheable:
+            return self.price_order(shopping_list)
+        key = (id(engine), engine.version, tuple(sorted(lines)))
+        cache = self._quote_cache
+        total = cache.get(key)
+        if total is None:
+            generation = cache.generation
+            total = self.price_order(shopping_list)
+            cache.put(key, total, (name for name, _ in lines), generation)
+        return total
+
+    def order(self, shopping_list):
         """
         Processes an order based on the provided shopping list
         and returns the total price of the order.
 
+        The whole order is validated and its quantities held before any
+        stock changes, so an order that fails (e.g. "Not enough stock
+        available." on its last line) leaves the inventory untouched.
+
         :param shopping_list: list - A list of tuples where
         each tuple contains a Product object and the desired quantity.
         :return: float - The total price of the order.
         """
-        total = 0
-        for item in shopping_list:
-            product_instance, quantity = item
-            total += product_instance.buy(quantity)
+        with self.events.batch():
+            if not self.thread_safe:
+                return self._order(shopping_list)
+            with self._locked(product for product, _ in shopping_list):
+                return self._order(shopping_list)
+
+    def _order(self, shopping_list):
+        """
+        Validates, prices and applies a shopping list. Nothing is held:
+        the caller holds the locks of its products (if the store is
+        thread safe), so the stock cannot change in between.
+
+        :param shopping_list: list - Tuples of a Product and a quantity.
+        :return: float - The total price of the order.
+        """
+        if len(shopping_list) == 1:
+            # Nothing to add up: the line is checked on its own.
+            requested = shopping_list
+            shopping_list[0][0].check_purchase(shopping_list[0][1])
+        else:
+            requested = self._check_lines(shopping_list)
+        total = self.price_order(shopping_list)
+        # Write-ahead: if the journal refuses the order, nothing changed.
+        if self.journal is not None:
+            self.journal.append(shopping_list, total)
+        for product_instance, quantity in requested:
+            product_instance.remove_stock(quantity)
         return total
 
+    def order_many(self, orders):
+        """
+        Processes a batch of orders at once and returns the total price
+        of each order, exactly as order would for each of them.
+
+        The whole batch is validated before any stock changes: every line
+        is checked and the quantities requested for each product across
+        all orders are checked against its stock in one pass, so either
+        every order goes through or none does. Lines are then grouped by
+        promotion and priced one group at a time (or each order is priced
+        by the promotion engine of the store), and the stock of every
+        product is decremented once.
+
+        :param orders: list - A list of shopping lists, each a list of
+        tuples of a Product object and the desired quantity.
+        :return: list - The total price of each order.
+        """
+        line_products = []
+        line_quantities = []
+        order_ends = []
+        for shopping_list in orders:
+            for product_instance, quantity in shopping_list:
+                line_products.append(product_instance)
+                line_quantities.append(quantity)
+            order_ends.append(len(line_products))
+        with self.events.batch(), self._locked(line_products):
+            requested = self._check_lines(zip(line_products, line_quantities))
+            if self.promotion_engine is not None:
+                totals = [
+                    self.promotion_engine.price_basket(shopping_list)
+                    for shopping_list in orders
+                ]
+            else:
+                line_totals = self._price_lines(line_products,
+                                                line_quantities)
+                totals = []
+                start = 0
+                for end in order_ends:
+                    totals.append(sum(line_totals[start:end]))
+                    start = end
+            if self.journal is not None:
+                self.journal.append_many(zip(orders, totals))
+            for product_instance, quantity in requested:
+                product_instance.remove_stock(quantity)
+        return totals
+
+    @staticmethod
+    def _price_lines(line_products, line_quantities):
+        """
+        Prices order lines grouped by promotion, one group at a time.
+
+        :param line_products: list - The product of each line.
+        :param line_quantities: list - The quantity of each line.
+        :return: list - The total price of each line.
+        """
+        groups = {}
+        for line, product_instance in enumerate(line_products):
+            promotion = product_instance.promotion
+            group = groups.get(id(promotion))
+            if group is None:
+                group = groups[id(promotion)] = (promotion, [])
+            group[1].append(line)
+        line_totals = [0.0] * len(line_products)
+        for promotion, lines in groups.values():
+            group_products = [line_products[line] for line in lines]
+            group_quantities = [line_quantities[line] for line in lines]
+            if promotion:
+                group_totals = promotion.apply_promotion_many(
+                    group_products, group_quantities
+                )
+            else:
+                group_totals = [
+                    product_instance.price * quantity
+                    for product_instance, quantity in zip(
+                        group_products, group_quantities
+                    )
+                ]
+            for line, line_total in zip(lines, group_totals):
+                line_totals[line] = line_total
+        return line_totals
+
+    def __len__(self):
+        return len(self._by_name)
+
     def __contains__(self, item):
-        return item in self.list_products
+        """
+        Checks whether a product (or a product name) is in the store.
+
+        :param item: Product or str - The Product object or its name.
+        :return: bool - True if the product is in the store.
+        """
+        if isinstance(item, str):
+            return item in self._by_name
+        position = self._by_name.get(getattr(item, "name", None))
+        return position is not None and self._slots[position] is item
 
     def __add__(self, other):
         return self.list_products + other.list_products
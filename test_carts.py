@@ -0,0 +1,61 @@
+import pytest
+import carts
+import products
+import store
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_manager():
+    mac = products.Product("MacBook Air M2", price=1450, quantity=10)
+    shipping = products.LimitedProduct("Shipping", price=10, quantity=250,
+                                       maximum=1)
+    clock = Clock()
+    manager = carts.CartManager(store.Store([mac, shipping]), ttl=60,
+                                clock=clock)
+    return manager, clock, mac, shipping
+
+
+def test_holds_guarantee_stock_at_checkout():
+    manager, clock, mac, shipping = make_manager()
+    cart = manager.open_cart()
+    manager.hold(cart, mac, 6)
+    manager.hold(cart, shipping, 1)
+    with pytest.raises(ValueError, match="limited to add max 1"):
+        manager.hold(cart, shipping, 1)
+    other = manager.open_cart()
+    with pytest.raises(ValueError, match="Not enough stock"):
+        manager.hold(other, mac, 5)
+    assert manager.available(mac) == 4
+    manager.remove(cart, mac, 2)
+    manager.hold(other, mac, 5)
+    assert manager.checkout(cart) == 4 * 1450 + 10
+    assert cart.state == carts.CHECKED_OUT
+    assert mac.get_quantity() == 6
+    assert mac.reserved == 5
+    with pytest.raises(ValueError, match="checked out"):
+        manager.hold(cart, mac, 1)
+
+
+def test_expired_holds_are_freed():
+    manager, clock, mac, _ = make_manager()
+    idle = manager.open_cart()
+    active = manager.open_cart()
+    manager.hold(idle, mac, 3)
+    manager.hold(active, mac, 3)
+    clock.now = 50
+    manager.hold(active, mac, 1)
+    clock.now = 70
+    assert manager.available(mac) == 6
+    assert idle.state == carts.EXPIRED
+    with pytest.raises(ValueError, match="expired"):
+        manager.checkout(idle)
+    clock.now = 200
+    assert manager.expire_due() == 1
+    assert mac.reserved == 0
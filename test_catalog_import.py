@@ -0,0 +1,43 @@
+import products
+import catalog_import
+
+
+def test_import_jsonl(tmp_path):
+    path = tmp_path / "catalog.jsonl"
+    path.write_text(
+        '{"name": "MacBook Air M2", "price": 1450, "quantity": 100,'
+        ' "promotion": "Second Half price!"}\n'
+        '{"name": "", "price": 10, "quantity": 1}\n'
+        'not json\n'
+        '{"name": "Windows License", "price": 125, "kind": "non_stocked"}\n'
+        '{"name": "Shipping", "price": 10, "quantity": 250,'
+        ' "kind": "limited", "maximum": 1}\n'
+        '{"name": "Google Pixel 7", "price": -500, "quantity": 250}\n'
+        '{"name": "MacBook Air M2", "price": 1, "quantity": 1}\n'
+    )
+    promotion = products.SecondHalfPrice("Second Half price!")
+    result = catalog_import.import_catalog(
+        path, promotions={promotion.name: promotion}, chunk_size=2,
+        workers=2,
+    )
+    assert result.imported == 3
+    assert [line for line, _ in result.errors] == [2, 3, 6, 7]
+    assert result.errors[0][1] == "Product name cannot be empty."
+    assert result.errors[2][1] == "Product price cannot be negative."
+    best_buy = result.store
+    assert best_buy.get_product("MacBook Air M2").promotion is promotion
+    assert best_buy.get_product("Shipping").maximum == 1
+    assert best_buy.get_total_quantity() == 350
+
+
+def test_import_csv(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text(
+        "name,price,quantity,kind,maximum\n"
+        "Google Pixel 7,500,250,,\n"
+        "Bose QuietComfort Earbuds,250.5,ten,,\n"
+    )
+    result = catalog_import.import_catalog(path, workers=0)
+    assert result.imported == 1
+    assert result.errors == [(3, "Quantity has to be an integer.")]
+    assert result.store.get_product("Google Pixel 7").price == 500.0
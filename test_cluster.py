@@ -0,0 +1,52 @@
+import pytest
+import cluster
+import products
+import store
+
+
+def make_products(count):
+    return [
+        products.Product(f"Product {i}", price=10, quantity=100)
+        for i in range(count)
+    ]
+
+
+def test_hash_sharding_routes_orders():
+    product_list = make_products(50)
+    with cluster.StoreCluster.from_products(product_list, 4) as stores:
+        assert len(stores) == 50
+        assert len(stores.shards) == 4
+        for product in product_list:
+            key = stores.shard_of(product)
+            assert key == cluster.shard_key(product.name, 4)
+        first, second = product_list[0], product_list[1]
+        assert stores.order([(first, 2), (second, 3)]) == 50
+        assert stores.get_total_quantity() == 50 * 100 - 5
+        with pytest.raises(ValueError, match="Not enough stock"):
+            stores.order([(first, 1), (second, 1000)])
+        assert first.get_quantity() == 98
+        assert first.get_available() == 98
+        stores.remove_product(first)
+        assert first.name not in stores
+        assert len(stores.get_all_products()) == 49
+
+
+def test_location_sharding():
+    berlin = store.Store([products.Product("Pixel", price=500, quantity=5)])
+    paris = store.Store([
+        products.Product("Pixel", price=480, quantity=2),
+        products.Product("MacBook", price=1450, quantity=1),
+    ])
+    with cluster.StoreCluster.by_location(
+        {"berlin": berlin, "paris": paris}
+    ) as stores:
+        paris_pixel = stores.get_product("Pixel", "paris")
+        assert stores.shard_of(paris_pixel) == "paris"
+        assert stores.order([(paris_pixel, 2)]) == 960
+        assert stores.quantities_by_shard() == {"berlin": 5, "paris": 1}
+        stores.add_product(products.Product("Bose", price=250, quantity=3),
+                           "berlin")
+        assert stores.get_total_quantity() == 9
+        with pytest.raises(KeyError):
+            stores.add_product(products.Product("Bose", price=1, quantity=1),
+                               "rome")
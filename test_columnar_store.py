@@ -0,0 +1,84 @@
+import pytest
+import products
+import columnar_store
+
+
+def make_store():
+    return columnar_store.ColumnarStore(
+        [
+            products.Product("MacBook Air M2", price=1450, quantity=100),
+            products.NonStockedProduct("Windows License", price=125),
+            products.LimitedProduct("Shipping", price=10, quantity=250,
+                                    maximum=1),
+        ]
+    )
+
+
+def test_views():
+    best_buy = make_store()
+    mac = best_buy.get_product("MacBook Air M2")
+    assert mac.price == 1450
+    assert mac.buy(10) == 14500
+    assert mac.quantity == 90
+    assert best_buy.total_quantity() == 340
+
+
+def test_view_rules():
+    best_buy = make_store()
+    with pytest.raises(ValueError, match="Shipping is limited to add max 1."):
+        best_buy.get_product("Shipping").buy(2)
+    with pytest.raises(AttributeError, match="NonStockedProduct quantity "
+                                             "cannot be modified."):
+        best_buy.get_product("Windows License").quantity = 10
+
+
+def test_bulk_set_price():
+    best_buy = make_store()
+    best_buy.bulk_set_price(["MacBook Air M2", "Shipping"], [1000, 5])
+    assert [view.price for view in best_buy.list_products] == [1000, 125, 5]
+    with pytest.raises(ValueError, match="Product price cannot be negative."):
+        best_buy.bulk_set_price(["MacBook Air M2", "Shipping"], [10, -1])
+    assert best_buy.get_product("MacBook Air M2").price == 1000
+
+
+def test_bulk_restock():
+    best_buy = make_store()
+    best_buy.get_product("MacBook Air M2").buy(100)
+    assert list(best_buy.active_mask()) == [0, 1, 1]
+    best_buy.bulk_restock(["MacBook Air M2", "Shipping"], 5)
+    assert list(best_buy.active_mask()) == [1, 1, 1]
+    assert best_buy.total_quantity() == 260
+
+
+def test_bulk_restock_adds_up_repeated_rows():
+    best_buy = make_store()
+    mac = best_buy.get_product("MacBook Air M2")
+    mac.buy(94)
+    total = best_buy.total_quantity()
+    with pytest.raises(ValueError, match="cannot be negative"):
+        best_buy.bulk_restock(["MacBook Air M2", "MacBook Air M2"], [-5, -5])
+    assert mac.quantity == 6
+    assert best_buy.total_quantity() == total
+    best_buy.bulk_restock(["MacBook Air M2", "MacBook Air M2"], [-5, -1])
+    assert mac.quantity == 0
+    assert list(best_buy.active_mask())[0] == 0
+
+
+def test_to_product():
+    best_buy = make_store()
+    shipping = best_buy.get_product("Shipping").to_product()
+    assert isinstance(shipping, products.LimitedProduct)
+    assert shipping.maximum == 1
+
+
+def test_order_is_all_or_nothing_and_cursor():
+    best_buy = make_store()
+    mac = best_buy.product_at(1)
+    with pytest.raises(ValueError, match="Not enough stock"):
+        best_buy.order([(mac, 60), (best_buy.get_product(0), 60)])
+    assert mac.quantity == 100
+    assert best_buy.order([(mac, 2), (best_buy.product_at(2), 1)]) == 3025
+    assert [view.name for _, view in best_buy.iter_products(after=1)] == [
+        "Windows License", "Shipping"]
+    with pytest.raises(KeyError):
+        best_buy.product_at(4)
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+import products
+import store
+import journal
+
+
+def make_store(order_journal=None):
+    return store.Store(
+        [
+            products.Product("MacBook Air M2", price=1450, quantity=100),
+            products.Product("Google Pixel 7", price=500, quantity=250),
+            products.NonStockedProduct("Windows License", price=125),
+        ],
+        journal=order_journal,
+    )
+
+
+def test_replay_after_crash(tmp_path):
+    snapshot_path = tmp_path / "store.snapshot"
+    journal_path = tmp_path / "orders.journal"
+    make_store().save(snapshot_path)
+    best_buy = journal.recover(snapshot_path, journal_path)
+    mac = best_buy.get_product("MacBook Air M2")
+    pixel = best_buy.get_product("Google Pixel 7")
+    best_buy.order([(mac, 2), (pixel, 1)])
+    best_buy.order([(pixel, 4), (best_buy.get_product("Windows License"),
+                                 1)])
+    best_buy.journal.close()
+    with open(journal_path, "ab") as journal_file:
+        journal_file.write(b"\x10\x00")  # torn record
+
+    recovered = journal.recover(snapshot_path, journal_path)
+    assert recovered.get_product("MacBook Air M2").quantity == 98
+    assert recovered.get_product("Google Pixel 7").quantity == 245
+    assert recovered.journal.sequence == 2
+    recovered.order([(recovered.get_product("MacBook Air M2"), 1)])
+    recovered.journal.close()
+    records = [journal.decode_order(payload)
+               for _, payload in journal.iter_records(journal_path)]
+    assert [record[0] for record in records] == [1, 2, 3]
+    assert records[0][1] == [("MacBook Air M2", 2, 1450.0, ""),
+                             ("Google Pixel 7", 1, 500.0, "")]
+
+
+def test_checkpoint(tmp_path):
+    snapshot_path = tmp_path / "store.snapshot"
+    journal_path = tmp_path / "orders.journal"
+    make_store().save(snapshot_path)
+    best_buy = journal.recover(snapshot_path, journal_path)
+    best_buy.order([(best_buy.get_product("MacBook Air M2"), 5)])
+    best_buy.journal.append([], 0, durable=True)
+    journal.checkpoint(best_buy, snapshot_path)
+    best_buy.order([(best_buy.get_product("MacBook Air M2"), 5)])
+    best_buy.journal.close()
+
+    recovered = journal.recover(snapshot_path, journal_path)
+    assert recovered.get_product("MacBook Air M2").quantity == 90
+    assert recovered.journal.sequence == 3
+    recovered.journal.close()
+
+
+def test_truncate_keeps_later_orders(tmp_path):
+    journal_path = tmp_path / "orders.journal"
+    order_journal = journal.OrderJournal(journal_path)
+    for _ in range(3):
+        order_journal.append([], 0)
+    order_journal.truncate(2)
+    order_journal.append([], 0)
+    order_journal.close()
+    assert [journal.decode_order(payload)[0]
+            for _, payload in journal.iter_records(journal_path)] == [3, 4]
+
+
+def test_checkpoint_during_orders(tmp_path):
+    snapshot_path = tmp_path / "store.snapshot"
+    journal_path = tmp_path / "orders.journal"
+    make_store().save(snapshot_path)
+    best_buy = journal.recover(snapshot_path, journal_path,
+                               thread_safe=True)
+    pixel = best_buy.get_product("Google Pixel 7")
+
+    def buy():
+        for _ in range(100):
+            best_buy.order([(pixel, 1)])
+
+    threads = [threading.Thread(target=buy) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for _ in range(5):
+        journal.checkpoint(best_buy, snapshot_path)
+    for thread in threads:
+        thread.join()
+    best_buy.journal.close()
+
+    recovered = journal.recover(snapshot_path, journal_path)
+    assert recovered.get_product("Google Pixel 7").quantity == 50
+    recovered.journal.close()
+
+
+def test_refused_order_keeps_stock(tmp_path):
+    best_buy = make_store(journal.OrderJournal(tmp_path / "orders.journal"))
+    mac = best_buy.get_product("MacBook Air M2")
+    best_buy.journal.close()
+    with pytest.raises(ValueError, match="The journal is closed."):
+        best_buy.order([(mac, 2)])
+    with pytest.raises(ValueError, match="The journal is closed."):
+        best_buy.order_many([[(mac, 1)], [(mac, 1)]])
+    reservation = best_buy.reserve([(mac, 2)])
+    with pytest.raises(ValueError, match="The journal is closed."):
+        reservation.commit()
+    assert reservation.state == store.PENDING
+    assert mac.quantity == 100
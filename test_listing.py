@@ -0,0 +1,46 @@
+import io
+
+import listing
+import products
+import store
+
+
+def make_store(count):
+    return store.Store([
+        products.Product(f"Product {i}", price=i, quantity=1)
+        for i in range(1, count + 1)
+    ])
+
+
+def test_pages_and_stable_cursor():
+    best_buy = make_store(10)
+    first = listing.paginate(best_buy, page_size=4)
+    assert [sequence for sequence, _ in first.items] == [1, 2, 3, 4]
+    for i in range(1, 8):
+        best_buy.remove_product(f"Product {i}")
+    best_buy.add_product(products.Product("New", price=1, quantity=1))
+    second = listing.paginate(best_buy, first.next_cursor, page_size=4)
+    assert [product.name for _, product in second.items] == [
+        "Product 8", "Product 9", "Product 10", "New"]
+    assert second.next_cursor is None
+    assert best_buy.product_at(11).name == "New"
+    assert len(list(listing.iter_pages(best_buy, page_size=2))) == 2
+
+
+def test_filters_and_rendering():
+    best_buy = make_store(6)
+    best_buy.get_product("Product 2").deactivate()
+    best_buy.get_product("Product 5").set_promotion(
+        products.PercentDiscount("30% off!", percent=30))
+    names = [
+        product.name
+        for _, product in listing.paginate(best_buy, active=True,
+                                           min_price=2, max_price=5).items
+    ]
+    assert names == ["Product 3", "Product 4", "Product 5"]
+    page = listing.paginate(best_buy, promotion="30% off!")
+    assert listing.render_page(page).startswith("5: Name: Product 5,")
+    out = io.StringIO()
+    assert listing.write_pages(best_buy, out, page_size=4,
+                               promotion=False) == 5
+    assert out.getvalue().count("\n") == 5
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+import metrics
+import products
+import store
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.Metrics()
+    metrics.enable(registry)
+    yield registry
+    metrics.disable()
+
+
+def test_disabled_by_default():
+    assert not metrics.is_enabled()
+    assert store.Store.order.__name__ == "order"
+    assert "__wrapped__" not in vars(store.Store.order)
+
+
+def test_counts_calls_latencies_and_failures(registry):
+    mac = products.Product("MacBook Air M2", price=1450, quantity=100)
+    mac.set_promotion(products.SecondHalfPrice("Second Half price!"))
+    shirt = products.LimitedProduct("Shirt", price=50, quantity=10,
+                                    maximum=2)
+    best_buy = store.Store([mac, shirt])
+    assert best_buy.order([(mac, 2), (shirt, 1)]) == 2225
+    with pytest.raises(ValueError):
+        best_buy.order([(mac, 1000)])
+    with pytest.raises(ValueError):
+        shirt.buy(3)
+    assert registry.calls("store_order") == 2
+    assert registry.calls("product_buy") == 1
+    assert registry.calls("line_pricing", "SecondHalfPrice") == 1
+    assert registry.calls("line_pricing", "none") == 1
+    failures = {
+        (entry["operation"], entry["reason"]): entry["count"]
+        for entry in registry.snapshot()["failures"]
+    }
+    assert failures[("store_order", "Not enough stock available.")] == 1
+    assert failures[("product_buy", "Limit exceeded.")] == 1
+    assert json.loads(registry.to_json())["operations"]
+    text = registry.to_prometheus()
+    assert 'bestbuy_calls_total{operation="store_order"} 2' in text
+    assert ('bestbuy_latency_seconds_bucket{operation="store_order",'
+            'le="+Inf"} 2') in text
+    assert ('bestbuy_failures_total{operation="product_buy",'
+            'error="ValueError",reason="Limit exceeded."} 1') in text
+
+
+def test_disable_restores_methods(registry):
+    metrics.disable()
+    assert not metrics.is_enabled()
+    assert "__wrapped__" not in vars(products.Product.buy)
+    product = products.Product("Pixel", price=500, quantity=5)
+    product.buy(1)
+    assert registry.calls("product_buy") == 0
+
+
+def test_times_compiled_promotion_pricers(registry):
+    mac = products.Product("MacBook Air M2", price=1450, quantity=100)
+    mac.set_promotion(products.SecondHalfPrice("Second Half price!"))
+    pixel = products.Product("Pixel", price=500, quantity=100)
+    pixel.set_promotion(products.FixedAmountOff("50 off", 50))
+    best_buy = store.Store([mac, pixel])
+    best_buy.order([(mac, 2), (pixel, 1)])
+    best_buy.order([(mac, 2), (pixel, 1)])
+    # The second order is priced from the memo: one evaluation each.
+    assert registry.calls("line_pricing", "SecondHalfPrice") == 2
+    assert registry.calls("apply_promotion", "SecondHalfPrice") == 1
+    assert registry.calls("apply_promotion", "FixedAmountOff") == 1
+    best_buy.order([(mac, 3)])
+    assert registry.calls("apply_promotion", "SecondHalfPrice") == 2
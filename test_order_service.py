@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+import products
+import store
+import order_service
+
+
+def test_batched_orders():
+    mac = products.Product("MacBook Air M2", price=1450, quantity=5)
+    pixel = products.Product("Google Pixel 7", price=500, quantity=250)
+    best_buy = store.Store([mac, pixel])
+
+    async def place_orders():
+        async with order_service.OrderService(best_buy,
+                                              batch_window=0.01) as service:
+            return await asyncio.gather(
+                service.submit([(pixel, 2)]),
+                service.submit([(mac, 10)]),
+                service.submit([(mac, 1), (pixel, 1)]),
+                return_exceptions=True,
+            )
+
+    first, second, third = asyncio.run(place_orders())
+    assert first == 1000
+    assert isinstance(second, ValueError)
+    assert third == 1950
+    assert best_buy.get_total_quantity() == 251
+
+
+def test_malformed_order_keeps_worker_running():
+    pixel = products.Product("Google Pixel 7", price=500, quantity=250)
+    best_buy = store.Store([pixel])
+
+    async def place_orders():
+        async with order_service.OrderService(best_buy,
+                                              batch_window=0.01) as service:
+            first = await asyncio.wait_for(asyncio.gather(
+                service.submit([("bogus", 1)]),
+                service.submit([(pixel, 1)]),
+                return_exceptions=True,
+            ), 1)
+            later = await asyncio.wait_for(service.submit([(pixel, 2)]), 1)
+            return first, later
+
+    (bogus, valid), later = asyncio.run(place_orders())
+    assert isinstance(bogus, AttributeError)
+    assert valid == 500
+    assert later == 1000
+    assert pixel.quantity == 247
+
+
+def test_not_running():
+    best_buy = store.Store([products.Product("Google Pixel 7", price=500)])
+    service = order_service.OrderService(best_buy)
+    with pytest.raises(RuntimeError, match="The order service is not "
+                                           "running."):
+        asyncio.run(service.submit([]))
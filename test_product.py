@@ -166,4 +166,25 @@ def test_limit_buy():
     assert shipping.quantity == 149
 
 
+def test_quote():
+    mac = products.Product("MacBook Air M2", price=1000, quantity=100)
+    mac.set_promotion(products.SecondHalfPrice("Second Half price!"))
+    assert mac.quote(3) == 2500.0
+    assert mac.quantity == 100
+    mac.price = 500
+    assert mac.quote(3) == 1250.0
+    mac.set_promotion(products.PercentDiscount("30% off!", percent=30))
+    assert mac.buy(2) == 700.0
+    with pytest.raises(ValueError, match="Quantity has to be greater than "
+                                         "zero."):
+        mac.quote(0)
+
+
+def test_third_one_free():
+    bose = products.Product("Bose QuietComfort Earbuds", price=250,
+                            quantity=500)
+    bose.set_promotion(products.ThirdOneFree("Third One Free!"))
+    assert bose.buy(7) == 250 * 5
+
+
 pytest.main()
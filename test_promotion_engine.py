@@ -0,0 +1,62 @@
+import pytest
+import products
+import promotion_engine
+import store
+
+
+def make_products():
+    mac = products.Product("MacBook Air M2", price=1000, quantity=100)
+    bose = products.Product("Bose QuietComfort Earbuds", price=250,
+                            quantity=500)
+    return mac, bose
+
+
+def test_single_promotion_matches_quote():
+    mac, bose = make_products()
+    mac.set_promotion(products.SecondHalfPrice("Second Half price!"))
+    bose.set_promotion(products.PercentDiscount("30% off!", percent=30))
+    engine = promotion_engine.PromotionEngine()
+    for quantity in range(1, 8):
+        assert engine.price_line(mac, quantity) == mac.quote(quantity)
+        assert engine.price_line(bose, quantity) == bose.quote(quantity)
+
+
+def test_stacked_promotions():
+    mac, bose = make_products()
+    engine = promotion_engine.PromotionEngine()
+    engine.add_rule(products.ThirdOneFree("Third One Free!"), [mac])
+    engine.add_rule(products.SecondHalfPrice("Second Half price!"), [mac])
+    engine.add_rule(products.PercentDiscount("10% off!", percent=10),
+                    [mac, bose])
+    engine.add_rule(products.FixedAmountOff("50 off!", amount=50), [bose])
+    # 3 macs: third one free (2000) beats second half price (2500)
+    assert engine.price_line(mac, 3) == 2000 * 0.9
+    assert engine.price_line(bose, 2) == 250 * 2 * 0.9 - 100
+
+
+def test_basket_rules():
+    mac, bose = make_products()
+    engine = promotion_engine.PromotionEngine()
+    engine.add_rule(promotion_engine.BasketPercentDiscount(
+        "10% off above 2000", percent=10, minimum_total=2000))
+    engine.add_rule(promotion_engine.BasketPercentDiscount(
+        "Earbuds bundle", percent=50), [bose])
+    assert engine.price_basket([(mac, 1)]) == 1000
+    assert engine.price_basket([(mac, 2), (bose, 1)]) == 2250 * 0.9 * 0.5
+    assert engine.rules_for(bose)[0].name == "Earbuds bundle"
+
+
+def test_product_promotion_needs_products():
+    engine = promotion_engine.PromotionEngine()
+    with pytest.raises(ValueError, match="A product promotion needs the "
+                                         "products it applies to."):
+        engine.add_rule(products.ThirdOneFree("Third One Free!"))
+
+
+def test_store_uses_engine():
+    mac, bose = make_products()
+    engine = promotion_engine.PromotionEngine()
+    engine.add_rule(products.PercentDiscount("10% off!", percent=10), [mac])
+    best_buy = store.Store([mac, bose], promotion_engine=engine)
+    assert best_buy.order([(mac, 1), (bose, 1)]) == 1150
+    assert best_buy.order_many([[(mac, 1)], [(bose, 2)]]) == [900, 500]
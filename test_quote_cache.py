@@ -0,0 +1,18 @@
+import quote_cache
+
+
+def test_lru_eviction_and_invalidation():
+    cache = quote_cache.QuoteCache(maxsize=2)
+    cache.put("a", 1.0, ["Mac"], cache.generation)
+    cache.put("b", 2.0, ["Mac", "Pixel"], cache.generation)
+    assert cache.get("a") == 1.0
+    cache.put("c", 3.0, ["Pixel"], cache.generation)
+    assert cache.get("b") is None
+    cache.invalidate("Pixel")
+    assert len(cache) == 1
+    assert cache.get("a") == 1.0
+    stale = cache.generation
+    cache.invalidate("Mac")
+    cache.put("d", 4.0, ["Bose"], stale)
+    assert len(cache) == 0
+    assert cache._dependents == {}
@@ -0,0 +1,37 @@
+import io
+import json
+
+import products
+import replay
+import store
+
+
+def test_replay_order_file(tmp_path):
+    mac = products.Product("MacBook Air M2", price=1450, quantity=3)
+    best_buy = store.Store([mac])
+    path = tmp_path / "orders.jsonl"
+    path.write_text(
+        '[["MacBook Air M2", 2]]\n'
+        '{"lines": [["MacBook Air M2", 2]]}\n'
+        '[["Pixel", 1]]\n'
+        '\n'
+        '{"lines": 3}\n'
+        '{"lines": [["MacBook Air M2", 1]]}\n'
+    )
+    results = io.StringIO()
+    result = replay.replay(best_buy, path, results)
+    assert result.orders == 5
+    assert result.succeeded == 2
+    assert result.revenue == 4350
+    assert result.failures == {
+        "Not enough stock available.": 1,
+        "Unknown product.": 1,
+        "Order has to be a list of [name, quantity] pairs.": 1,
+    }
+    assert len(result.latencies) == 2
+    outcomes = [json.loads(line) for line in results.getvalue().splitlines()]
+    assert outcomes[0] == {"line": 1, "total": 2900}
+    assert outcomes[-1] == {"line": 6, "total": 1450}
+    summary = replay.format_summary(result)
+    assert "Orders: 5 (2 succeeded, 3 failed)" in summary
+    assert "1 x Unknown product." in summary
@@ -0,0 +1,79 @@
+import pytest
+import products
+import promotion_engine
+import shared_inventory
+import store
+
+
+def make_store():
+    return store.Store([
+        products.Product("MacBook Air M2", price=1450, quantity=100),
+        products.NonStockedProduct("Windows License", price=125),
+        products.LimitedProduct("Shipping", price=10, quantity=250,
+                                maximum=1),
+    ])
+
+
+def test_shared_inventory_reserve_commit_release():
+    inventory = shared_inventory.SharedInventory.from_products(
+        make_store().list_products
+    )
+    try:
+        inventory.reserve([(0, 60), (1, 1000)])
+        with pytest.raises(ValueError, match="Not enough stock"):
+            inventory.order([(0, 41)])
+        inventory.release([(0, 10), (1, 1000)])
+        inventory.order([(0, 40), (2, 1)])
+        inventory.commit([(0, 50)])
+        assert list(inventory.quantities) == [10, 0, 249]
+        assert list(inventory.reserved) == [0, 0, 0]
+        inventory.order([(0, 10)])
+        assert list(inventory.active) == [0, 1, 1]
+    finally:
+        inventory.unlink()
+
+
+def test_process_order_pool():
+    best_buy = make_store()
+    mac, windows, shipping = best_buy.list_products
+    mac.set_promotion(products.SecondHalfPrice("Second Half price!"))
+    with shared_inventory.ProcessOrderPool(best_buy, workers=2,
+                                           chunk_size=3) as pool:
+        assert pool.order([(mac, 2), (windows, 5)]) == 2175 + 625
+        with pytest.raises(ValueError, match="limited to add max 1"):
+            pool.order([(shipping, 2)])
+        results = pool.order_many([[(mac, 1)]] * 10 + [[(mac, 1000)]])
+        assert results[:10] == [1450.0] * 10
+        assert isinstance(results[10], ValueError)
+        assert mac.get_quantity() == 100
+    assert mac.get_quantity() == 88
+    assert best_buy.get_total_quantity() == 88 + 250
+
+
+def test_process_order_pool_keeps_reservations():
+    best_buy = make_store()
+    mac = best_buy.list_products[0]
+    reservation = best_buy.reserve([(mac, 90)])
+    with shared_inventory.ProcessOrderPool(best_buy, workers=1) as pool:
+        assert list(pool.inventory.reserved) == [90, 0, 0]
+        with pytest.raises(ValueError, match="Not enough stock"):
+            pool.order([(mac, 11)])
+        pool.order([(mac, 10)])
+    assert mac.get_quantity() == 90
+    reservation.commit()
+    assert mac.get_quantity() == 0
+
+
+def test_process_order_pool_uses_promotion_engine():
+    best_buy = make_store()
+    mac, windows, _ = best_buy.list_products
+    engine = promotion_engine.PromotionEngine()
+    engine.add_rule(products.PercentDiscount("10% off", percent=10),
+                    [mac])
+    engine.add_rule(promotion_engine.BasketPercentDiscount(
+        "Big basket", percent=50, minimum_total=2000))
+    best_buy.promotion_engine = engine
+    shopping_list = [(mac, 2), (windows, 1)]
+    expected = best_buy.price_order(shopping_list)
+    with shared_inventory.ProcessOrderPool(best_buy, workers=1) as pool:
+        assert pool.order(shopping_list) == expected
@@ -0,0 +1,47 @@
+import products
+import store
+import columnar_store
+
+
+def make_store():
+    mac = products.Product("MacBook Air M2", price=1450, quantity=100)
+    mac.set_promotion(products.SecondHalfPrice("Second Half price!"))
+    license_ = products.NonStockedProduct("Windows License", price=125)
+    license_.set_promotion(products.PercentDiscount("30% off!", percent=30))
+    pixel = products.Product("Google Pixel 7", price=500, quantity=0)
+    pixel.deactivate()
+    return store.Store([
+        mac,
+        license_,
+        products.LimitedProduct("Shipping", price=10, quantity=250,
+                                maximum=1),
+        pixel,
+    ])
+
+
+def test_store_round_trip(tmp_path):
+    path = tmp_path / "store.snapshot"
+    make_store().save(path)
+    best_buy = store.Store.load(path)
+    assert [str(item) for item in best_buy.list_products] == [
+        str(item) for item in make_store().list_products
+    ]
+    assert best_buy.get_total_quantity() == 350
+    assert [item.name for item in best_buy.get_all_products()] == [
+        "MacBook Air M2", "Windows License", "Shipping"]
+    assert best_buy.get_product("Shipping").maximum == 1
+    assert best_buy.order([(best_buy.get_product("MacBook Air M2"), 2),
+                           (best_buy.get_product("Windows License"), 1)]
+                          ) == 1450 * 1.5 + 125 * 0.7
+
+
+def test_columnar_round_trip(tmp_path):
+    path = tmp_path / "store.snapshot"
+    make_store().save(path)
+    catalog = columnar_store.ColumnarStore.load(path)
+    assert catalog.total_quantity() == 350
+    assert catalog.get_product("Shipping").buy(1) == 10
+    catalog.add_product(products.Product("iPhone", price=900, quantity=5))
+    assert len(catalog) == 5
+    catalog.save(path)
+    assert columnar_store.ColumnarStore.load(path).total_quantity() == 354
@@ -0,0 +1,28 @@
+import random
+
+import sorted_buckets
+
+
+def test_matches_a_sorted_list(monkeypatch):
+    monkeypatch.setattr(sorted_buckets.SortedBuckets, "LOAD", 2)
+    rng = random.Random(0)
+    keys = rng.sample(range(1000), 50)
+    entries = sorted((key, str(key)) for key in keys[:20])
+    buckets = sorted_buckets.SortedBuckets(entries)
+    expected = dict(entries)
+    for key in keys[20:]:
+        buckets.add(key, str(key))
+        expected[key] = str(key)
+    for key in rng.sample(sorted(expected), 25):
+        buckets.remove(key)
+        del expected[key]
+    ordered = [expected[key] for key in sorted(expected)]
+    assert len(buckets) == 25
+    assert list(buckets.values()) == ordered
+    assert list(buckets.reversed_values()) == ordered[::-1]
+    assert buckets.values_between(100, 600) == [
+        expected[key] for key in sorted(expected) if 100 <= key <= 600
+    ]
+    low = sorted(expected)[10]
+    assert [key for key, _ in buckets.iter_from(low)] == sorted(expected)[10:]
+    assert list(buckets.iter_from(1000)) == []
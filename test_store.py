@@ -0,0 +1,344 @@
+import threading
+
+import pytest
+import events
+import promotion_engine
+import products
+import store
+
+
+def make_store():
+    return store.Store(
+        [
+            products.Product("MacBook Air M2", price=1450, quantity=100),
+            products.Product("Bose QuietComfort Earbuds", price=250,
+                             quantity=500),
+            products.Product("Google Pixel 7", price=500, quantity=250),
+        ]
+    )
+
+
+def test_empty_store():
+    with pytest.raises(ValueError, match="The list of products cannot be "
+                                         "empty."):
+        store.Store([])
+
+
+def test_get_product():
+    best_buy = make_store()
+    assert best_buy.get_product("Google Pixel 7").price == 500
+    with pytest.raises(KeyError, match="iPhone is not in the store."):
+        best_buy.get_product("iPhone")
+
+
+def test_duplicate_product():
+    best_buy = make_store()
+    with pytest.raises(ValueError, match="Google Pixel 7 is already in the "
+                                         "store."):
+        best_buy.add_product(products.Product("Google Pixel 7", price=1))
+
+
+def test_add_products():
+    best_buy = make_store()
+    iphone = products.Product("iPhone", price=900, quantity=5)
+    with pytest.raises(ValueError, match="Google Pixel 7 is already in the "
+                                         "store."):
+        best_buy.add_products([iphone, products.Product("Google Pixel 7",
+                                                        price=1)])
+    assert "iPhone" not in best_buy
+    best_buy.add_products([iphone, products.Product("iPad", price=300,
+                                                    quantity=1)])
+    assert best_buy.get_total_quantity() == 856
+    assert [item.name for item in best_buy.cheapest(2)] == [
+        "Bose QuietComfort Earbuds", "iPad"]
+    assert [item.name for item in best_buy.search("ip")] == ["iPad",
+                                                            "iPhone"]
+
+
+def test_remove_product_keeps_order():
+    best_buy = make_store()
+    pixel = best_buy.get_product("Google Pixel 7")
+    best_buy.remove_product(best_buy.get_product("MacBook Air M2"))
+    best_buy.add_product(products.Product("iPhone", price=900, quantity=5))
+    assert [item.name for item in best_buy.list_products] == [
+        "Bose QuietComfort Earbuds",
+        "Google Pixel 7",
+        "iPhone",
+    ]
+    assert best_buy.get_product("Google Pixel 7") is pixel
+    assert len(best_buy) == 3
+
+
+def test_list_products_is_a_read_only_view():
+    best_buy = make_store()
+    view = best_buy.list_products
+    with pytest.raises(AttributeError):
+        view.append(products.Product("iPhone", price=900, quantity=5))
+    with pytest.raises(TypeError):
+        view[0] = products.Product("iPhone", price=900, quantity=5)
+    best_buy.remove_product(best_buy.get_product("Bose QuietComfort Earbuds"))
+    assert len(view) == 2
+    assert view[1].name == "Google Pixel 7"
+    assert [item.name for item in view[:1]] == ["MacBook Air M2"]
+
+
+def test_contains():
+    best_buy = make_store()
+    pixel = best_buy.get_product("Google Pixel 7")
+    assert "Google Pixel 7" in best_buy
+    assert pixel in best_buy
+    assert products.Product("Google Pixel 7", price=500) not in best_buy
+    best_buy.remove_product("Google Pixel 7")
+    assert pixel not in best_buy
+
+
+def test_total_quantity_follows_stock():
+    best_buy = make_store()
+    assert best_buy.get_total_quantity() == 850
+    best_buy.order([(best_buy.get_product("Google Pixel 7"), 50)])
+    assert best_buy.get_total_quantity() == 800
+    best_buy.add_product(products.NonStockedProduct("Windows License",
+                                                    price=125))
+    best_buy.remove_product("MacBook Air M2")
+    assert best_buy.get_total_quantity() == 700
+
+
+def test_all_products_follows_active():
+    best_buy = make_store()
+    mac = best_buy.get_product("MacBook Air M2")
+    mac.buy(100)
+    assert mac not in best_buy.get_all_products()
+    mac.quantity = 10
+    mac.activate()
+    assert best_buy.get_all_products() == best_buy.list_products
+
+
+def test_order_many_matches_order():
+    second_half_price = products.SecondHalfPrice("Second Half price!")
+    third_one_free = products.ThirdOneFree("Third One Free!")
+    orders = [
+        [("MacBook Air M2", 3), ("Google Pixel 7", 2)],
+        [("Bose QuietComfort Earbuds", 7), ("MacBook Air M2", 1)],
+        [("Google Pixel 7", 5)],
+    ]
+    totals = []
+    for batch in (False, True):
+        best_buy = make_store()
+        best_buy.get_product("MacBook Air M2").set_promotion(
+            second_half_price)
+        best_buy.get_product("Bose QuietComfort Earbuds").set_promotion(
+            third_one_free)
+        shopping_lists = [
+            [(best_buy.get_product(name), quantity)
+             for name, quantity in shopping_list]
+            for shopping_list in orders
+        ]
+        if batch:
+            totals.append(best_buy.order_many(shopping_lists))
+        else:
+            totals.append([best_buy.order(shopping_list)
+                           for shopping_list in shopping_lists])
+        assert best_buy.get_total_quantity() == 832
+    assert totals[0] == totals[1]
+
+
+def test_order_many_checks_whole_batch():
+    best_buy = make_store()
+    mac = best_buy.get_product("MacBook Air M2")
+    pixel = best_buy.get_product("Google Pixel 7")
+    with pytest.raises(ValueError, match="Not enough stock available."):
+        best_buy.order_many([[(pixel, 10), (mac, 60)], [(mac, 60)]])
+    assert mac.quantity == 100
+    assert pixel.quantity == 250
+
+
+def test_thread_safe_order():
+    items = [products.Product(f"Item {i}", price=1, quantity=300)
+             for i in range(4)]
+    best_buy = store.Store(items, thread_safe=True)
+    sold = []
+
+    def worker(offset):
+        for i in range(200):
+            shopping_list = [(items[(offset + i) % 4], 1),
+                             (items[(offset + i + 1) % 4], 1)]
+            try:
+                sold.append(best_buy.order(shopping_list))
+            except ValueError:
+                pass
+
+    threads = [threading.Thread(target=worker, args=(offset,))
+               for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert best_buy.get_total_quantity() == 1200 - 2 * len(sold)
+    assert all(item.quantity >= 0 for item in items)
+
+
+def test_thread_safe_order_is_all_or_nothing():
+    best_buy = make_store()
+    best_buy = store.Store(best_buy.list_products, thread_safe=True)
+    mac = best_buy.get_product("MacBook Air M2")
+    pixel = best_buy.get_product("Google Pixel 7")
+    with pytest.raises(ValueError, match="Not enough stock available."):
+        best_buy.order([(pixel, 10), (mac, 101)])
+    assert pixel.quantity == 250
+
+
+def test_failed_order_keeps_stock():
+    best_buy = make_store()
+    mac = best_buy.get_product("MacBook Air M2")
+    pixel = best_buy.get_product("Google Pixel 7")
+    with pytest.raises(ValueError, match="Not enough stock available."):
+        best_buy.order([(pixel, 10), (mac, 60), (mac, 60)])
+    assert pixel.quantity == 250
+    assert mac.quantity == 100
+    assert mac.reserved == 0
+
+
+def test_reserve_commit_release():
+    best_buy = make_store()
+    mac = best_buy.get_product("MacBook Air M2")
+    reservation = best_buy.reserve([(mac, 60)])
+    assert mac.quantity == 100
+    assert mac.get_available() == 40
+    with pytest.raises(ValueError, match="Not enough stock available."):
+        mac.buy(50)
+    assert reservation.commit() == 1450 * 60
+    assert mac.quantity == 40
+    with pytest.raises(ValueError, match="The reservation is already "
+                                         "committed."):
+        reservation.release()
+    best_buy.reserve([(mac, 40)]).release()
+    assert mac.get_available() == 40
+
+
+
+def test_hold_and_release():
+    shipping = products.LimitedProduct("Shipping", price=10, quantity=5,
+                                       maximum=2)
+    best_buy = store.Store([shipping], thread_safe=True)
+    best_buy.hold(shipping, 1)
+    best_buy.hold(shipping, 1, held=1)
+    with pytest.raises(ValueError, match="limited to add max 2"):
+        best_buy.hold(shipping, 1, held=2)
+    with pytest.raises(TypeError):
+        best_buy.hold(shipping, 1.5)
+    assert shipping.reserved == 2
+    best_buy.release([(shipping, 2)])
+    assert shipping.get_available() == 5
+
+def test_commit_is_all_or_nothing():
+    best_buy = make_store()
+    mac = best_buy.get_product("MacBook Air M2")
+    pixel = best_buy.get_product("Google Pixel 7")
+    reservation = best_buy.reserve([(mac, 5), (pixel, 5)])
+    with pytest.raises(ValueError, match="less than the reserved"):
+        pixel.quantity = 4
+    pixel._quantity = 4  # lowered under the hold behind the store's back
+    with pytest.raises(ValueError, match="cannot be negative"):
+        reservation.commit()
+    assert reservation.state == store.PENDING
+    assert mac.quantity == 100
+    reservation.release()
+    assert mac.reserved == 0
+    assert pixel.reserved == 0
+
+
+def test_price_queries():
+    best_buy = make_store()
+    best_buy.add_product(products.Product("iPhone", price=900, quantity=5))
+    assert [item.name for item in best_buy.products_in_price_range(
+        200, 600)] == ["Bose QuietComfort Earbuds", "Google Pixel 7"]
+    best_buy.get_product("Google Pixel 7").price = 100
+    best_buy.get_product("Bose QuietComfort Earbuds").deactivate()
+    assert [item.name for item in best_buy.cheapest(2)] == [
+        "Google Pixel 7", "iPhone"]
+    assert [item.name for item in best_buy.most_expensive(1)] == [
+        "MacBook Air M2"]
+    best_buy.remove_product("MacBook Air M2")
+    assert best_buy.most_expensive(5, active_only=False)[0].name == "iPhone"
+
+
+def test_search():
+    best_buy = make_store()
+    best_buy.add_product(products.Product("Google Pixel 7 Pro", price=900))
+    assert [item.name for item in best_buy.search("google p")] == [
+        "Google Pixel 7", "Google Pixel 7 Pro"]
+    assert best_buy.search("google", limit=1)[0].name == "Google Pixel 7"
+    assert best_buy.fuzzy_search("macbok air")[0].name == "MacBook Air M2"
+    best_buy.remove_product("Google Pixel 7")
+    assert [item.name for item in best_buy.search("Goo")] == [
+        "Google Pixel 7 Pro"]
+    assert best_buy.fuzzy_search("xyz") == []
+
+
+def test_events_are_coalesced_per_order():
+    best_buy = make_store()
+    received = []
+    best_buy.events.subscribe(received.append)
+    mac = best_buy.get_product("MacBook Air M2")
+    best_buy.order([(mac, 40), (mac, 60)])
+    assert [(event.kind, event.old, event.new) for event in received] == [
+        (events.QUANTITY_CHANGED, 100, 0), (events.DEACTIVATED, True, False)]
+    received.clear()
+    bose = best_buy.get_product("Bose QuietComfort Earbuds")
+    best_buy.order_many([[(bose, 1)], [(bose, 2)]])
+    assert [(event.kind, event.new) for event in received] == [
+        (events.QUANTITY_CHANGED, 497)]
+    received.clear()
+    with best_buy.events.batch():
+        bose.deactivate()
+        bose.activate()
+        mac.quantity = 5
+    assert [(event.kind, event.new) for event in received] == [
+        (events.QUANTITY_CHANGED, 5)]
+    best_buy.events.unsubscribe(received.append)
+    bose.price = 200
+    assert len(received) == 1
+
+
+def test_event_subscriber_kinds_and_failures():
+    best_buy = make_store()
+    prices = []
+
+    def failing(event):
+        raise RuntimeError("subscriber down")
+
+    best_buy.events.subscribe(failing)
+    best_buy.events.subscribe(prices.append, kinds=[events.PRICE_CHANGED])
+    pixel = best_buy.get_product("Google Pixel 7")
+    assert best_buy.order([(pixel, 5)]) == 2500
+    with best_buy.events.batch():
+        pixel.price = 450
+        pixel.price = 400
+        pixel.quantity += 1
+        pixel.quantity -= 1
+    assert [(event.old, event.new) for event in prices] == [(500, 400)]
+
+
+def test_quote_cache_invalidation():
+    best_buy = make_store()
+    engine = promotion_engine.PromotionEngine()
+    best_buy.promotion_engine = engine
+    mac = best_buy.get_product("MacBook Air M2")
+    pixel = best_buy.get_product("Google Pixel 7")
+    assert best_buy.quote([(mac, 2), (pixel, 1)]) == 3400
+    assert best_buy.quote([(pixel, 1), (mac, 2)]) == 3400
+    assert best_buy._quote_cache.hits == 1
+    assert best_buy.quote([(mac, 1), (mac, 1)]) == 2900
+    mac.set_promotion(products.SecondHalfPrice("Second Half price!"))
+    assert best_buy.quote([(mac, 2), (pixel, 1)]) == 2675
+    pixel.quantity -= 1
+    pixel.price = 400
+    assert best_buy.quote([(mac, 2), (pixel, 1)]) == 2575
+    assert mac.get_quantity() == 100
+    engine.add_rule(products.PercentDiscount("10% off", percent=10),
+                    [pixel])
+    assert best_buy.quote([(pixel, 1)]) == 360
+    best_buy.promotion_engine = None
+    assert best_buy.quote([(pixel, 1)]) == 400
+    with pytest.raises(ValueError, match="greater than zero"):
+        best_buy.quote([(pixel, 0)])